@@ -0,0 +1,90 @@
+"""
+大图解码/缩放基准 — 对比各缩放预设 (RESAMPLE_PRESETS)
+
+对每个输入和预设统计:
+    ms         load_image + process_image 总耗时 (取最快一次)
+    ms/MP      按源图像素数折算的耗时
+    decode MB  解码出的 RGB 缓冲区大小 (draft 模式下远小于原图)
+    PSNR       与 quality 预设 (完整解码 + LANCZOS) 输出的峰值信噪比, 越大越接近
+
+不指定文件时生成 4000x3000 的 JPEG (手机照片) 和 3840x2160 的 PNG (4K 截图)。
+
+用法:
+    python benchmarks/bench_decode.py
+    python benchmarks/bench_decode.py photo.jpg screenshot.png -r 5
+"""
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.image_processor import (  # noqa: E402
+    DISPLAY_WIDTH, DISPLAY_HEIGHT, RESAMPLE_PRESETS, load_image, process_image,
+)
+
+
+def make_samples(directory: str) -> list:
+    """生成带渐变和细节的测试图片"""
+    samples = []
+    for name, (w, h), fmt in (("photo.jpg", (4000, 3000), "JPEG"),
+                              ("screen.png", (3840, 2160), "PNG")):
+        y, x = np.mgrid[0:h, 0:w]
+        arr = np.stack([
+            (x * 255 // w),
+            (y * 255 // h),
+            ((x // 40 + y // 40) % 2) * 200 + 20,
+        ], axis=-1).astype(np.uint8)
+        path = os.path.join(directory, name)
+        Image.fromarray(arr).save(path, fmt, quality=90)
+        samples.append(path)
+    return samples
+
+
+def run(path: str, preset: str):
+    img = load_image(path, (DISPLAY_WIDTH, DISPLAY_HEIGHT), preset)
+    frame = process_image(img, DISPLAY_WIDTH, DISPLAY_HEIGHT, preset=preset)
+    return img, frame
+
+
+def psnr(a: Image.Image, b: Image.Image) -> float:
+    diff = np.asarray(a, dtype=np.float64) - np.asarray(b, dtype=np.float64)
+    mse = float(np.mean(diff * diff))
+    return float("inf") if mse == 0 else 10 * math.log10(255 ** 2 / mse)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大图解码/缩放基准")
+    parser.add_argument("files", nargs="*", help="输入图片 (默认生成测试图片)")
+    parser.add_argument("-r", "--repeat", type=int, default=3, help="重复次数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = args.files or make_samples(tmp)
+        print(f"{'file':<16}{'preset':<10}{'ms':>9}{'ms/MP':>8}{'decode MB':>11}{'PSNR dB':>9}")
+        print("-" * 63)
+        for path in files:
+            with Image.open(path) as src:
+                megapixels = src.width * src.height / 1e6
+            _, reference = run(path, "quality")
+            for preset in RESAMPLE_PRESETS:
+                best = float("inf")
+                for _ in range(args.repeat):
+                    t0 = time.perf_counter()
+                    img, frame = run(path, preset)
+                    best = min(best, time.perf_counter() - t0)
+                decoded_mb = img.width * img.height * 3 / 1e6
+                print(f"{os.path.basename(path)[:15]:<16}{preset:<10}{best * 1000:>9.1f}"
+                      f"{best * 1000 / megapixels:>8.2f}{decoded_mb:>11.2f}"
+                      f"{psnr(frame.preview_image, reference.preview_image):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
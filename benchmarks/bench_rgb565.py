@@ -0,0 +1,94 @@
+"""
+RGB565 编码基准 — 逐帧编码 vs 批量编码到连续缓冲区
+
+对比:
+    legacy     原 encode_rgb565_be 实现 (每帧分配通道数组、堆叠后 tobytes)
+    per-frame  当前 encode_rgb565_be (单帧走批量编码路径)
+    batch      encode_rgb565_batch 写入预分配的帧槽位缓冲区 (含工作数组复用)
+
+用法:
+    python benchmarks/bench_rgb565.py                 # 74 帧 (设备容量), 重复 20 次
+    python benchmarks/bench_rgb565.py -n 200 -r 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core.image_processor import (  # noqa: E402
+    DISPLAY_WIDTH, DISPLAY_HEIGHT, FRAME_SLOT_SIZE, MAX_TOTAL_FRAMES,
+    encode_rgb565_be, encode_rgb565_batch,
+)
+
+
+def legacy_encode_rgb565_be(img: Image.Image) -> bytes:
+    """优化前的实现, 作为基准"""
+    arr = np.array(img)
+    r = arr[:, :, 0].astype(np.uint16)
+    g = arr[:, :, 1].astype(np.uint16)
+    b = arr[:, :, 2].astype(np.uint16)
+
+    rgb565 = ((r << 8) & 0xF800) | ((g << 3) & 0x07E0) | (b >> 3)
+
+    high = (rgb565 >> 8).astype(np.uint8)
+    low = (rgb565 & 0xFF).astype(np.uint8)
+
+    return np.stack((high, low), axis=-1).reshape(-1).tobytes()
+
+
+def timeit(fn, repeat: int) -> float:
+    """返回最快一次的耗时 (秒)"""
+    fn()  # 预热
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RGB565 编码基准")
+    parser.add_argument("-n", "--frames", type=int, default=MAX_TOTAL_FRAMES, help="帧数")
+    parser.add_argument("-r", "--repeat", type=int, default=20, help="重复次数")
+    args = parser.parse_args()
+
+    n = args.frames
+    rng = np.random.default_rng(0)
+    stack = rng.integers(0, 256, (n, DISPLAY_HEIGHT, DISPLAY_WIDTH, 3), dtype=np.uint8)
+    images = [Image.fromarray(frame) for frame in stack]
+
+    out = bytearray(n * FRAME_SLOT_SIZE)
+    scratch = np.empty((2, n, DISPLAY_HEIGHT, DISPLAY_WIDTH), dtype=np.uint16)
+    frame_bytes = DISPLAY_WIDTH * DISPLAY_HEIGHT * 2
+
+    # 正确性: 三种实现结果一致
+    expected = [legacy_encode_rgb565_be(img) for img in images]
+    encode_rgb565_batch(stack, out, scratch=scratch)
+    for i in range(n):
+        base = i * FRAME_SLOT_SIZE
+        assert out[base:base + frame_bytes] == expected[i], f"batch 第 {i} 帧不一致"
+        assert encode_rgb565_be(images[i]) == expected[i], f"per-frame 第 {i} 帧不一致"
+
+    results = [
+        ("legacy", timeit(lambda: [legacy_encode_rgb565_be(img) for img in images], args.repeat)),
+        ("per-frame", timeit(lambda: [encode_rgb565_be(img) for img in images], args.repeat)),
+        ("batch", timeit(lambda: encode_rgb565_batch(stack, out, scratch=scratch), args.repeat)),
+    ]
+
+    base_time = results[0][1]
+    print(f"{n} 帧 {DISPLAY_WIDTH}x{DISPLAY_HEIGHT}, 最快 {args.repeat} 次取最小值")
+    print(f"{'impl':<12}{'total ms':>10}{'us/frame':>10}{'speedup':>10}")
+    print("-" * 42)
+    for name, seconds in results:
+        print(f"{name:<12}{seconds * 1000:>10.2f}{seconds / n * 1e6:>10.1f}{base_time / seconds:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
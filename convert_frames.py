@@ -0,0 +1,306 @@
+"""
+帧素材批量转换 — 不启动界面, 把图片/动图目录转换为设备可用的 160x80 RGB565 数据
+
+遍历输入目录 (递归) 中的图片和动图 (PNG/JPEG/BMP/GIF/WebP/APNG), 每个文件由一个
+子进程解码、缩放、编码, 所有 CPU 核心并行处理; 处理方式与配置工具一致, 生成的帧包
+可以直接作为模式的帧包使用。输出目录中的 manifest.json 记录每个输入的内容哈希和
+处理参数, 再次运行时内容和参数都未改变的输入直接跳过; 还记录帧包的 fps 和输入顺序,
+二者改变时即使没有输入需要转换也会重新生成帧包。
+
+输出:
+    OUT/bin/<相对路径>.bin            单张图片的 RGB565 大端数据 (160*80*2 字节)
+    OUT/bin/<相对路径>/<帧号>.bin     动图的每一帧
+    OUT/preview/...png               对应的预览图 (RGB565 还原后的设备显示效果)
+    OUT/<名称>.kbpack                所有帧按输入顺序组成的帧包
+    OUT/manifest.json                内容哈希、处理参数、各输入的输出文件和帧包状态
+
+用法:
+    python convert_frames.py assets/ -o build/frames
+    python convert_frames.py a.gif logos/ -o out -j 4 --preset quality --bg "#202020"
+    python convert_frames.py assets/ -o out --h-align -1 --no-preview --force
+
+选项:
+    -j N            并行进程数 (默认 CPU 核心数)
+    --preset P      缩放预设 fast / balanced / quality
+    --h-align A     水平对齐 -1 左 / 0 居中 / 1 右, --v-align 同理 (上 / 居中 / 下)
+    --bg COLOR      背景色, 如 "#000000"
+    --fps N         帧包中单张图片的显示时长按 1000/N 毫秒计算
+    --pack NAME     帧包文件名 (默认 frames), --no-pack 不生成帧包
+    --no-preview    不写预览图
+    --force         忽略 manifest, 全部重新转换
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Optional
+
+from src.core.image_processor import (
+    DISPLAY_WIDTH, DISPLAY_HEIGHT, MAX_TOTAL_FRAMES, RESAMPLE_PRESETS, DEFAULT_PRESET,
+    ProcessedFrame, count_frames, decode_rgb565_be, iter_animation_frames, load_image,
+    make_frame_ref, process_image,
+)
+from src.core.frame_budget import frame_ms
+from src.core.frame_pack import PACK_SUFFIX, write_pack
+from src.core.frame_cache import file_digest
+
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp", ".apng"}
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+
+def find_inputs(inputs: list[str]) -> list[tuple[str, str]]:
+    """展开输入的文件和目录, 返回 [(绝对路径, 输出用的相对路径)], 按输入顺序、目录内按路径排序"""
+    found = {}
+    for item in inputs:
+        root = os.path.abspath(item)
+        if os.path.isdir(root):
+            for dirpath, dirnames, filenames in os.walk(root):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    if os.path.splitext(name)[1].lower() in IMAGE_SUFFIXES:
+                        path = os.path.join(dirpath, name)
+                        found.setdefault(path, Path(os.path.relpath(path, root)).as_posix())
+        elif os.path.isfile(root):
+            found.setdefault(root, os.path.basename(root))
+        else:
+            raise FileNotFoundError(f"输入不存在: {item}")
+    return list(found.items())
+
+
+def convert_file(path: str, rel: str, out_dir: str, params: dict, write_preview: bool) -> dict:
+    """
+    子进程入口: 转换一个输入文件, 输出文件由子进程直接写出, 只返回元数据。
+    单张图片与配置工具一样经 load_image (JPEG 按目标尺寸 draft 解码),
+    动图顺序解码一遍, 每帧的时长记录在返回的元数据中。
+    """
+    start = time.perf_counter()
+    width, height = DISPLAY_WIDTH, DISPLAY_HEIGHT
+    stem = os.path.splitext(rel)[0]
+    n_frames = count_frames(path)
+    if n_frames == 1:
+        images = [load_image(path, (width, height), params["preset"])]
+    else:
+        images = iter_animation_frames(path)
+
+    frames = []
+    pixels = 0
+    for index, img in enumerate(images):
+        pixels += img.width * img.height
+        frame = process_image(img, width, height, **params)
+        name = stem if n_frames == 1 else f"{stem}/{index:04d}"
+        entry = {
+            "ref": path if n_frames == 1 else make_frame_ref(path, index),
+            "bin": f"bin/{name}.bin",
+            "duration": frame_ms(img.info.get("duration")) if n_frames > 1 else None,
+        }
+        _write(os.path.join(out_dir, entry["bin"]), frame.rgb565_data)
+        if write_preview:
+            entry["preview"] = f"preview/{name}.png"
+            preview = os.path.join(out_dir, entry["preview"])
+            os.makedirs(os.path.dirname(preview), exist_ok=True)
+            frame.preview_image.save(preview)
+        frames.append(entry)
+    return {"frames": frames, "pixels": pixels, "seconds": time.perf_counter() - start}
+
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def _outputs(entry: dict) -> set[str]:
+    files = set()
+    for frame in entry.get("frames", []):
+        files.add(frame["bin"])
+        if frame.get("preview"):
+            files.add(frame["preview"])
+    return files
+
+
+def _remove_outputs(out_dir: str, files):
+    for rel in files:
+        try:
+            os.remove(os.path.join(out_dir, rel))
+        except OSError:
+            pass
+
+
+def load_manifest(out_dir: str) -> tuple[dict, Optional[dict]]:
+    """返回 (各输入的记录, 帧包状态), 帧包状态见 main 中的 pack_state"""
+    try:
+        with open(os.path.join(out_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}, None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}, None
+    return manifest.get("inputs", {}), manifest.get("pack")
+
+
+def save_manifest(out_dir: str, inputs: dict, pack: Optional[dict] = None):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": MANIFEST_VERSION, "inputs": inputs, "pack": pack},
+                  f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def build_pack(out_dir: str, pack_path: str, order: list[str], inputs: dict, fps: int, params: dict) -> int:
+    """按输入顺序把已转换的 .bin 写入帧包 (不重新解码源文件), 返回帧数"""
+    frames = [frame for rel in order if rel in inputs for frame in inputs[rel]["frames"]]
+    still_ms = round(1000 / max(1, fps))
+
+    def processed():
+        for frame in frames:
+            with open(os.path.join(out_dir, frame["bin"]), "rb") as f:
+                data = f.read()
+            yield ProcessedFrame(
+                rgb565_data=data,
+                preview_image=decode_rgb565_be(data, DISPLAY_WIDTH, DISPLAY_HEIGHT),
+            )
+
+    write_pack(
+        pack_path,
+        [frame["ref"] for frame in frames],
+        processed(),
+        [frame["duration"] or still_ms for frame in frames],
+        fps,
+        params,
+    )
+    return len(frames)
+
+
+def parse_color(text: str) -> tuple[int, int, int]:
+    value = text.strip().lstrip("#")
+    if len(value) != 6:
+        raise argparse.ArgumentTypeError(f"颜色格式应为 #RRGGBB: {text}")
+    try:
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"颜色格式应为 #RRGGBB: {text}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="批量把图片/动图转换为设备 RGB565 帧数据")
+    parser.add_argument("inputs", nargs="+", help="输入文件或目录")
+    parser.add_argument("-o", "--output", required=True, help="输出目录")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="并行进程数")
+    parser.add_argument("--preset", choices=sorted(RESAMPLE_PRESETS), default=DEFAULT_PRESET)
+    parser.add_argument("--h-align", type=int, choices=(-1, 0, 1), default=0)
+    parser.add_argument("--v-align", type=int, choices=(-1, 0, 1), default=0)
+    parser.add_argument("--bg", type=parse_color, default=(0, 0, 0), help="背景色 #RRGGBB")
+    parser.add_argument("--fps", type=int, default=10, help="单张图片在帧包中的播放帧率")
+    parser.add_argument("--pack", default="frames", help="帧包文件名 (不含扩展名)")
+    parser.add_argument("--no-pack", action="store_true", help="不生成帧包")
+    parser.add_argument("--no-preview", action="store_true", help="不写预览图")
+    parser.add_argument("--force", action="store_true", help="忽略 manifest, 全部重新转换")
+    args = parser.parse_args(argv)
+
+    out_dir = os.path.abspath(args.output)
+    os.makedirs(out_dir, exist_ok=True)
+    # 与 DisplayMode.frame_params() 相同, 帧包在配置工具中才会被视为与源文件等价
+    params = {"h_align": args.h_align, "v_align": args.v_align,
+              "bg_color": tuple(args.bg), "preset": args.preset}
+    stored_params = json.loads(json.dumps(params))
+    write_preview = not args.no_preview
+    jobs = max(1, args.jobs)
+
+    try:
+        sources = find_inputs(args.inputs)
+    except FileNotFoundError as e:
+        print(e, file=sys.stderr)
+        return 2
+
+    wall_start = time.perf_counter()
+    previous, previous_pack = load_manifest(out_dir)
+    manifest = {}
+    tasks = []
+    for path, rel in sources:
+        digest = file_digest(path)
+        entry = previous.get(rel)
+        if (not args.force and entry is not None
+                and entry.get("source") == path and entry.get("digest") == digest
+                and entry.get("params") == stored_params
+                and (not write_preview or all(f.get("preview") for f in entry["frames"]))
+                and all(os.path.exists(os.path.join(out_dir, f)) for f in _outputs(entry))):
+            manifest[rel] = entry
+        else:
+            tasks.append((path, rel, digest))
+    skipped = len(manifest)
+
+    # 不再存在的输入: 删除它们的输出
+    current = {rel for _, rel in sources}
+    removed = [rel for rel in previous if rel not in current]
+    for rel in removed:
+        _remove_outputs(out_dir, _outputs(previous[rel]))
+
+    failed = []
+    frame_count = 0
+    pixels = 0
+    written = 0
+    cpu_seconds = 0.0
+    try:
+        if tasks:
+            with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as executor:
+                futures = {
+                    executor.submit(convert_file, path, rel, out_dir, params, write_preview): (path, rel, digest)
+                    for path, rel, digest in tasks
+                }
+                for done, future in enumerate(as_completed(futures), 1):
+                    path, rel, digest = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        failed.append(rel)
+                        print(f"[{done}/{len(tasks)}] 失败 {rel}: {e}", file=sys.stderr)
+                        continue
+                    entry = {"source": path, "digest": digest, "params": stored_params,
+                             "frames": result["frames"]}
+                    if rel in previous:
+                        _remove_outputs(out_dir, _outputs(previous[rel]) - _outputs(entry))
+                    manifest[rel] = entry
+                    frame_count += len(result["frames"])
+                    pixels += result["pixels"]
+                    written += sum(os.path.getsize(os.path.join(out_dir, f)) for f in _outputs(entry))
+                    cpu_seconds += result["seconds"]
+                    print(f"[{done}/{len(tasks)}] {rel}: {len(result['frames'])} 帧")
+    finally:
+        # 中断时也保存已完成的部分, 下次运行跳过它们; 有输入改变时帧包状态作废
+        save_manifest(out_dir, manifest, None if tasks or removed else previous_pack)
+
+    pack_frames = 0
+    if not args.no_pack:
+        pack_path = os.path.join(out_dir, args.pack + PACK_SUFFIX)
+        order = [rel for _, rel in sources if rel in manifest]
+        pack_state = {"file": os.path.basename(pack_path), "fps": args.fps, "order": order}
+        if tasks or removed or pack_state != previous_pack or not os.path.exists(pack_path):
+            pack_frames = build_pack(out_dir, pack_path, order, manifest, args.fps, params)
+            save_manifest(out_dir, manifest, pack_state)
+            print(f"帧包: {pack_path} ({pack_frames} 帧)")
+            if pack_frames > MAX_TOTAL_FRAMES:
+                print(f"  超过设备容量 {MAX_TOTAL_FRAMES} 帧, 上传时会按容量重采样")
+        else:
+            print(f"帧包: {pack_path} (未改变)")
+
+    wall = time.perf_counter() - wall_start
+    print(f"输入 {len(sources)} 个文件: 转换 {len(tasks) - len(failed)}, "
+          f"跳过 {skipped} (未改变), 失败 {len(failed)}")
+    print(f"转换 {frame_count} 帧, 源图像 {pixels / 1e6:.1f} MP, 写出 {written / 1e6:.1f} MB")
+    if tasks and wall > 0:
+        workers = min(jobs, len(tasks))
+        print(f"耗时 {wall:.2f} s ({workers} 进程): {frame_count / wall:.1f} 帧/s, "
+              f"{pixels / 1e6 / wall:.1f} MP/s, 并行效率 {cpu_seconds / (wall * workers):.0%}")
+    else:
+        print(f"耗时 {wall:.2f} s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
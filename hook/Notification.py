@@ -5,21 +5,16 @@ import os
 def run():
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from UdpLog import UdpLog
+    import hook_timing
 
     log = UdpLog(tag="notification")
 
-    from ble_command_send import ClaudeState, send_new_state
-    try:
-        ret = send_new_state(ClaudeState.CL_Notification)
-        if ret is not None:
-            if (ret['SwitchState']==0): # auto mode
-                pass
-    except Exception as e:
-        log.error(f"error: {e}")
-
+    data = {}
     try:
-        raw = sys.stdin.read()
-        data = json.loads(raw)
+        with hook_timing.span("stdin"):
+            raw = sys.stdin.read()
+            data = json.loads(raw)
+        UdpLog.set_session(data.get("session_id"))
 
         notification_type = data.get("type", "")
         message = data.get("message", "")
@@ -32,4 +27,13 @@ def run():
     except Exception as e:
         log.error(f"Notification hook error: {e}")
 
+    from ble_command_send import ClaudeState, send_new_state
+    try:
+        ret = send_new_state(ClaudeState.CL_Notification, data.get("session_id"), data.get("transcript_path"))
+        if ret is not None:
+            if (ret['SwitchState']==0): # auto mode
+                pass
+    except Exception as e:
+        log.error(f"error: {e}")
+
     sys.exit(0)
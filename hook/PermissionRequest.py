@@ -6,67 +6,46 @@ def run():
 
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from UdpLog import UdpLog
+    import hook_timing
+    from stdin_extract import read_hook_input
 
     log = UdpLog(tag="permission")
 
-    auto_permit=False
-    from ble_command_send import ClaudeState, send_new_state
+    data = {}
     try:
-        ret = send_new_state(ClaudeState.CL_PermissionRequest)
-        if ret is not None:
-            if (ret['SwitchState']==0): # auto mode
-                auto_permit=True
-    except Exception as e:
-        log.error(f"error: {e}")
-
-
-    try:
-        # raw = sys.stdin.read()
-        raw = '''{
-    "session_id": "abc123",
-    "transcript_path": "/Users/.../.claude/projects/.../00893aaf-19fa-41d2-8238-13269b9b3ca0.jsonl",
-    "cwd": "/Users/...",
-    "permission_mode": "default",
-    "hook_event_name": "PermissionRequest",
-    "tool_name": "Bash",
-    "tool_input": {
-        "command": "rm -rf node_modules",
-        "description": "Remove node_modules directory"
-    },
-    "permission_suggestions": [
-        { "type": "toolAlwaysAllow", "tool": "Bash" }
-    ]
-    }'''
-        data = json.loads(raw)
+        with hook_timing.span("stdin"):
+            data = read_hook_input(previews={"tool_input": 200})
+        UdpLog.set_session(data.get("session_id"))
 
         tool_name = data.get("tool_name", "Unknown")
-        tool_input = data.get("tool_input", {})
+        tool_input = data.get("tool_input", "")
 
         log.info(f"Permission requested for tool: {tool_name}")
-
-        log.info(f"User decision: {auto_permit}")
-
-
+        log.info(f"  input: {tool_input}")
     except Exception as e:
         log.error(f"PermissionRequest hook error: {e}")
 
-    if True == auto_permit:
-        output = {
-            "hookSpecificOutput": {
-                "hookEventName": "PermissionRequest",
-                "decision": {
-                    "behavior": "allow"
-                }
-            }
-        }
+    # 阻塞等待键盘按键审批 (设备主动上报, 无轮询); 无设备或超时交给终端询问
+    from ble_command_send import request_permission_decision
+    decision = None
+    try:
+        decision = request_permission_decision(data.get("session_id"), data.get("transcript_path"))
+    except Exception as e:
+        log.error(f"error: {e}")
+
+    log.info(f"User decision: {decision}")
+
+    if decision == "allow":
+        behavior = {"behavior": "allow"}
+    elif decision == "deny":
+        behavior = {"behavior": "deny", "message": "Denied from keyboard"}
     else:
-        output = {
-            "hookSpecificOutput": {
-                "hookEventName": "PermissionRequest",
-                "decision": {
-                    "behavior": "ask"
-                }
-            }
+        behavior = {"behavior": "ask"}
+    output = {
+        "hookSpecificOutput": {
+            "hookEventName": "PermissionRequest",
+            "decision": behavior
         }
+    }
     print(json.dumps(output))
     sys.exit(0)
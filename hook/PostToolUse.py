@@ -1,35 +1,48 @@
 import sys
-import json
 import os
 
 def run():
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from UdpLog import UdpLog
+    import hook_timing
+    from stdin_extract import read_hook_input
 
     log = UdpLog(tag="post-tool")
-    from ble_command_send import ClaudeState, send_new_state
+    data = {}
     try:
-        ret = send_new_state(ClaudeState.CL_PostToolUse)
-        if ret is not None:
-            if (ret['SwitchState']==0): # auto mode
-                pass
-    except Exception as e:
-        log.error(f"error: {e}")
-
-    try:
-        raw = sys.stdin.read()
-        data = json.loads(raw)
+        with hook_timing.span("stdin"):
+            # 工具输出可能有数 MB, 只取预览, 不整体解析
+            data = read_hook_input(previews={"tool_response": 300, "tool_result": 300})
+        UdpLog.set_session(data.get("session_id"))
 
         tool_name = data.get("tool_name", "")
-        tool_result = data.get("tool_result", "")
-
-        result_str = str(tool_result)
-        if len(result_str) > 300:
-            result_str = result_str[:300] + "..."
+        result_str = data.get("tool_response", data.get("tool_result", ""))
 
         log.info(f"<<< {tool_name} done")
         log.info(f"  result: {result_str}")
     except Exception as e:
         log.error(f"PostToolUse hook error: {e}")
 
+    # 安装时配置了采样 (--sample N) 则只处理部分调用
+    import hook_sampling
+    if not hook_sampling.keep(data):
+        sys.exit(0)
+
+    # 工具耗时统计: Pre/Post 按 tool_use_id 配对
+    try:
+        with hook_timing.span("tool_timing"):
+            from tool_timing import record_hook_event
+            record_hook_event("PostToolUse", data)
+    except Exception as e:
+        log.error(f"tool timing error: {e}")
+
+    from ble_command_send import ClaudeState, send_new_state
+    try:
+        ret = send_new_state(ClaudeState.CL_PostToolUse, data.get("session_id"), data.get("transcript_path"))
+        if ret is not None:
+            if (ret['SwitchState']==0): # auto mode
+                pass
+    except Exception as e:
+        log.error(f"error: {e}")
+
     sys.exit(0)
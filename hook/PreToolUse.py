@@ -1,36 +1,48 @@
 import sys
-import json
 import os
 def run():
 
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from UdpLog import UdpLog
+    import hook_timing
+    from stdin_extract import read_hook_input
 
     log = UdpLog(tag="pre-tool")
-    from ble_command_send import ClaudeState, send_new_state
-    try:
-        ret = send_new_state(ClaudeState.CL_PreToolUse)
-        if ret is not None:
-            if (ret['SwitchState']==0): # auto mode
-                pass
-    except Exception as e:
-        log.error(f"error: {e}")
-
+    data = {}
     try:
-        raw = sys.stdin.read()
-        data = json.loads(raw)
+        with hook_timing.span("stdin"):
+            # tool_input 可能很大 (如 Write 的文件内容), 只取预览
+            data = read_hook_input(previews={"tool_input": 200})
+        UdpLog.set_session(data.get("session_id"))
 
         tool_name = data.get("tool_name", "")
-        tool_input = data.get("tool_input", {})
+        tool_input = data.get("tool_input", "")
 
         log.info(f">>> {tool_name}")
-        if isinstance(tool_input, dict):
-            for key, value in tool_input.items():
-                val_str = str(value)
-                if len(val_str) > 200:
-                    val_str = val_str[:200] + "..."
-                log.info(f"  {key}: {val_str}")
+        log.info(f"  input: {tool_input}")
     except Exception as e:
         log.error(f"PreToolUse hook error: {e}")
 
+    # 安装时配置了采样 (--sample N) 则只处理部分调用
+    import hook_sampling
+    if not hook_sampling.keep(data):
+        sys.exit(0)
+
+    # 工具耗时统计: Pre/Post 按 tool_use_id 配对
+    try:
+        with hook_timing.span("tool_timing"):
+            from tool_timing import record_hook_event
+            record_hook_event("PreToolUse", data)
+    except Exception as e:
+        log.error(f"tool timing error: {e}")
+
+    from ble_command_send import ClaudeState, send_new_state
+    try:
+        ret = send_new_state(ClaudeState.CL_PreToolUse, data.get("session_id"), data.get("transcript_path"))
+        if ret is not None:
+            if (ret['SwitchState']==0): # auto mode
+                pass
+    except Exception as e:
+        log.error(f"error: {e}")
+
     sys.exit(0)
@@ -5,20 +5,15 @@ def run():
 
     sys.path.append(os.path.dirname(os.path.abspath(__file__)))
     from UdpLog import UdpLog
+    import hook_timing
 
     log = UdpLog(tag="task-done")
-    from ble_command_send import ClaudeState, send_new_state
-    try:
-        ret = send_new_state(ClaudeState.CL_TaskCompleted)
-        if ret is not None:
-            if (ret['SwitchState']==0): # auto mode
-                pass
-    except Exception as e:
-        log.error(f"error: {e}")
-
+    data = {}
     try:
-        raw = sys.stdin.read()
-        data = json.loads(raw)
+        with hook_timing.span("stdin"):
+            raw = sys.stdin.read()
+            data = json.loads(raw)
+        UdpLog.set_session(data.get("session_id"))
 
         session_id = data.get("session_id", "")
         cwd = data.get("cwd", "")
@@ -31,4 +26,13 @@ def run():
     except Exception as e:
         log.error(f"TaskCompleted hook error: {e}")
 
+    from ble_command_send import ClaudeState, send_new_state
+    try:
+        ret = send_new_state(ClaudeState.CL_TaskCompleted, data.get("session_id"), data.get("transcript_path"))
+        if ret is not None:
+            if (ret['SwitchState']==0): # auto mode
+                pass
+    except Exception as e:
+        log.error(f"error: {e}")
+
     sys.exit(0)
@@ -1,38 +1,185 @@
+import atexit
+import json
+import os
 import socket
 import time
 
 
+class _UdpSink:
+    """
+    进程内共享的日志出口。
+
+    - socket 在第一次发送时才创建, 整个进程只用一个
+    - 多行日志合并为一个数据报 (超过 MAX_DATAGRAM、距首行超过 FLUSH_INTERVAL、
+      出现 ERROR 或进程退出时发送)
+    - UDP 发送失败或被禁用时, 若配置了 log_file 则以 JSONL 追加到本地文件
+    - 设置了会话 id 时每行带会话字段: "[ts][tag][level][session] msg"
+    """
+
+    MAX_DATAGRAM = 8192
+    FLUSH_INTERVAL = 0.5
+
+    def __init__(self, host, port, log_file=None, udp_enabled=True):
+        self.host = host
+        self.port = port
+        self.log_file = log_file
+        self.udp_enabled = udp_enabled
+        self._sock = None
+        self._lines = []
+        self._records = []
+        self._size = 0
+        self._first_ts = 0.0
+        self._ts_second = None
+        self._ts_text = ""
+
+    def timestamp(self, now: float) -> str:
+        second = int(now)
+        if second != self._ts_second:
+            self._ts_second = second
+            self._ts_text = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))
+        return self._ts_text
+
+    def write(self, now: float, tag: str, level: str, msg: str, session: str = ""):
+        field = f"[{session}]" if session else ""
+        line = f"[{self.timestamp(now)}][{tag}][{level}]{field} {msg}\n"
+        if not self._lines:
+            self._first_ts = now
+        self._lines.append(line)
+        self._records.append((now, tag, level, msg, session))
+        self._size += len(line)
+        if (self._size >= self.MAX_DATAGRAM or level == UdpLog.LEVEL_ERROR
+                or now - self._first_ts >= self.FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        if not self._lines:
+            return
+        lines, records = self._lines, self._records
+        self._lines, self._records, self._size = [], [], 0
+
+        if self.udp_enabled:
+            try:
+                self._send_datagrams(lines)
+                return
+            except OSError:
+                pass
+        self._write_file(records)
+
+    def _send_datagrams(self, lines):
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        batch, size = [], 0
+        for line in lines:
+            data = line.encode("utf-8")
+            if batch and size + len(data) > self.MAX_DATAGRAM:
+                self._sock.sendto(b"".join(batch), (self.host, self.port))
+                batch, size = [], 0
+            batch.append(data[:self.MAX_DATAGRAM])
+            size += len(batch[-1])
+        if batch:
+            self._sock.sendto(b"".join(batch), (self.host, self.port))
+
+    def _write_file(self, records):
+        if not self.log_file:
+            return
+        try:
+            with open(self.log_file, "a", encoding="utf-8") as f:
+                for ts, tag, level, msg, session in records:
+                    f.write(json.dumps({
+                        "ts": ts, "pid": os.getpid(), "tag": tag,
+                        "level": level, "session": session, "msg": msg,
+                    }, ensure_ascii=False) + "\n")
+        except OSError:
+            pass
+
+    def close(self):
+        self.flush()
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+
 class UdpLog:
-    """Simple UDP logger that sends log messages to a remote receiver."""
+    """
+    UDP logger that sends log messages to a remote receiver.
+
+    环境变量:
+        KB_HOOK_LOG_LEVEL  最低输出级别 DEBUG/INFO/WARN/ERROR/OFF (默认 INFO)
+        KB_HOOK_LOG_UDP    设为 0 时不发送 UDP
+        KB_HOOK_LOG_FILE   本地 JSONL 备用文件 (UDP 禁用或发送失败时写入)
+    """
 
     LEVEL_DEBUG = "DEBUG"
     LEVEL_INFO = "INFO"
     LEVEL_WARN = "WARN"
     LEVEL_ERROR = "ERROR"
 
-    def __init__(self, host="127.0.0.1", port=9999, tag="APP"):
-        self._host = host
-        self._port = port
+    LEVELS = {"DEBUG": 10, "INFO": 20, "WARN": 30, "ERROR": 40, "OFF": 100}
+
+    _sinks = {}
+    _session = ""   # 本进程处理的会话 id, 附加到之后的每条日志
+
+    def __init__(self, host="127.0.0.1", port=9999, tag="APP", level=None):
         self._tag = tag
-        # self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if level is None:
+            level = os.environ.get("KB_HOOK_LOG_LEVEL", self.LEVEL_INFO)
+        self._level = self.LEVELS.get(str(level).upper(), self.LEVELS[self.LEVEL_INFO])
+        self._sink = self._get_sink(host, port)
 
-    def _send(self, level, msg):
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
-        line = f"[{timestamp}][{self._tag}][{level}] {msg}\n"
-        # self._sock.sendto(line.encode("utf-8"), (self._host, self._port))
+    @classmethod
+    def _get_sink(cls, host, port) -> _UdpSink:
+        sink = cls._sinks.get((host, port))
+        if sink is None:
+            sink = _UdpSink(
+                host, port,
+                log_file=os.environ.get("KB_HOOK_LOG_FILE") or None,
+                udp_enabled=os.environ.get("KB_HOOK_LOG_UDP", "1") != "0",
+            )
+            cls._sinks[(host, port)] = sink
+        return sink
 
-    def debug(self, msg):
-        self._send(self.LEVEL_DEBUG, msg)
+    @classmethod
+    def set_session(cls, session_id):
+        """设置会话 id (hook 读取 stdin 后调用), 本进程所有 UdpLog 之后的日志都带该字段"""
+        # 会话字段以 "]" 结束, 去掉其中的括号和空白
+        cls._session = "".join(c for c in str(session_id or "") if c not in "[] \t\r\n")
 
-    def info(self, msg):
-        self._send(self.LEVEL_INFO, msg)
+    def enabled(self, level) -> bool:
+        """判断某级别是否会输出, 可在拼接昂贵的日志内容前调用"""
+        return self.LEVELS[level] >= self._level
 
-    def warn(self, msg):
-        self._send(self.LEVEL_WARN, msg)
+    def _send(self, level, msg, args):
+        if args:
+            msg = msg % args
+        self._sink.write(time.time(), self._tag, level, msg, UdpLog._session)
 
-    def error(self, msg):
-        self._send(self.LEVEL_ERROR, msg)
+    def debug(self, msg, *args):
+        if self._level <= 10:
+            self._send(self.LEVEL_DEBUG, msg, args)
+
+    def info(self, msg, *args):
+        if self._level <= 20:
+            self._send(self.LEVEL_INFO, msg, args)
+
+    def warn(self, msg, *args):
+        if self._level <= 30:
+            self._send(self.LEVEL_WARN, msg, args)
+
+    def error(self, msg, *args):
+        if self._level <= 40:
+            self._send(self.LEVEL_ERROR, msg, args)
+
+    def flush(self):
+        self._sink.flush()
 
     def close(self):
-        self._sock.close()
+        self._sink.close()
+
 
+@atexit.register
+def _flush_all():
+    for sink in UdpLog._sinks.values():
+        try:
+            sink.close()
+        except OSError:
+            pass
@@ -234,7 +234,15 @@ class DeviceCmd(IntEnum):
     WRITE_RESULT  = 0x81      # 数据写结果
 
     UPDATE_PIC = 0x82      # 图片数据更新
-    UPDATE_STATE = 0x90      # 更新 claude code 运行状态
+    UPDATE_STATE = 0x90      # 更新 claude code 运行状态; PermissionRequest 附带 u32 请求令牌
+    KEY_DECISION = 0x91      # 设备主动上报: 按键审批结果, data[0] 1=允许 0=拒绝, data[1:5] 回显请求令牌
+    UPDATE_STATS = 0x92      # 推送统计摘要, 无应答; data[0] 为 StatsKind, 其后为对应格式的数据
+
+
+class StatsKind(IntEnum):
+    """UPDATE_STATS 的数据类型"""
+    TOOL_TIMING = 0x01   # 工具耗时摘要, 见 tool_timing.pack_summary
+    SESSION = 0x02       # 当前会话统计, 见 transcript_tail.pack_stats
 
 
 
@@ -255,6 +263,9 @@ class DeviceService:
         self._resp_payload = None
         self._devices_state = None
         self._devices_info = None
+        self._decision_event = threading.Event()
+        self._decision = None
+        self._decision_token = None
 
         self.tcp.on_packet = self._on_packet
 
@@ -281,6 +292,15 @@ class DeviceService:
 
         cmd_type, payload = parsed
 
+        # 按键审批是设备主动上报, 不作为命令响应
+        # 只接受回显了本次请求令牌的上报: 其他会话的审批或旧提示上的按键都被忽略
+        if cmd_type == DeviceCmd.KEY_DECISION:
+            if (self._decision_token is not None and len(payload) >= 5
+                    and struct.unpack_from("<I", payload, 1)[0] == self._decision_token):
+                self._decision = bool(payload[0])
+                self._decision_event.set()
+            return
+
         self._resp_type = cmd_type
         self._resp_payload = payload
         self._resp_event.set()
@@ -393,6 +413,21 @@ class DeviceService:
 
         return True
     
+    def expect_decision(self, token: int):
+        """发送审批请求之前调用, 之后只接受回显 token 的按键上报"""
+        self._decision_event.clear()
+        self._decision = None
+        self._decision_token = token
+
+    def wait_key_decision(self, timeout):
+        """
+        等待键盘上的审批按键 (需先调用 expect_decision), 返回 "allow" / "deny", 超时返回 None。
+        回调线程收到上报后立即唤醒, 无轮询。
+        """
+        if not self._decision_event.wait(timeout):
+            return None
+        return "allow" if self._decision else "deny"
+
     def update_pic(self, mode, start, len, fps=10,time_delay=None):
         if time_delay is None:
             time_delay = int(1000/fps)
@@ -422,9 +457,14 @@ def is_port_open(host, port, timeout=0.3):
 
 DEFAULT_CONFIG = {
     "server_ip": "127.0.0.1",
-    "server_port": 9000
+    "server_port": 9000,
+    "state_max_rate": 5,        # 非优先状态每秒最多更新次数
+    "session_timeout": 600,     # 会话无事件超过该秒数视为已结束
+    "permission_wait": 55,      # 等待键盘审批的秒数 (需小于 hook 超时 60s)
+    "push_stats": False,        # 随状态推送会话统计 (UPDATE_STATS), 固件支持 0x92 时才开启
 }
 from UdpLog import UdpLog
+import hook_timing
 
 def is_frozen():
     """判断当前是否为 PyInstaller 打包的可执行程序。"""
@@ -439,19 +479,32 @@ def get_self_path() -> str:
         return os.path.abspath(__file__)
 
 
-def load_config():
+def get_data_dir() -> str:
+    """
+    hook 配置和状态文件所在目录。
+    默认为程序自身所在目录, 可通过环境变量 KB_HOOK_DATA_DIR 覆盖 (压测时隔离用)。
+    """
+    return os.environ.get("KB_HOOK_DATA_DIR") or os.path.dirname(get_self_path())
+
+
+def load_config_dict() -> dict:
+    with hook_timing.span("config"):
+        return _load_config_dict()
+
+
+def _load_config_dict() -> dict:
     log = UdpLog(tag="dist")
     # 获取当前脚本所在目录
-    base_dir = os.path.dirname(get_self_path())
+    base_dir = get_data_dir()
     config_path = os.path.join(base_dir, "config_client.json")
-    log.info(config_path)
+    log.debug(config_path)
 
     # 如果文件不存在，创建默认配置
     if not os.path.exists(config_path):
         with open(config_path, "w", encoding="utf-8") as f:
             json.dump(DEFAULT_CONFIG, f, indent=4)
         # print("未找到 config.json，已创建默认配置")
-        return DEFAULT_CONFIG["server_ip"], DEFAULT_CONFIG["server_port"]
+        return dict(DEFAULT_CONFIG)
 
     # 文件存在，尝试读取
     try:
@@ -470,7 +523,7 @@ def load_config():
             with open(config_path, "w", encoding="utf-8") as f:
                 json.dump(config, f, indent=4)
 
-        return config["server_ip"], config["server_port"]
+        return config
 
     except (json.JSONDecodeError, OSError):
         # 文件损坏，重建
@@ -478,24 +531,137 @@ def load_config():
         with open(config_path, "w", encoding="utf-8") as f:
             json.dump(DEFAULT_CONFIG, f, indent=4)
 
-        return DEFAULT_CONFIG["server_ip"], DEFAULT_CONFIG["server_port"]
+        return dict(DEFAULT_CONFIG)
+
+
+def load_config():
+    config = load_config_dict()
+    return config["server_ip"], config["server_port"]
+
 
+def update_transcript_stats(session_id, transcript_path):
+    """增量读取会话记录并更新统计, 失败时返回 None (不影响状态推送)"""
+    from transcript_tail import TranscriptTailer
 
-def send_new_state(state):
-    ip, port = load_config()
-    if is_port_open(ip, port):
-        bridge = TcpClient() 
+    with hook_timing.span("transcript"):
+        try:
+            tailer = TranscriptTailer(os.path.join(get_data_dir(), "transcripts"))
+            return tailer.update(session_id, transcript_path)
+        except (OSError, ValueError) as e:
+            UdpLog(tag="transcript").warn(f"transcript stats failed: {e}")
+            return None
+
+
+def _push_session_stats(device, state_path, stats):
+    """
+    随状态推送本会话的统计 (轮数、工具调用、错误、时长)。
+    只有计数变化时才推送 (时长单独变化不推送), 避免每个事件都多一次 BLE 写入。
+    """
+    from hook_state import SharedState
+    from transcript_tail import pack_stats
+
+    counters = [stats["turns"], stats["tool_calls"], stats["errors"]]
+    store = SharedState(state_path)
+    if store.load().get("stats_sent") == counters:
+        return
+    device.send_command(DeviceCmd.UPDATE_STATS,
+                        bytes([StatsKind.SESSION]) + pack_stats(stats), have_ret=False)
+    try:
+        with store as data:
+            data["stats_sent"] = counters
+    except OSError:
+        pass
+
+
+def _send_state(state, session_id=None, transcript_path=None, decision_token=None):
+    """
+    发送状态, 返回 (device, info); 未发送或设备不是目标设备时 device 为 None。
+    decision_token 不为 None 时随状态发送, 设备在 KEY_DECISION 中回显它。
+    """
+    from session_aggregator import SessionAggregator
+    from state_scheduler import StateScheduler, PRIORITY_STATES
+
+    config = load_config_dict()
+    ip, port = config["server_ip"], config["server_port"]
+    state_path = os.path.join(get_data_dir(), "hook_state.json")
+
+    stats = None
+    if transcript_path:
+        stats = update_transcript_stats(session_id, transcript_path)
+
+    scheduler = None
+    try:
+        # 多会话聚合: 只推送所有会话中最需要关注的状态
+        aggregator = SessionAggregator(state_path, config["session_timeout"])
+        shown = aggregator.update(session_id, state)
+
+        # 去重/限速: 重复或过密的中间状态直接丢弃, 不等待
+        # 只有本事件自身就是被显示的优先状态时才插队
+        scheduler = StateScheduler(state_path, max_rate=config["state_max_rate"])
+        allowed = scheduler.acquire(
+            shown, priority=(shown == state and state in PRIORITY_STATES)
+        )
+        state = shown
+    except OSError:
+        allowed = True  # 状态文件不可用时退化为直接发送
+    if not allowed:
+        return None, None
+
+    with hook_timing.span("connect"):
+        if not is_port_open(ip, port):
+            return None, None
+        bridge = TcpClient()
         bridge.connect(ip, port)
+
+    with hook_timing.span("device"):
         device = DeviceService(bridge)
-        cmd_data = struct.pack("<B", state)
+        if decision_token is None:
+            cmd_data = struct.pack("<B", state)
+        else:
+            # 先登记令牌再发送, 发送之前到达的按键上报一律忽略
+            device.expect_decision(decision_token)
+            cmd_data = struct.pack("<BI", state, decision_token)
         device.send_command(DeviceCmd.UPDATE_STATE, cmd_data, have_ret=False)
+        if scheduler is not None:
+            try:
+                scheduler.commit(state)
+            except OSError:
+                pass
+        if stats and config["push_stats"]:
+            _push_session_stats(device, state_path, stats)
         ret = device.query_devices_state()
         if ret["is_target"]:
             # print("yes")
-            return device.query_devices_info()
+            return device, device.query_devices_info()
         else:
-            return None
-    return None
+            bridge.disconnect()
+            return None, None
+
+
+def send_new_state(state, session_id=None, transcript_path=None):
+    device, info = _send_state(state, session_id, transcript_path)
+    if device is not None:
+        device.tcp.disconnect()
+    return info
+
+
+def request_permission_decision(session_id=None, transcript_path=None):
+    """
+    推送 PermissionRequest 状态并等待键盘审批。
+    返回 "allow" / "deny"; 设备不可用或超时返回 None (交给终端询问)。
+    """
+    token = int.from_bytes(os.urandom(4), "little") or 1
+    device, info = _send_state(ClaudeState.CL_PermissionRequest, session_id, transcript_path,
+                               decision_token=token)
+    if device is None:
+        return None
+    try:
+        if info.get("SwitchState") == 0:  # auto mode
+            return "allow"
+        with hook_timing.span("decision"):
+            return device.wait_key_decision(load_config_dict()["permission_wait"])
+    finally:
+        device.tcp.disconnect()
 
     # b = decode_rgb565(img)
     # device.write_large_data(0, data)
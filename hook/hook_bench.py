@@ -0,0 +1,338 @@
+"""
+Hook 端到端延迟压测 — 统计 hook 给每次 Claude 工具调用增加的耗时
+
+以可配置的并发度和速率, 把 hook stdin 负载逐个喂给 `hook_install.py <Event>`,
+桥接程序由本地的模拟桥接器代替。hook 进程通过 hook_timing 打点,
+最终按事件输出各阶段 p50/p99 延迟:
+    start    进程启动 (创建进程 -> hook_install 第一行)
+    imports  模块导入
+    config   读取 config_client.json
+    connect  探测端口 + TCP 连接
+    device   设备往返 (UPDATE_STATE + 状态/信息查询)
+    decision PermissionRequest 等待按键审批 (模拟器在 --key-delay 后上报 "允许")
+    stdin    读取并解析 stdin
+    total    总墙钟时间
+
+用法:
+    python hook_bench.py                               # 9 个事件各 20 次, 串行
+    python hook_bench.py -n 50 -c 8 --rate 20          # 8 并发, 总速率 20 次/秒
+    python hook_bench.py --events PreToolUse,PostToolUse
+    python hook_bench.py --payloads recorded.jsonl     # 回放录制的 stdin (每行一个 JSON)
+    python hook_bench.py --bridge-delay 30             # 模拟每次设备往返 30ms
+    python hook_bench.py --key-delay 200               # 模拟 200ms 后按下审批键
+    python hook_bench.py --exe dist/hook_install.exe   # 测试打包后的程序
+"""
+
+import argparse
+import json
+import math
+import os
+import shutil
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ble_command_send import (
+    PKT_WRITE_CMD, PKT_QUERY_STATUS, PKT_QUERY_INFO,
+    PKT_BLE_NOTIFY, PKT_STATUS_RESP, PKT_INFO_RESP,
+    DeviceCmd, ClaudeState, build_frame,
+)
+from hook_install import HOOK_EVENTS
+
+PHASES = ["start", "imports", "config", "connect", "device", "decision", "stdin", "total"]
+
+
+# ============================================================
+# 模拟桥接器
+# ============================================================
+class FakeBridge:
+    """最小的 BLE-TCP 桥接器替身: 应答状态/信息查询和设备命令, 并模拟按键审批"""
+
+    def __init__(self, delay: float = 0.0, key_delay: float = 0.05):
+        self._delay = delay
+        self._key_delay = key_delay
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(("127.0.0.1", 0))
+        self._server.listen(128)
+        self.port = self._server.getsockname()[1]
+        self._stop = False
+
+    def start(self):
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+
+    def stop(self):
+        self._stop = True
+        self._server.close()
+
+    def _accept_loop(self):
+        while not self._stop:
+            try:
+                conn, _ = self._server.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn: socket.socket):
+        with conn:
+            try:
+                while True:
+                    header = self._recv_exact(conn, 3)
+                    if header is None:
+                        return
+                    length = struct.unpack_from("<H", header, 1)[0]
+                    data = self._recv_exact(conn, length) if length else b""
+                    if data is None:
+                        return
+                    if self._is_permission_state(header[0], data):
+                        self._press_key_later(conn, data[4:8])
+                    reply = self._handle(header[0], data)
+                    if reply is not None:
+                        if self._delay:
+                            time.sleep(self._delay)
+                        pkt_type, payload = reply
+                        conn.sendall(struct.pack("<BH", pkt_type, len(payload)) + payload)
+            except OSError:
+                return
+
+    @staticmethod
+    def _is_permission_state(pkt_type: int, data: bytes) -> bool:
+        return (pkt_type == PKT_WRITE_CMD and len(data) >= 4
+                and data[2] == DeviceCmd.UPDATE_STATE
+                and data[3] == ClaudeState.CL_PermissionRequest)
+
+    def _press_key_later(self, conn: socket.socket, token: bytes):
+        """key_delay 秒后上报一次 "允许" 按键, 回显请求令牌"""
+        payload = build_frame(DeviceCmd.KEY_DECISION, b"\x01" + token)
+        packet = struct.pack("<BH", PKT_BLE_NOTIFY, len(payload)) + payload
+
+        def press():
+            try:
+                conn.sendall(packet)
+            except OSError:
+                pass
+
+        timer = threading.Timer(self._key_delay, press)
+        timer.daemon = True
+        timer.start()
+
+    @staticmethod
+    def _handle(pkt_type: int, data: bytes):
+        if pkt_type == PKT_QUERY_STATUS:
+            name, mac = b"bench", b"00:00:00:00:00:00"
+            payload = bytes([1, len(name)]) + name + bytes([len(mac)]) + mac + bytes([1])
+            return PKT_STATUS_RESP, payload
+        if pkt_type == PKT_QUERY_INFO:
+            # BatteryLevel .. SwitchState=1 (非自动模式)
+            return PKT_INFO_RESP, bytes([100, 0, 1, 0, 0, 0, 1, 0])
+        if pkt_type == PKT_WRITE_CMD and len(data) >= 3:
+            cmd = data[2]
+            if cmd in (DeviceCmd.UPDATE_STATE, DeviceCmd.UPDATE_STATS):
+                return None  # hook 不等待这些命令的应答
+            return PKT_BLE_NOTIFY, build_frame(cmd, b"\x00")
+        return None
+
+    @staticmethod
+    def _recv_exact(conn: socket.socket, count: int):
+        buf = b""
+        while len(buf) < count:
+            chunk = conn.recv(count - len(buf))
+            if not chunk:
+                return None
+            buf += chunk
+        return buf
+
+
+# ============================================================
+# 负载
+# ============================================================
+def sample_payload(event_name: str, session_id: str) -> dict:
+    """构造各事件的示例 stdin 负载"""
+    payload = {
+        "session_id": session_id,
+        "transcript_path": os.path.join(tempfile.gettempdir(), f"{session_id}.jsonl"),
+        "cwd": os.getcwd(),
+        "permission_mode": "default",
+        "hook_event_name": event_name,
+    }
+    if event_name in ("PreToolUse", "PostToolUse", "PermissionRequest"):
+        payload["tool_name"] = "Bash"
+        payload["tool_input"] = {"command": "ls -la", "description": "List files"}
+    if event_name == "PostToolUse":
+        payload["tool_response"] = {"stdout": "x" * 4096, "stderr": "", "interrupted": False}
+    if event_name == "PermissionRequest":
+        payload["permission_suggestions"] = [{"type": "toolAlwaysAllow", "tool": "Bash"}]
+    if event_name == "Notification":
+        payload["message"] = "Claude needs your permission to use Bash"
+    if event_name == "SessionStart":
+        payload["source"] = "startup"
+    if event_name == "SessionEnd":
+        payload["reason"] = "exit"
+    if event_name == "UserPromptSubmit":
+        payload["prompt"] = "run the tests"
+    if event_name == "Stop":
+        payload["stop_hook_active"] = False
+    return payload
+
+
+def load_recorded(path: str, events) -> list:
+    """读取录制的负载 (JSONL), 返回 [(event_name, raw_bytes), ...]"""
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            event_name = data.get("hook_event_name", "")
+            if event_name in events:
+                jobs.append((event_name, line.encode("utf-8")))
+    return jobs
+
+
+# ============================================================
+# 执行与统计
+# ============================================================
+def percentile(values: list, pct: float) -> float:
+    """最近秩百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def run_jobs(jobs, command_prefix, env, concurrency: int, rate: float):
+    """执行所有负载, 返回 {run_id: (event_name, spawn_ts, wall_seconds)}"""
+    results = {}
+    t_begin = time.time() + 0.05
+
+    def run_one(index, event_name, raw):
+        if rate > 0:
+            delay = t_begin + index / rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        run_env = dict(env, KB_HOOK_TIMING_ID=str(index))
+        spawn = time.time()
+        t0 = time.perf_counter()
+        subprocess.run(
+            command_prefix + [event_name], input=raw, env=run_env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        results[str(index)] = (event_name, spawn, time.perf_counter() - t0)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, (event_name, raw) in enumerate(jobs):
+            pool.submit(run_one, i, event_name, raw)
+    return results
+
+
+def collect_phases(results: dict, timing_path: str) -> dict:
+    """合并 hook 进程的打点, 返回 {event: {phase: [seconds, ...]}}"""
+    records = {}
+    if os.path.exists(timing_path):
+        with open(timing_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[rec.get("id", "")] = rec
+
+    per_event = {}
+    for run_id, (event_name, spawn, wall) in results.items():
+        phases = per_event.setdefault(event_name, {p: [] for p in PHASES})
+        phases["total"].append(wall)
+        rec = records.get(run_id)
+        if rec is None:
+            continue
+        marks, spans = rec.get("marks", {}), rec.get("spans", {})
+        if "start" in marks:
+            phases["start"].append(marks["start"] - spawn)
+            if "imported" in marks:
+                phases["imports"].append(marks["imported"] - marks["start"] + spans.get("imports", 0.0))
+        for name in ("config", "connect", "device", "decision", "stdin"):
+            phases[name].append(spans.get(name, 0.0))
+    return per_event
+
+
+def print_report(per_event: dict, elapsed: float, total_runs: int):
+    header = f"{'event':<18}{'n':>5}" + "".join(f"{p:>16}" for p in PHASES)
+    print(header)
+    print(f"{'':<23}" + "".join(f"{'p50/p99 ms':>16}" for _ in PHASES))
+    print("-" * len(header))
+    for event_name, _ in HOOK_EVENTS:
+        phases = per_event.get(event_name)
+        if not phases:
+            continue
+        row = f"{event_name:<18}{len(phases['total']):>5}"
+        for p in PHASES:
+            values = phases[p]
+            if values:
+                cell = f"{percentile(values, 50) * 1000:.1f}/{percentile(values, 99) * 1000:.1f}"
+            else:
+                cell = "-"
+            row += f"{cell:>16}"
+        print(row)
+    print("-" * len(header))
+    print(f"{total_runs} 次调用, 耗时 {elapsed:.2f}s, 吞吐 {total_runs / elapsed:.1f} 次/秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hook 端到端延迟压测")
+    parser.add_argument("--events", default=",".join(e for e, _ in HOOK_EVENTS),
+                        help="要测试的事件, 逗号分隔 (默认全部)")
+    parser.add_argument("-n", "--count", type=int, default=20, help="每个事件的调用次数")
+    parser.add_argument("-c", "--concurrency", type=int, default=1, help="并发进程数")
+    parser.add_argument("--rate", type=float, default=0.0, help="总调用速率 (次/秒), 0 表示不限速")
+    parser.add_argument("--payloads", help="录制的 stdin 负载 JSONL 文件")
+    parser.add_argument("--bridge-delay", type=float, default=0.0, help="模拟设备往返延迟 (ms)")
+    parser.add_argument("--key-delay", type=float, default=50.0, help="模拟按键审批延迟 (ms)")
+    parser.add_argument("--exe", help="hook 可执行程序路径 (默认用当前解释器运行 hook_install.py)")
+    args = parser.parse_args()
+
+    events = [e for e in args.events.split(",") if e]
+    if args.payloads:
+        recorded = load_recorded(args.payloads, events)
+        jobs = [job for _ in range(args.count) for job in recorded]
+    else:
+        jobs = [
+            (e, json.dumps(sample_payload(e, f"bench-{i % max(1, args.concurrency)}")).encode("utf-8"))
+            for i in range(args.count) for e in events
+        ]
+    if not jobs:
+        print("没有可执行的负载")
+        return
+
+    if args.exe:
+        command_prefix = [args.exe]
+    else:
+        here = os.path.dirname(os.path.abspath(__file__))
+        command_prefix = [sys.executable, os.path.join(here, "hook_install.py")]
+
+    bridge = FakeBridge(delay=args.bridge_delay / 1000.0, key_delay=args.key_delay / 1000.0)
+    bridge.start()
+
+    data_dir = tempfile.mkdtemp(prefix="kb_hook_bench_")
+    timing_path = os.path.join(data_dir, "timing.jsonl")
+    with open(os.path.join(data_dir, "config_client.json"), "w", encoding="utf-8") as f:
+        json.dump({"server_ip": "127.0.0.1", "server_port": bridge.port}, f)
+    env = dict(os.environ, KB_HOOK_DATA_DIR=data_dir, KB_HOOK_TIMING=timing_path)
+
+    try:
+        t0 = time.perf_counter()
+        results = run_jobs(jobs, command_prefix, env, args.concurrency, args.rate)
+        elapsed = time.perf_counter() - t0
+        print_report(collect_phases(results, timing_path), elapsed, len(results))
+    finally:
+        bridge.stop()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
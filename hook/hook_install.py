@@ -3,14 +3,31 @@ Claude Code Hook 安装 & 分发工具
 
 - 无参数运行: 打开 Tkinter UI 界面，安装/卸载钩子
 - 传入事件名运行: 分发到对应的 hook 脚本执行
+- --install / --uninstall: 命令行安装/卸载, 可选择事件、工具匹配和采样
 
 用法:
     hook_install.exe                    # 打开 UI 界面
     hook_install.exe SessionStart       # 执行 SessionStart hook
     python hook_install.py              # 打开 UI 界面
     python hook_install.py PreToolUse   # 执行 PreToolUse hook
+    python hook_install.py PreToolUse --sample 4   # 只处理 1/4 的调用
+
+    python hook_install.py --install
+    python hook_install.py --install --events PermissionRequest,Notification,Stop,SessionEnd
+    python hook_install.py --install --matcher "PreToolUse=Bash|Edit|Write" --sample PostToolUse=4
+    python hook_install.py --uninstall
+
+安装选项:
+    --events E1,E2      只注册这些事件 (默认全部)
+    --matcher E=REGEX   事件的工具名匹配 (仅 PreToolUse/PostToolUse/PermissionRequest),
+                        不匹配的工具调用 Claude Code 不会启动 hook 进程, 可重复
+    --sample E=N        每 N 次调用只处理 1 次 (仅 PreToolUse/PostToolUse), 可重复
 """
 
+import time
+_START_TIME = time.time()  # 进程启动时间点 (hook_bench 统计启动耗时用)
+
+import argparse
 import json
 import os
 import platform
@@ -20,6 +37,9 @@ import sys
 from datetime import datetime
 from pathlib import Path
 
+import hook_timing
+hook_timing.mark("start", _START_TIME)
+
 # ============================================================
 # 显式 import 所有 hook 模块，确保 PyInstaller 能收集依赖
 # ============================================================
@@ -33,6 +53,8 @@ import TaskCompleted
 import Stop
 import UserPromptSubmit
 
+hook_timing.mark("imported")
+
 # 事件名 -> 模块映射（用于分发）
 DISPATCH = {
     "SessionStart": SessionStart,
@@ -59,16 +81,30 @@ HOOK_EVENTS = [
     ("UserPromptSubmit", 10),
 ]
 
+# 支持按工具名匹配 (matcher) 的事件
+TOOL_MATCHER_EVENTS = ("PreToolUse", "PostToolUse", "PermissionRequest")
+
 
 # ============================================================
 # Hook 分发逻辑
 # ============================================================
-def dispatch_hook(event_name):
-    """根据事件名分发到对应的 hook 模块执行。"""
+def dispatch_hook(event_name, options=()):
+    """根据事件名分发到对应的 hook 模块执行。options 为事件名之后的参数 (如 --sample N)。"""
     module = DISPATCH.get(event_name)
     if module is None:
         print(f"Unknown event: {event_name}")
         sys.exit(1)
+    options = list(options)
+    if "--sample" in options:
+        import hook_sampling
+        try:
+            every = int(options[options.index("--sample") + 1])
+        except (IndexError, ValueError):
+            every = 1
+        if event_name in hook_sampling.SAMPLEABLE_EVENTS:
+            hook_sampling.configure(every)
+    with hook_timing.span("imports"):
+        import ble_command_send  # noqa: F401  hook 内部延迟导入的通信模块, 预加载以计入导入耗时
     module.run()
 
 
@@ -124,40 +160,110 @@ def detect_python_executable() -> str:
     return ""
 
 
-def build_hook_command(event_name: str) -> str:
+def build_hook_command(event_name: str, sample: int = 1) -> str:
     """
     构建单个 hook 的调用命令。
     - 可执行程序: "E:/path/hook_install.exe SessionStart"
     - Python 脚本: "C:/Python39/python.exe" "E:/path/hook_install.py SessionStart"
+    sample > 1 时附加 "--sample N"。
     """
     self_path = get_self_path().replace("\\", "/")
 
     if is_frozen():
-        return f'"{self_path}" {event_name}'
+        command = f'"{self_path}" {event_name}'
     else:
         python_exe = detect_python_executable().replace("\\", "/")
-        return f'"{python_exe}" "{self_path}" {event_name}'
+        command = f'"{python_exe}" "{self_path}" {event_name}'
+    if sample > 1:
+        command += f" --sample {sample}"
+    return command
 
 
-def build_hooks_config() -> dict:
-    """构建完整的 hooks 配置字典。"""
+def build_hooks_config(events=None, matchers=None, samples=None) -> dict:
+    """
+    构建 hooks 配置字典。
+
+    :param events: 要注册的事件名列表, None 表示全部
+    :param matchers: {事件名: 工具名正则}, 只对 TOOL_MATCHER_EVENTS 有效
+    :param samples: {事件名: N}, 每 N 次调用处理 1 次
+    """
+    matchers = matchers or {}
+    samples = samples or {}
     hooks = {}
     for event_name, timeout in HOOK_EVENTS:
-        command = build_hook_command(event_name)
-        hooks[event_name] = [
+        if events is not None and event_name not in events:
+            continue
+        entry = {}
+        if matchers.get(event_name):
+            entry["matcher"] = matchers[event_name]
+        entry["hooks"] = [
             {
-                "hooks": [
-                    {
-                        "type": "command",
-                        "command": command,
-                        "timeout": timeout,
-                    }
-                ]
+                "type": "command",
+                "command": build_hook_command(event_name, samples.get(event_name, 1)),
+                "timeout": timeout,
             }
         ]
+        hooks[event_name] = [entry]
     return hooks
 
 
+def add_install_options(parser: argparse.ArgumentParser):
+    """添加 --events / --matcher / --sample 安装选项 (install_hook.py 共用)"""
+    parser.add_argument("--events", help="要注册的事件, 逗号分隔 (默认全部)")
+    parser.add_argument("--matcher", action="append", default=[], metavar="EVENT=REGEX",
+                        help="事件的工具名匹配, 可重复")
+    parser.add_argument("--sample", action="append", default=[], metavar="EVENT=N",
+                        help="每 N 次调用处理 1 次, 可重复")
+
+
+def check_install_options(parser: argparse.ArgumentParser, args: argparse.Namespace):
+    """
+    校验 add_install_options 添加的选项并原地转换, 之后 args.events / args.matchers /
+    args.samples 可直接传给 install_hooks; 不合法时通过 parser.error 退出
+    """
+    import hook_sampling
+
+    known = [name for name, _ in HOOK_EVENTS]
+    args.events = [e.strip() for e in args.events.split(",") if e.strip()] if args.events else None
+    for name in args.events or []:
+        if name not in known:
+            parser.error(f"未知事件: {name} (可用: {', '.join(known)})")
+
+    def pairs(values, option):
+        result = {}
+        for item in values:
+            name, sep, value = item.partition("=")
+            if not sep or name not in known:
+                parser.error(f"{option} 格式应为 EVENT=VALUE, 收到: {item}")
+            result[name] = value
+        return result
+
+    args.matchers = pairs(args.matcher, "--matcher")
+    for name in args.matchers:
+        if name not in TOOL_MATCHER_EVENTS:
+            parser.error(f"--matcher 仅支持: {', '.join(TOOL_MATCHER_EVENTS)}")
+
+    args.samples = {}
+    for name, value in pairs(args.sample, "--sample").items():
+        if name not in hook_sampling.SAMPLEABLE_EVENTS:
+            parser.error(f"--sample 仅支持: {', '.join(hook_sampling.SAMPLEABLE_EVENTS)}")
+        if not value.isdigit() or int(value) < 1:
+            parser.error(f"--sample 的 N 必须是正整数, 收到: {name}={value}")
+        args.samples[name] = int(value)
+
+
+def parse_install_options(argv) -> argparse.Namespace:
+    """解析并校验命令行安装选项, 结果中 events/matchers/samples 可直接传给 install_hooks"""
+    parser = argparse.ArgumentParser(prog="hook_install", description="安装/卸载 Claude Code hooks")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--install", action="store_true", help="安装 hooks")
+    action.add_argument("--uninstall", action="store_true", help="卸载 hooks")
+    add_install_options(parser)
+    args = parser.parse_args(argv)
+    check_install_options(parser, args)
+    return args
+
+
 def backup_settings(settings_path: Path):
     """备份现有配置文件。"""
     if not settings_path.is_file():
@@ -186,8 +292,8 @@ def save_settings(settings_path: Path, settings: dict):
         json.dump(settings, f, indent=2, ensure_ascii=False)
 
 
-def install_hooks() -> str:
-    """安装 hooks，返回结果信息。"""
+def install_hooks(events=None, matchers=None, samples=None) -> str:
+    """安装 hooks，返回结果信息。参数同 build_hooks_config。"""
     settings_path = get_claude_global_settings_path()
 
     # 备份
@@ -196,7 +302,7 @@ def install_hooks() -> str:
 
     # 加载、合并、保存
     settings = load_settings(settings_path)
-    new_hooks = build_hooks_config()
+    new_hooks = build_hooks_config(events, matchers, samples)
     settings["hooks"] = new_hooks
     save_settings(settings_path, settings)
 
@@ -206,9 +312,19 @@ def install_hooks() -> str:
         f"{backup_msg}",
         f"已注册 {len(new_hooks)} 个 hook 事件",
         f"配置文件: {settings_path}",
+    ]
+    for event_name, entries in new_hooks.items():
+        extra = []
+        if "matcher" in entries[0]:
+            extra.append(f"matcher={entries[0]['matcher']}")
+        if samples and samples.get(event_name, 1) > 1:
+            extra.append(f"采样 1/{samples[event_name]}")
+        if extra:
+            lines.append(f"  {event_name}: {', '.join(extra)}")
+    lines += [
         "",
         "示例命令:",
-        f"  {build_hook_command('SessionStart')}",
+        f"  {build_hook_command(next(iter(new_hooks), 'SessionStart'))}",
     ]
     return "\n".join(lines)
 
@@ -323,9 +439,15 @@ def main():
         show_ui()
     elif args[0] in DISPATCH:
         # 参数是 hook 事件名 -> 分发执行
-        dispatch_hook(args[0])
+        dispatch_hook(args[0], args[1:])
     elif args[0] == "--help" or args[0] == "-h":
         print(__doc__)
+    elif "--install" in args or "--uninstall" in args:
+        options = parse_install_options(args)
+        if options.install:
+            print(install_hooks(options.events, options.matchers, options.samples))
+        else:
+            print(uninstall_hooks())
     else:
         # print(f"未知参数: {args[0]}")
         # print(f"可用事件: {', '.join(DISPATCH.keys())}")
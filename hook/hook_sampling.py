@@ -0,0 +1,32 @@
+"""
+高频 hook 事件采样 — 只处理 1/N 的工具调用
+
+安装时可为 PreToolUse/PostToolUse 指定采样率 (hook 命令附加 `--sample N`),
+未被采样的调用在解析 stdin 后立即退出, 不连接桥接程序也不写统计。
+按 tool_use_id 的哈希决定是否采样, 同一次工具调用的 Pre/Post 事件结果一致,
+工具耗时统计仍能正确配对; 没有 tool_use_id 时随机采样。
+"""
+
+import random
+import zlib
+
+# 允许采样的事件 (其余事件影响键盘状态或需要返回决策, 必须每次处理)
+SAMPLEABLE_EVENTS = ("PreToolUse", "PostToolUse")
+
+_every = 1
+
+
+def configure(every: int):
+    """设置采样间隔: 每 every 次调用处理 1 次 (1 表示不采样)"""
+    global _every
+    _every = max(1, int(every))
+
+
+def keep(data: dict) -> bool:
+    """本次调用是否需要处理"""
+    if _every <= 1:
+        return True
+    tool_use_id = data.get("tool_use_id")
+    if tool_use_id:
+        return zlib.crc32(str(tool_use_id).encode("utf-8")) % _every == 0
+    return random.randrange(_every) == 0
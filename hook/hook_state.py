@@ -0,0 +1,91 @@
+"""
+Hook 进程间共享状态 — 带文件锁的 JSON 状态文件
+
+每个 hook 事件都是一个独立的短进程, 需要跨进程共享的数据 (上次发送时间、
+各会话状态等) 保存在 hook 目录下的 JSON 文件中, 读改写期间持有文件锁。
+"""
+
+import json
+import os
+
+
+class FileLock:
+    """跨平台的进程间互斥锁 (Windows: msvcrt, 其他: fcntl)"""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._fh = None
+
+    def __enter__(self):
+        self._fh = open(self._path, "a+b")
+        if os.name == "nt":
+            import msvcrt
+            self._fh.seek(0)
+            # LK_LOCK 失败时会重试 10 次 (每次 1s) 后抛出 OSError
+            msvcrt.locking(self._fh.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self._fh.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if os.name == "nt":
+                import msvcrt
+                self._fh.seek(0)
+                msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._fh.close()
+            self._fh = None
+
+
+class SharedState:
+    """
+    带锁的 JSON 状态文件。
+
+    用法:
+        store = SharedState(path)
+        with store as data:      # 加锁并读取
+            data["x"] = 1        # 修改会在退出时写回
+    """
+
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = FileLock(path + ".lock")
+        self._data = None
+
+    def load(self) -> dict:
+        """不加锁地读取当前状态 (文件不存在或损坏时返回空 dict)"""
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def save(self, data: dict):
+        """原子写入 (先写临时文件再替换)"""
+        tmp_path = f"{self._path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self._path)
+
+    def __enter__(self) -> dict:
+        self._lock.__enter__()
+        try:
+            self._data = self.load()
+        except BaseException:
+            self._lock.__exit__(None, None, None)
+            raise
+        return self._data
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.save(self._data)
+        finally:
+            self._data = None
+            self._lock.__exit__(exc_type, exc, tb)
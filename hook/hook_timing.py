@@ -0,0 +1,62 @@
+"""
+Hook 耗时打点 — 供 hook_bench.py 统计各阶段延迟
+
+仅当环境变量 KB_HOOK_TIMING 指向一个文件时启用, 进程退出时把本次运行的
+打点结果作为一行 JSON 追加到该文件; 未启用时所有接口都是空操作。
+"""
+
+import atexit
+import json
+import os
+import time
+
+_OUTPUT = os.environ.get("KB_HOOK_TIMING")
+_marks = {}
+_spans = {}
+
+
+def enabled() -> bool:
+    return bool(_OUTPUT)
+
+
+def mark(name: str, ts: float = None):
+    """记录一个时间点 (time.time())"""
+    if _OUTPUT:
+        _marks[name] = time.time() if ts is None else ts
+
+
+class span:
+    """累计一段代码的耗时 (秒), 同名 span 多次执行时累加"""
+
+    def __init__(self, name: str):
+        self._name = name
+        self._t0 = 0.0
+
+    def __enter__(self):
+        if _OUTPUT:
+            self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if _OUTPUT:
+            elapsed = time.perf_counter() - self._t0
+            _spans[self._name] = _spans.get(self._name, 0.0) + elapsed
+
+
+def _dump():
+    mark("exit")
+    record = {
+        "id": os.environ.get("KB_HOOK_TIMING_ID", ""),
+        "pid": os.getpid(),
+        "marks": _marks,
+        "spans": _spans,
+    }
+    try:
+        with open(_OUTPUT, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError:
+        pass
+
+
+if _OUTPUT:
+    atexit.register(_dump)
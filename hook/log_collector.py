@@ -0,0 +1,414 @@
+"""
+UdpLog 日志收集服务 — 接收多个 hook 进程的日志, 落盘并建立时间/标签索引
+
+存储格式 (目录, 默认为本脚本同级的 logs/):
+    seg_000001.log        日志段, 每行一条 UdpLog 原始文本 "[ts][tag][level][session] msg"
+                          (会话字段可省略)
+    seg_000001.idx.json   段索引: 起止时间、各标签/级别条数、会话 id、每个时间块的字节偏移
+段超过 --segment-size 时滚动, 最多保留 --keep 个段。查询时先用索引跳过不相关的段,
+再在段内按时间块的偏移定位, 不需要扫描全部历史。
+
+用法:
+    python log_collector.py serve                          # 监听 127.0.0.1:9999 并落盘
+    python log_collector.py serve --echo                   # 同时打印到控制台 (替代 log_display.py)
+    python log_collector.py tail -f --tag pre-tool          # 跟随最新日志
+    python log_collector.py query --level ERROR --since 1h  # 查询最近 1 小时的错误
+    python log_collector.py query --session abc123 --until "2026-01-01 12:00:00"
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+LINE_RE = re.compile(
+    r"^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\]\[([^\]]*)\]\[([A-Z]+)\](?:\[([^\]]*)\])? ?(.*)$"
+)
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+LEVELS = ["DEBUG", "INFO", "WARN", "ERROR"]
+
+BLOCK_SECONDS = 60          # 索引的时间块粒度
+INDEX_FLUSH_INTERVAL = 2.0  # 索引写盘间隔
+
+
+def default_log_dir() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
+
+
+def parse_line(line: str):
+    """解析 UdpLog 行, 返回 (epoch, tag, level, msg, session) 或 None; 无会话字段时 session 为空串"""
+    m = LINE_RE.match(line)
+    if not m:
+        return None
+    ts = time.mktime(time.strptime(m.group(1), TS_FORMAT))
+    return ts, m.group(2), m.group(3), m.group(5), m.group(4) or ""
+
+
+# ============================================================
+# 存储
+# ============================================================
+class SegmentDir:
+    """日志段目录: 段枚举与索引读取"""
+
+    def __init__(self, log_dir: str):
+        self._dir = log_dir
+
+    def segments(self) -> list:
+        """返回所有段号 (升序)"""
+        if not os.path.isdir(self._dir):
+            return []
+        nums = []
+        for name in os.listdir(self._dir):
+            m = re.match(r"seg_(\d+)\.log$", name)
+            if m:
+                nums.append(int(m.group(1)))
+        return sorted(nums)
+
+    def seg_path(self, seg_no: int) -> str:
+        return os.path.join(self._dir, f"seg_{seg_no:06d}.log")
+
+    def idx_path(self, seg_no: int) -> str:
+        return os.path.join(self._dir, f"seg_{seg_no:06d}.idx.json")
+
+    def load_index(self, seg_no: int) -> dict:
+        try:
+            with open(self.idx_path(seg_no), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return self._rebuild_index(seg_no)
+
+    def _rebuild_index(self, seg_no: int) -> dict:
+        """索引丢失或损坏时从段文件重建"""
+        index = new_index()
+        path = self.seg_path(seg_no)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                offset = 0
+                for raw in f:
+                    parsed = parse_line(raw.decode("utf-8", errors="replace").rstrip("\n"))
+                    if parsed:
+                        index_add(index, offset, *parsed)
+                    offset += len(raw)
+        return index
+
+
+def new_index() -> dict:
+    return {"start": None, "end": None, "count": 0, "tags": {}, "levels": {},
+            "sessions": [], "blocks": []}
+
+
+def index_add(index: dict, offset: int, ts: float, tag: str, level: str, msg: str, session: str):
+    if index["start"] is None:
+        index["start"] = ts
+    index["end"] = ts
+    index["count"] += 1
+    index["tags"][tag] = index["tags"].get(tag, 0) + 1
+    index["levels"][level] = index["levels"].get(level, 0) + 1
+    block = int(ts // BLOCK_SECONDS) * BLOCK_SECONDS
+    if not index["blocks"] or index["blocks"][-1][0] < block:
+        index["blocks"].append([block, offset])
+    if session and session not in index["sessions"]:
+        index["sessions"].append(session)
+
+
+class LogStore(SegmentDir):
+    """按段滚动的日志存储 (写入端)"""
+
+    def __init__(self, log_dir: str, segment_size: int = 16 * 1024 * 1024, keep: int = 20):
+        super().__init__(log_dir)
+        self._segment_size = segment_size
+        self._keep = keep
+        os.makedirs(log_dir, exist_ok=True)
+        self._seg_no = 0
+        self._fh = None
+        self._index = None
+        self._last_index_flush = 0.0
+        self._open_latest()
+
+    def _open_latest(self):
+        segs = self.segments()
+        self._seg_no = segs[-1] if segs else 1
+        self._index = self.load_index(self._seg_no) if segs else new_index()
+        self._fh = open(self.seg_path(self._seg_no), "ab")
+
+    def _rotate(self):
+        self.flush_index(force=True)
+        self._fh.close()
+        self._seg_no += 1
+        self._index = new_index()
+        self._fh = open(self.seg_path(self._seg_no), "ab")
+        for old in self.segments()[:-self._keep]:
+            for path in (self.seg_path(old), self.idx_path(old)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    # ---------- 写入 ----------
+    def append(self, lines: list):
+        """追加一批已解析的行 [(raw_line, parsed), ...]"""
+        for raw, parsed in lines:
+            offset = self._fh.tell()
+            self._fh.write(raw.encode("utf-8") + b"\n")
+            index_add(self._index, offset, *parsed)
+        self._fh.flush()
+        if self._fh.tell() >= self._segment_size:
+            self._rotate()
+        else:
+            self.flush_index()
+
+    def flush_index(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_index_flush < INDEX_FLUSH_INTERVAL:
+            return
+        self._last_index_flush = now
+        tmp = self.idx_path(self._seg_no) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, self.idx_path(self._seg_no))
+
+    def close(self):
+        self.flush_index(force=True)
+        self._fh.close()
+
+
+# ============================================================
+# 查询
+# ============================================================
+class LogQuery:
+    """基于段索引的过滤查询"""
+
+    def __init__(self, log_dir: str, session=None, tag=None, level=None, since=None, until=None):
+        self._dir = log_dir
+        self.session = session
+        self.tag = tag
+        self.min_level = LEVELS.index(level) if level else 0
+        self.since = since
+        self.until = until
+
+    def _segment_matches(self, index: dict) -> bool:
+        if index["start"] is None:
+            return False
+        if self.since is not None and index["end"] < self.since:
+            return False
+        if self.until is not None and index["start"] > self.until:
+            return False
+        if self.tag and self.tag not in index["tags"]:
+            return False
+        if self.min_level and not any(
+            LEVELS.index(lv) >= self.min_level for lv in index["levels"] if lv in LEVELS
+        ):
+            return False
+        if self.session and self.session not in index["sessions"]:
+            return False
+        return True
+
+    def _start_offset(self, index: dict) -> int:
+        if self.since is None:
+            return 0
+        # 第一个可能包含 since 之后日志的时间块
+        for block_ts, block_offset in index["blocks"]:
+            if block_ts + BLOCK_SECONDS > self.since:
+                return block_offset
+        return index["blocks"][-1][1] if index["blocks"] else 0
+
+    def line_matches(self, parsed) -> bool:
+        ts, tag, level, msg, session = parsed
+        if self.since is not None and ts < self.since:
+            return False
+        if self.until is not None and ts > self.until:
+            return False
+        if self.tag and tag != self.tag:
+            return False
+        if self.min_level and (level not in LEVELS or LEVELS.index(level) < self.min_level):
+            return False
+        if self.session and session != self.session:
+            return False
+        return True
+
+    def run(self):
+        """逐条产出匹配的原始行"""
+        store = SegmentDir(self._dir)
+        for seg_no in store.segments():
+            index = store.load_index(seg_no)
+            if not self._segment_matches(index):
+                continue
+            with open(store.seg_path(seg_no), "rb") as f:
+                f.seek(self._start_offset(index))
+                for raw in f:
+                    line = raw.decode("utf-8", errors="replace").rstrip("\n")
+                    parsed = parse_line(line)
+                    if parsed is None:
+                        continue
+                    # 多进程写入的时间戳可能略有乱序, 留一个时间块的余量再停止
+                    if self.until is not None and parsed[0] > self.until + BLOCK_SECONDS:
+                        break
+                    if self.line_matches(parsed):
+                        yield line
+
+
+# ============================================================
+# 服务
+# ============================================================
+def serve(args):
+    store = LogStore(args.dir, args.segment_size * 1024 * 1024, args.keep)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # 加大接收缓冲区, 减少突发流量下的丢包
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+    sock.bind((args.host, args.port))
+    sock.settimeout(1.0)
+    print(f"[INFO] 监听 {args.host}:{args.port}, 日志目录: {args.dir}")
+
+    stats_start = time.monotonic()
+    datagrams = lines_in = bytes_in = dropped = 0
+    try:
+        while True:
+            try:
+                data, _ = sock.recvfrom(65536)
+            except socket.timeout:
+                data = None
+
+            if data:
+                datagrams += 1
+                bytes_in += len(data)
+                batch = []
+                for line in data.decode("utf-8", errors="replace").splitlines():
+                    if not line:
+                        continue
+                    parsed = parse_line(line)
+                    if parsed is None:
+                        dropped += 1
+                        continue
+                    batch.append((line, parsed))
+                    if args.echo:
+                        print(line)
+                lines_in += len(batch)
+                if batch:
+                    store.append(batch)
+            else:
+                store.flush_index()
+
+            elapsed = time.monotonic() - stats_start
+            if args.stats and elapsed >= args.stats:
+                print(f"[STATS] {lines_in / elapsed:.1f} 行/秒, {datagrams / elapsed:.1f} 包/秒, "
+                      f"{bytes_in / elapsed / 1024:.1f} KB/秒, 无法解析 {dropped} 行",
+                      file=sys.stderr)
+                stats_start = time.monotonic()
+                datagrams = lines_in = bytes_in = dropped = 0
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+        sock.close()
+
+
+def parse_time(text: str):
+    """支持 '30s' / '10m' / '2h' / '1d' (相对现在) 或 'YYYY-MM-DD HH:MM:SS'"""
+    if text is None:
+        return None
+    m = re.fullmatch(r"(\d+)([smhd])", text)
+    if m:
+        unit = {"s": 1, "m": 60, "h": 3600, "d": 86400}[m.group(2)]
+        return time.time() - int(m.group(1)) * unit
+    return datetime.strptime(text, TS_FORMAT).timestamp()
+
+
+def make_query(args) -> LogQuery:
+    return LogQuery(
+        args.dir, session=args.session, tag=args.tag, level=args.level,
+        since=parse_time(args.since), until=parse_time(args.until),
+    )
+
+
+def query(args):
+    count = 0
+    for line in make_query(args).run():
+        print(line)
+        count += 1
+        if args.limit and count >= args.limit:
+            break
+
+
+def tail(args):
+    q = make_query(args)
+    for line in deque(q.run(), maxlen=args.lines):
+        print(line)
+    if not args.follow:
+        return
+
+    # 跟随最新段的增长 (段滚动时切换到新段)
+    store = SegmentDir(args.dir)
+    segs = store.segments()
+    seg_no = segs[-1] if segs else 1
+    path = store.seg_path(seg_no)
+    offset = os.path.getsize(path) if os.path.exists(path) else 0
+    try:
+        while True:
+            if os.path.exists(path) and os.path.getsize(path) > offset:
+                with open(path, "rb") as f:
+                    f.seek(offset)
+                    chunk = f.read()
+                # 只处理完整的行
+                end = chunk.rfind(b"\n") + 1
+                offset += end
+                for raw in chunk[:end].splitlines():
+                    line = raw.decode("utf-8", errors="replace")
+                    parsed = parse_line(line)
+                    if parsed and q.line_matches(parsed):
+                        print(line, flush=True)
+            elif os.path.exists(store.seg_path(seg_no + 1)):
+                seg_no += 1
+                path, offset = store.seg_path(seg_no), 0
+                continue
+            time.sleep(0.2)
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UdpLog 日志收集与查询")
+    parser.add_argument("--dir", default=default_log_dir(), help="日志存储目录")
+    # 子命令也接受 --dir, 放在子命令前后均可 (未给出时保留上面的默认值)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--dir", default=argparse.SUPPRESS, help="日志存储目录")
+    sub = parser.add_subparsers(dest="command")
+
+    p_serve = sub.add_parser("serve", parents=[common], help="接收 UDP 日志并落盘")
+    p_serve.add_argument("--host", default="127.0.0.1")
+    p_serve.add_argument("--port", type=int, default=9999)
+    p_serve.add_argument("--segment-size", type=int, default=16, help="单个日志段大小 (MB)")
+    p_serve.add_argument("--keep", type=int, default=20, help="最多保留的段数")
+    p_serve.add_argument("--echo", action="store_true", help="同时输出到控制台")
+    p_serve.add_argument("--stats", type=float, default=0, help="每隔 N 秒输出接收速率统计")
+
+    for name, help_text in (("query", "查询历史日志"), ("tail", "显示最新日志")):
+        p = sub.add_parser(name, parents=[common], help=help_text)
+        p.add_argument("--session", help="会话 id")
+        p.add_argument("--tag", help="日志标签, 如 pre-tool")
+        p.add_argument("--level", choices=LEVELS, help="最低级别")
+        p.add_argument("--since", help="起始时间: 30m / 2h / 'YYYY-MM-DD HH:MM:SS'")
+        p.add_argument("--until", help="结束时间")
+        if name == "query":
+            p.add_argument("--limit", type=int, default=0, help="最多输出条数")
+        else:
+            p.add_argument("-n", "--lines", type=int, default=20, help="显示最后 N 条")
+            p.add_argument("-f", "--follow", action="store_true", help="持续跟随新日志")
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        serve(args)
+    elif args.command == "query":
+        query(args)
+    elif args.command == "tail":
+        tail(args)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
-import socket
-s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-s.bind(("127.0.0.1", 9999))
-while True:
-    data, _ = s.recvfrom(4096)
-    print(data.decode("utf-8"))
+"""
+实时显示 UdpLog 日志 (同时落盘, 见 log_collector.py)
+
+用法:
+    python log_display.py [--dir DIR] [--port PORT] ...   # 参数同 log_collector.py serve
+"""
+
+import sys
+
+from log_collector import main
+
+if __name__ == "__main__":
+    main(["serve", "--echo", *sys.argv[1:]])
@@ -0,0 +1,65 @@
+"""
+多会话状态聚合 — 并行运行多个 Claude Code 会话时只向键盘推送一个聚合状态
+
+按 hook stdin 中的 session_id 记录每个会话的最新 ClaudeState 和更新时间,
+聚合状态取所有活跃会话中优先级最高者 (同级取最近更新的), 例如任意会话在
+等待权限确认时键盘始终显示 PermissionRequest。
+会话在 SessionEnd 时移除, 超过 session_timeout 秒无事件也视为已结束。
+"""
+
+import time
+
+from ble_command_send import ClaudeState
+from hook_state import SharedState
+
+# 聚合优先级: 数值越大越需要用户关注
+STATE_RANK = {
+    ClaudeState.CL_PermissionRequest: 6,
+    ClaudeState.CL_Notification: 5,
+    ClaudeState.CL_PreToolUse: 4,
+    ClaudeState.CL_PostToolUse: 4,
+    ClaudeState.CL_UserPromptSubmit: 4,
+    ClaudeState.CL_Stop: 3,
+    ClaudeState.CL_TaskCompleted: 2,
+    ClaudeState.CL_SessionStart: 1,
+    ClaudeState.CL_SessionEnd: 0,
+}
+
+
+class SessionAggregator:
+    """跨 hook 进程的会话状态表"""
+
+    def __init__(self, state_path: str, session_timeout: float = 600.0):
+        self._store = SharedState(state_path)
+        self._timeout = session_timeout
+
+    def update(self, session_id: str, state: int) -> int:
+        """记录会话的新状态, 返回应推送到设备的聚合状态"""
+        if not session_id:
+            return state
+
+        with self._store as data:
+            now = time.time()
+            sessions = data.setdefault("sessions", {})
+
+            if state == ClaudeState.CL_SessionEnd:
+                sessions.pop(session_id, None)
+            else:
+                sessions[session_id] = {"state": int(state), "updated": now}
+
+            # 清理超时会话
+            for sid in list(sessions):
+                if now - sessions[sid].get("updated", 0) > self._timeout:
+                    del sessions[sid]
+
+            return self._aggregate(sessions, state)
+
+    @staticmethod
+    def _aggregate(sessions: dict, fallback: int) -> int:
+        if not sessions:
+            return fallback
+        best = max(
+            sessions.values(),
+            key=lambda s: (STATE_RANK.get(s["state"], 0), s["updated"]),
+        )
+        return ClaudeState(best["state"])
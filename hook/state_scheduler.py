@@ -0,0 +1,68 @@
+"""
+Claude 状态更新调度 — 丢弃重复和过密的中间状态, 限制每秒更新次数, 优先事件插队
+
+繁忙的会话每秒会触发多次 PreToolUse/PostToolUse, 每次都是一次 UPDATE_STATE
+BLE 写入。调度规则:
+  - 优先事件 (PermissionRequest / Notification / Stop) 立即发送, 不受限速影响
+  - 与键盘当前显示相同的状态直接丢弃
+  - 其余状态按 max_rate 限速; 限速窗口内的状态直接丢弃, 不等待
+    (Claude Code 会等待 hook 进程退出, 在 hook 中等待会拖慢每次工具调用)。
+    键盘上的状态由之后的事件更新, 会话最终总会以优先事件 (Stop 等) 结束
+acquire() 只占用发送时刻; 调用方确认发送成功后调用 commit(), 该状态才被记为
+"键盘已显示"。桥接端口未打开或发送失败时不提交, 下一次相同的状态仍会发送。
+"""
+
+import time
+
+from ble_command_send import ClaudeState
+from hook_state import SharedState
+
+PRIORITY_STATES = {
+    ClaudeState.CL_PermissionRequest,
+    ClaudeState.CL_Notification,
+    ClaudeState.CL_Stop,
+}
+
+
+class StateScheduler:
+    """跨 hook 进程的状态更新调度器"""
+
+    def __init__(self, state_path: str, max_rate: float = 5.0):
+        self._store = SharedState(state_path)
+        self._interval = 1.0 / max_rate if max_rate > 0 else 0.0
+        self._seq = None   # 最近一次 acquire 的事件序号
+
+    def acquire(self, state: int, priority: bool = None) -> bool:
+        """
+        申请发送一个状态, 返回 True 表示调用方应立即发送。不会阻塞。
+
+        :param priority: 是否插队, 默认按 PRIORITY_STATES 判断
+        """
+        if priority is None:
+            priority = state in PRIORITY_STATES
+
+        with self._store as data:
+            now = time.time()
+            seq = data.get("seq", 0) + 1
+            data["seq"] = seq
+            self._seq = seq
+
+            if not priority:
+                if data.get("last_state") == int(state):
+                    return False  # 键盘已显示该状态
+                if now < data.get("last_sent", 0.0) + self._interval:
+                    return False  # 限速窗口内, 由之后的事件发送
+            data["last_sent"] = now
+            return True
+
+    def commit(self, state: int):
+        """
+        acquire 允许的状态已成功发送后调用, 记录键盘当前显示的状态。
+        比已提交的事件更早的事件不会覆盖它 (多个 hook 进程的发送可能乱序完成)。
+        """
+        if self._seq is None:
+            return
+        with self._store as data:
+            if self._seq >= data.get("committed_seq", 0):
+                data["committed_seq"] = self._seq
+                data["last_state"] = int(state)
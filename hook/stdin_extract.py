@@ -0,0 +1,280 @@
+"""
+hook stdin 流式提取 — 只解析需要的顶层字段, 大字段跳过不加载
+
+PostToolUse/PreToolUse 的负载可能携带数 MB 的工具输入/输出, 而 hook 只需要
+tool_name、session_id 等几个短字段和若干字符的预览。本模块按块读取 stdin,
+增量扫描顶层 JSON 对象:
+  - fields 中的字段完整解码 (原始文本超过 max_field_bytes 时按预览截断)
+  - previews 中的字段只保留前 N 个字符的预览字符串
+  - 其余字段只做括号/引号匹配跳过, 不会被整体读入内存
+所需字段全部取到后不再解析, 剩余输入只读出丢弃 (避免写端 EPIPE)。
+"""
+
+import json
+import re
+import sys
+
+# hook 通用的短字段
+DEFAULT_FIELDS = (
+    "session_id", "hook_event_name", "tool_name", "tool_use_id",
+    "transcript_path", "cwd", "permission_mode",
+)
+
+_WS = b" \t\r\n"
+_STRING_BODY = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+_STRUCTURAL = re.compile(rb'["\[\]{}]')
+_SCALAR_END = re.compile(rb'[,\]}\s]')
+
+
+class _LimitReached(Exception):
+    pass
+
+
+class _Capture:
+    """保存值原始文本的前 limit 字节"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts = []
+        self.size = 0
+        self.truncated = False
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.limit
+
+    def add(self, data: bytes):
+        if self.size >= self.limit:
+            if data:
+                self.truncated = True
+            return
+        room = self.limit - self.size
+        if len(data) > room:
+            data = data[:room]
+            self.truncated = True
+        self.parts.append(data)
+        self.size += len(data)
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.parts)
+
+
+class _Reader:
+    """按块读取的字节流, 只保留未消费的部分"""
+
+    def __init__(self, stream, chunk_size: int, max_bytes: int):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._max_bytes = max_bytes
+        self.total = 0
+        self.buf = b""
+        self.pos = 0
+
+    def fill(self) -> bool:
+        """读入下一块, 到达 EOF 返回 False"""
+        if self.total >= self._max_bytes:
+            raise _LimitReached()
+        chunk = self._stream.read(self._chunk_size)
+        if not chunk:
+            return False
+        self.total += len(chunk)
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while self.pos >= len(self.buf):
+            if not self.fill():
+                return None
+        return self.buf[self.pos]
+
+    def skip_ws(self):
+        while True:
+            b = self.peek()
+            if b is None or b not in _WS:
+                return b
+            self.pos += 1
+
+    def expect(self, ch: bytes):
+        if self.skip_ws() != ch[0]:
+            raise ValueError(f"expected {ch!r} at byte {self.total - len(self.buf) + self.pos}")
+        self.pos += 1
+
+    def drain(self):
+        """丢弃剩余输入"""
+        self.buf = b""
+        self.pos = 0
+        try:
+            while self.fill():
+                self.buf = b""
+        except _LimitReached:
+            pass
+
+
+def _scan_string(r: _Reader, cap: _Capture):
+    cap.add(b'"')
+    r.pos += 1
+    while True:
+        # 常见情况: 字符串内没有转义引号, 直接 find 定位结尾
+        i = r.buf.find(b'"', r.pos)
+        if i >= 0 and (i == r.pos or r.buf[i - 1] != 0x5C):  # '\\'
+            if not cap.full:
+                cap.add(r.buf[r.pos:i + 1])
+            else:
+                cap.truncated = True
+            r.pos = i + 1
+            return
+
+        # 含转义序列: 用正则跳过 "非特殊字符 + 转义序列" 的组合
+        m = _STRING_BODY.match(r.buf, r.pos)
+        end = m.end()
+        if end > r.pos:
+            if not cap.full:
+                cap.add(r.buf[r.pos:end])
+            else:
+                cap.truncated = True
+            r.pos = end
+        if r.pos < len(r.buf) and r.buf[r.pos] == 0x22:
+            cap.add(b'"')
+            r.pos += 1
+            return
+        # 缓冲区耗尽 (或末尾是被截断的转义序列), 读入更多数据
+        if not r.fill():
+            raise ValueError("unterminated string")
+
+
+def _scan_container(r: _Reader, cap: _Capture):
+    depth = 0
+    while True:
+        m = _STRUCTURAL.search(r.buf, r.pos)
+        if m is None:
+            if not cap.full:
+                cap.add(r.buf[r.pos:])
+            r.pos = len(r.buf)
+            if not r.fill():
+                raise ValueError("unterminated container")
+            continue
+        i = m.start()
+        if i > r.pos and not cap.full:
+            cap.add(r.buf[r.pos:i])
+        r.pos = i
+        ch = r.buf[i]
+        if ch == 0x22:
+            _scan_string(r, cap)
+            continue
+        cap.add(r.buf[i:i + 1])
+        r.pos += 1
+        depth += 1 if ch in b"[{" else -1
+        if depth == 0:
+            return
+
+
+def _scan_scalar(r: _Reader, cap: _Capture):
+    while True:
+        m = _SCALAR_END.search(r.buf, r.pos)
+        if m is None:
+            cap.add(r.buf[r.pos:])
+            r.pos = len(r.buf)
+            if not r.fill():
+                return
+            continue
+        cap.add(r.buf[r.pos:m.start()])
+        r.pos = m.start()
+        return
+
+
+def _scan_value(r: _Reader, limit: int) -> _Capture:
+    cap = _Capture(limit)
+    b = r.skip_ws()
+    if b is None:
+        raise ValueError("unexpected end of input")
+    if b == 0x22:
+        _scan_string(r, cap)
+    elif b in b"[{":
+        _scan_container(r, cap)
+    else:
+        _scan_scalar(r, cap)
+    return cap
+
+
+def _preview(cap: _Capture, max_chars: int) -> str:
+    """把截获的原始文本转为预览字符串 (字符串值解码转义, 其余保留 JSON 文本)"""
+    raw = cap.getvalue()
+    if not cap.truncated:
+        value = json.loads(raw)
+        text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+    elif raw.startswith(b'"'):
+        body = raw[1:]
+        # 去掉被截断的转义序列后再解码
+        for cut in range(0, 7):
+            try:
+                text = json.loads(b'"' + body[:len(body) - cut] + b'"')
+                break
+            except ValueError:
+                continue
+        else:
+            text = body.decode("utf-8", errors="ignore")
+    else:
+        text = raw.decode("utf-8", errors="ignore")
+    if cap.truncated or len(text) > max_chars:
+        return text[:max_chars] + "..."
+    return text
+
+
+def extract(stream, fields=DEFAULT_FIELDS, previews=None,
+            max_field_bytes: int = 4096, max_bytes: int = 32 * 1024 * 1024,
+            chunk_size: int = 64 * 1024) -> dict:
+    """
+    从二进制流中提取顶层 JSON 对象的部分字段。
+
+    :param fields: 需要完整解码的字段名
+    :param previews: {字段名: 最大字符数}, 只返回截断的预览字符串
+    :param max_field_bytes: fields 中单个值的原始文本上限, 超出时返回预览字符串
+    :param max_bytes: 最多读取的字节数, 超出后停止解析并返回已取到的字段
+    """
+    previews = previews or {}
+    wanted = set(fields) | set(previews)
+    result = {}
+    r = _Reader(stream, chunk_size, max_bytes)
+    try:
+        r.expect(b"{")
+        if r.skip_ws() == 0x7D:  # '}'
+            return result
+        while True:
+            if r.skip_ws() != 0x22:
+                raise ValueError("expected object key")
+            key = json.loads(_scan_value(r, 1024).getvalue())
+            r.expect(b":")
+
+            if key in previews:
+                max_chars = previews[key]
+                # UTF-8 每字符最多 4 字节, 再为转义序列留余量
+                result[key] = _preview(_scan_value(r, max_chars * 6 + 16), max_chars)
+            elif key in wanted:
+                cap = _scan_value(r, max_field_bytes)
+                if cap.truncated:
+                    result[key] = _preview(cap, max_field_bytes)
+                else:
+                    result[key] = json.loads(cap.getvalue())
+            else:
+                _scan_value(r, 0)
+
+            if wanted.issubset(result):
+                break
+            b = r.skip_ws()
+            if b == 0x2C:  # ','
+                r.pos += 1
+                continue
+            if b == 0x7D:
+                break
+            raise ValueError("expected ',' or '}'")
+    except _LimitReached:
+        return result
+    r.drain()
+    return result
+
+
+def read_hook_input(fields=DEFAULT_FIELDS, previews=None, **kwargs) -> dict:
+    """从 sys.stdin 提取 hook 负载字段"""
+    stream = getattr(sys.stdin, "buffer", sys.stdin)
+    return extract(stream, fields, previews, **kwargs)
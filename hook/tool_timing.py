@@ -0,0 +1,269 @@
+"""
+工具调用耗时统计 — 由 PreToolUse/PostToolUse 配对得到每次工具调用的耗时
+
+PreToolUse 记录一条未完成的调用, PostToolUse 找到对应的调用并写入耗时:
+  - 优先按 (session_id, tool_use_id) 精确匹配
+  - 没有 tool_use_id 时, 取同一会话中同名工具最早的未完成调用 (FIFO)
+数据保存在 <data_dir>/tool_timing.db (SQLite, WAL 模式, 多个 hook 进程可并发写入)。
+
+用法:
+    python tool_timing.py report                 # 最慢的工具和会话 (默认最近 7 天)
+    python tool_timing.py report --days 1 --top 5
+    python tool_timing.py push                   # 把摘要推送到键盘
+"""
+
+import math
+import os
+import sqlite3
+import struct
+import time
+
+# 超过该秒数仍未匹配到 PostToolUse 的调用视为丢失 (工具被中断等)
+PENDING_TIMEOUT = 3600
+# 明细保留天数
+RETENTION_DAYS = 30
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pending (
+    session_id  TEXT NOT NULL,
+    tool_use_id TEXT,
+    tool_name   TEXT NOT NULL,
+    started     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pending_id ON pending (session_id, tool_use_id);
+CREATE INDEX IF NOT EXISTS pending_tool ON pending (session_id, tool_name, started);
+CREATE TABLE IF NOT EXISTS calls (
+    session_id  TEXT NOT NULL,
+    tool_name   TEXT NOT NULL,
+    started     REAL NOT NULL,
+    duration    REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS calls_started ON calls (started);
+"""
+
+
+def percentile(values: list, pct: float) -> float:
+    """最近秩百分位数 (values 需已排序)"""
+    if not values:
+        return 0.0
+    rank = max(0, min(len(values) - 1, math.ceil(pct / 100.0 * len(values)) - 1))
+    return values[rank]
+
+
+class ToolTimingStore:
+    """工具调用耗时库"""
+
+    def __init__(self, db_path: str):
+        self._db_path = db_path
+        self._conn = None
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            conn = sqlite3.connect(self._db_path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ---------------- 记录 ----------------
+
+    def start(self, session_id: str, tool_name: str, tool_use_id: str = None, ts: float = None):
+        """PreToolUse: 记录一次未完成的调用"""
+        ts = time.time() if ts is None else ts
+        self.conn.execute(
+            "INSERT INTO pending (session_id, tool_use_id, tool_name, started) VALUES (?, ?, ?, ?)",
+            (session_id or "", tool_use_id or None, tool_name or "?", ts),
+        )
+
+    def finish(self, session_id: str, tool_name: str, tool_use_id: str = None, ts: float = None):
+        """PostToolUse: 匹配未完成的调用并写入耗时, 返回耗时 (秒), 找不到时返回 None"""
+        ts = time.time() if ts is None else ts
+        session_id = session_id or ""
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = None
+            if tool_use_id:
+                row = conn.execute(
+                    "SELECT rowid, tool_name, started FROM pending "
+                    "WHERE session_id = ? AND tool_use_id = ?",
+                    (session_id, tool_use_id),
+                ).fetchone()
+            if row is None:
+                row = conn.execute(
+                    "SELECT rowid, tool_name, started FROM pending "
+                    "WHERE session_id = ? AND tool_name = ? ORDER BY started LIMIT 1",
+                    (session_id, tool_name or "?"),
+                ).fetchone()
+            duration = None
+            if row is not None:
+                rowid, name, started = row
+                duration = max(0.0, ts - started)
+                conn.execute("DELETE FROM pending WHERE rowid = ?", (rowid,))
+                conn.execute(
+                    "INSERT INTO calls (session_id, tool_name, started, duration) VALUES (?, ?, ?, ?)",
+                    (session_id, name, started, duration),
+                )
+            conn.execute("DELETE FROM pending WHERE started < ?", (ts - PENDING_TIMEOUT,))
+            conn.execute("DELETE FROM calls WHERE started < ?", (ts - RETENTION_DAYS * 86400,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return duration
+
+    # ---------------- 统计 ----------------
+
+    def tool_stats(self, since: float = 0.0) -> list:
+        """按工具统计, 按 p99 降序: [{tool, count, total, p50, p90, p99, max}, ...]"""
+        durations = {}
+        for name, duration in self.conn.execute(
+            "SELECT tool_name, duration FROM calls WHERE started >= ?", (since,)
+        ):
+            durations.setdefault(name, []).append(duration)
+
+        result = []
+        for name, values in durations.items():
+            values.sort()
+            result.append({
+                "tool": name,
+                "count": len(values),
+                "total": sum(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "max": values[-1],
+            })
+        result.sort(key=lambda s: s["p99"], reverse=True)
+        return result
+
+    def session_stats(self, since: float = 0.0) -> list:
+        """按会话统计工具总耗时, 降序: [{session, count, total, max}, ...]"""
+        rows = self.conn.execute(
+            "SELECT session_id, COUNT(*), SUM(duration), MAX(duration) FROM calls "
+            "WHERE started >= ? GROUP BY session_id ORDER BY SUM(duration) DESC",
+            (since,),
+        ).fetchall()
+        return [
+            {"session": sid, "count": count, "total": total, "max": longest}
+            for sid, count, total, longest in rows
+        ]
+
+
+def pack_summary(tool_stats: list, top: int = 3) -> bytes:
+    """
+    打包为设备可用的摘要 (小端):
+        n:u8, 然后 n 条 [name:8 字节 ASCII, 不足补 0][count:u16][p50_ms:u32][p99_ms:u32]
+    """
+    items = tool_stats[:top]
+    data = bytearray([len(items)])
+    for s in items:
+        name = s["tool"].encode("ascii", errors="replace")[:8].ljust(8, b"\x00")
+        data += name + struct.pack(
+            "<HII",
+            min(s["count"], 0xFFFF),
+            min(int(s["p50"] * 1000), 0xFFFFFFFF),
+            min(int(s["p99"] * 1000), 0xFFFFFFFF),
+        )
+    return bytes(data)
+
+
+def default_db_path() -> str:
+    from ble_command_send import get_data_dir
+    return os.path.join(get_data_dir(), "tool_timing.db")
+
+
+def record_hook_event(event_name: str, data: dict, ts: float = None):
+    """供 PreToolUse/PostToolUse hook 调用, 返回 PostToolUse 匹配到的耗时"""
+    store = ToolTimingStore(default_db_path())
+    try:
+        args = (data.get("session_id"), data.get("tool_name"), data.get("tool_use_id"), ts)
+        if event_name == "PreToolUse":
+            store.start(*args)
+            return None
+        return store.finish(*args)
+    finally:
+        store.close()
+
+
+# ============================================================
+# 命令行
+# ============================================================
+def print_report(store: ToolTimingStore, since: float, top: int):
+    tools = store.tool_stats(since)
+    sessions = store.session_stats(since)
+    if not tools:
+        print("没有工具调用记录")
+        return
+
+    print(f"{'tool':<24}{'count':>7}{'total s':>10}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    print("-" * 81)
+    for s in tools[:top]:
+        print(f"{s['tool'][:23]:<24}{s['count']:>7}{s['total']:>10.1f}"
+              f"{s['p50'] * 1000:>10.0f}{s['p90'] * 1000:>10.0f}"
+              f"{s['p99'] * 1000:>10.0f}{s['max'] * 1000:>10.0f}")
+
+    print()
+    print(f"{'session':<40}{'calls':>7}{'total s':>10}{'max ms':>10}")
+    print("-" * 67)
+    for s in sessions[:top]:
+        print(f"{s['session'][:39]:<40}{s['count']:>7}{s['total']:>10.1f}{s['max'] * 1000:>10.0f}")
+
+
+def push_summary(store: ToolTimingStore, since: float) -> bool:
+    from ble_command_send import (
+        DeviceCmd, DeviceService, StatsKind, TcpClient, is_port_open, load_config,
+    )
+
+    ip, port = load_config()
+    if not is_port_open(ip, port):
+        print(f"桥接程序未运行: {ip}:{port}")
+        return False
+    bridge = TcpClient()
+    bridge.connect(ip, port)
+    try:
+        device = DeviceService(bridge)
+        payload = pack_summary(store.tool_stats(since))
+        device.send_command(DeviceCmd.UPDATE_STATS, bytes([StatsKind.TOOL_TIMING]) + payload,
+                            have_ret=False)
+    finally:
+        bridge.disconnect()
+    print(f"已推送 {payload[0]} 个工具的耗时摘要")
+    return True
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="工具调用耗时统计")
+    parser.add_argument("--db", help="数据库路径 (默认 hook 数据目录下的 tool_timing.db)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_report = sub.add_parser("report", help="显示最慢的工具和会话")
+    p_report.add_argument("--days", type=float, default=7.0, help="统计最近多少天")
+    p_report.add_argument("--top", type=int, default=10, help="显示条数")
+
+    p_push = sub.add_parser("push", help="推送耗时摘要到键盘")
+    p_push.add_argument("--days", type=float, default=1.0, help="统计最近多少天")
+
+    args = parser.parse_args()
+    store = ToolTimingStore(args.db or default_db_path())
+    since = time.time() - args.days * 86400
+    try:
+        if args.command == "report":
+            print_report(store, since, args.top)
+        else:
+            push_summary(store, since)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
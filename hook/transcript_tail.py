@@ -0,0 +1,222 @@
+"""
+会话记录增量读取 — 从 transcript_path 统计会话的实时数据
+
+hook 负载中的 transcript_path 指向 Claude Code 的会话记录 (JSONL, 每行一条
+消息)。每个会话保存一个已读字节偏移量, 每次 hook 事件只读取偏移量之后新增的
+完整行并累加统计, 开销只与新增字节数相关, 与会话记录总长度无关。
+第一次遇到很长的会话记录 (如恢复的旧会话) 时, 每次事件最多读取 MAX_SCAN_BYTES,
+其余部分由之后的事件接着读取, 统计逐步追上, hook 不会因此阻塞。
+配置 push_stats 开启时 (需固件支持), 计数变化的统计随状态更新以 UPDATE_STATS
+(StatsKind.SESSION) 推送到键盘; 未开启时统计只保存在本地, 供界面等读取。
+
+统计项:
+    turns       用户发起的对话轮数 (不含工具结果回传)
+    tool_calls  工具调用次数, tools 中按工具名分别计数
+    errors      工具返回错误 / API 错误次数
+    elapsed     第一条到最后一条记录的时间跨度 (秒)
+
+每个会话的偏移量和统计保存在 <data_dir>/transcripts/<session_id>.json,
+读改写期间持有该会话的文件锁, 不同会话之间互不阻塞。
+"""
+
+import json
+import os
+import re
+import struct
+import time
+from datetime import datetime
+
+from hook_state import SharedState
+
+READ_CHUNK = 256 * 1024
+# 单次 hook 事件最多读取的字节数
+MAX_SCAN_BYTES = 4 * 1024 * 1024
+# 超过该天数未更新的会话统计文件会被清理
+STATS_RETENTION = 7 * 24 * 3600
+
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def new_stats() -> dict:
+    return {
+        "turns": 0,
+        "tool_calls": 0,
+        "errors": 0,
+        "tools": {},
+        "first_ts": None,
+        "last_ts": None,
+        "elapsed": 0.0,
+    }
+
+
+def _parse_ts(value):
+    if not isinstance(value, str):
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def apply_entry(stats: dict, entry: dict):
+    """把一条会话记录累加到统计中"""
+    ts = _parse_ts(entry.get("timestamp"))
+    if ts is not None:
+        if stats["first_ts"] is None:
+            stats["first_ts"] = ts
+        stats["last_ts"] = ts
+        stats["elapsed"] = round(ts - stats["first_ts"], 3)
+
+    kind = entry.get("type")
+    message = entry.get("message")
+    if not isinstance(message, dict):
+        return
+    content = message.get("content")
+
+    if kind == "assistant":
+        if entry.get("isApiErrorMessage"):
+            stats["errors"] += 1
+        if isinstance(content, list):
+            for block in content:
+                if isinstance(block, dict) and block.get("type") == "tool_use":
+                    stats["tool_calls"] += 1
+                    name = block.get("name", "?")
+                    stats["tools"][name] = stats["tools"].get(name, 0) + 1
+
+    elif kind == "user":
+        tool_results = []
+        if isinstance(content, list):
+            tool_results = [
+                b for b in content
+                if isinstance(b, dict) and b.get("type") == "tool_result"
+            ]
+        for block in tool_results:
+            if block.get("is_error"):
+                stats["errors"] += 1
+        # 子代理 (sidechain) 和元信息消息不算用户轮次
+        if not tool_results and not entry.get("isSidechain") and not entry.get("isMeta"):
+            stats["turns"] += 1
+
+
+def pack_stats(stats: dict) -> bytes:
+    """
+    打包为设备可用的定长数据 (小端):
+        turns:u16  tool_calls:u16  errors:u16  elapsed_s:u32
+    """
+    def u16(v):
+        return min(int(v), 0xFFFF)
+
+    return struct.pack(
+        "<HHHI",
+        u16(stats["turns"]), u16(stats["tool_calls"]), u16(stats["errors"]),
+        min(int(stats["elapsed"]), 0xFFFFFFFF),
+    )
+
+
+class TranscriptTailer:
+    """按会话增量读取会话记录并维护统计"""
+
+    def __init__(self, stats_dir: str, max_scan: int = MAX_SCAN_BYTES):
+        self._dir = stats_dir
+        self._max_scan = max_scan
+
+    def stats_path(self, session_id: str) -> str:
+        return os.path.join(self._dir, _SAFE_NAME.sub("_", session_id) + ".json")
+
+    def update(self, session_id: str, transcript_path: str) -> dict:
+        """读取会话记录新增的内容 (最多 max_scan 字节), 返回累加后的统计"""
+        if not session_id or not transcript_path:
+            return None
+        os.makedirs(self._dir, exist_ok=True)
+        path = self.stats_path(session_id)
+        created = not os.path.exists(path)
+
+        with SharedState(path) as data:
+            try:
+                size = os.path.getsize(transcript_path)
+            except OSError:
+                return data.get("stats")
+
+            offset = data.get("offset", 0)
+            # 换了文件或文件被截断/重写: 从头开始统计
+            if data.get("path") != transcript_path or size < offset:
+                data.clear()
+                offset = 0
+            stats = data.get("stats") or new_stats()
+
+            if size > offset:
+                offset = self._consume(transcript_path, offset, stats, self._max_scan)
+
+            data.update({
+                "path": transcript_path,
+                "offset": offset,
+                "stats": stats,
+                "updated": time.time(),
+            })
+
+        if created:
+            self._prune()
+        return stats
+
+    @staticmethod
+    def _consume(transcript_path: str, offset: int, stats: dict, limit: int = None) -> int:
+        """
+        从 offset 读到文件末尾, 只处理完整的行, 返回新的偏移量。
+        给出 limit 时读取约 limit 字节 (至少处理完一行) 后停止。
+        """
+        start = offset
+        with open(transcript_path, "rb") as f:
+            f.seek(offset)
+            pending = bytearray()
+            while True:
+                if limit is not None and offset > start and offset - start >= limit:
+                    break
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    break
+                pending += chunk
+                # 只在新读入的块中找换行, 超长单行不会被反复扫描
+                end = chunk.rfind(b"\n")
+                if end < 0:
+                    continue
+                end += len(pending) - len(chunk)
+                for line in pending[:end].split(b"\n"):
+                    if not line.strip():
+                        continue
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if isinstance(entry, dict):
+                        apply_entry(stats, entry)
+                offset += end + 1
+                del pending[:end + 1]
+        # 末尾未写完的半行留到下次读取
+        return offset
+
+    def _prune(self):
+        """删除长期未更新的会话统计文件 (连同锁文件)"""
+        now = time.time()
+        try:
+            names = os.listdir(self._dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self._dir, name)
+            try:
+                if now - os.path.getmtime(path) > STATS_RETENTION:
+                    os.remove(path)
+                    os.remove(path + ".lock")
+            except OSError:
+                continue
+
+
+if __name__ == "__main__":
+    import sys
+
+    # 调试用: python transcript_tail.py <transcript.jsonl>
+    result = new_stats()
+    TranscriptTailer._consume(sys.argv[1], 0, result)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
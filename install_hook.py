@@ -6,8 +6,19 @@ Claude Code Hook 安装脚本
     python install_hook.py                  # 自动检测 hook 文件夹（脚本同级目录的 ../hook）
     python install_hook.py /path/to/hook    # 手动指定 hook 文件夹路径
     python install_hook.py --uninstall      # 从全局配置中移除 hooks（从备份恢复）
+
+    # 只注册部分事件 / 只对部分工具触发 / 高频事件采样
+    python install_hook.py --events PermissionRequest,Notification,Stop,SessionEnd
+    python install_hook.py --matcher "PreToolUse=Bash|Edit|Write" --sample PostToolUse=4
+
+安装选项:
+    --events E1,E2      只注册这些事件 (默认全部)
+    --matcher E=REGEX   事件的工具名匹配 (仅 PreToolUse/PostToolUse/PermissionRequest),
+                        不匹配的工具调用 Claude Code 不会启动 hook 进程, 可重复
+    --sample E=N        每 N 次调用只处理 1 次 (仅 PreToolUse/PostToolUse), 可重复
 """
 
+import argparse
 import json
 import os
 import platform
@@ -105,32 +116,50 @@ def resolve_hook_dir(arg) -> Path:
     return hook_dir
 
 
-def build_hooks_config(python_exe: str, hook_dir: Path) -> dict:
-    """根据 hook 文件夹中实际存在的脚本构建 hooks 配置。"""
+def build_hooks_config(python_exe: str, hook_dir: Path,
+                       events=None, matchers=None, samples=None) -> dict:
+    """
+    根据 hook 文件夹中实际存在的脚本构建 hooks 配置。
+
+    :param events: 要注册的事件名列表, None 表示全部
+    :param matchers: {事件名: 工具名正则}
+    :param samples: {事件名: N}, 每 N 次调用处理 1 次
+    """
+    matchers = matchers or {}
+    samples = samples or {}
     hooks = {}
     # 使用正斜杠路径，兼容性更好
     hook_dir_str = str(hook_dir).replace("\\", "/")
+    # 如果 python_exe 包含路径，也统一用正斜杠
+    python_exe_normalized = python_exe.replace("\\", "/")
+    # 事件脚本只定义 run(), 通过 hook_install.py 分发执行 (采样参数也由它解析)
+    dispatcher = hook_dir / "hook_install.py"
 
     for event_name, timeout in HOOK_EVENTS:
+        if events is not None and event_name not in events:
+            continue
         script_path = hook_dir / f"{event_name}.py"
         if not script_path.is_file():
             continue
 
-        script_path_str = f"{hook_dir_str}/{event_name}.py"
-        # 如果 python_exe 包含路径，也统一用正斜杠
-        python_exe_normalized = python_exe.replace("\\", "/")
+        if dispatcher.is_file():
+            command = f'"{python_exe_normalized}" "{hook_dir_str}/hook_install.py" {event_name}'
+            if samples.get(event_name, 1) > 1:
+                command += f" --sample {samples[event_name]}"
+        else:
+            command = f'"{python_exe_normalized}" "{hook_dir_str}/{event_name}.py"'
 
-        hooks[event_name] = [
+        entry = {}
+        if matchers.get(event_name):
+            entry["matcher"] = matchers[event_name]
+        entry["hooks"] = [
             {
-                "hooks": [
-                    {
-                        "type": "command",
-                        "command": f'"{python_exe_normalized}" "{script_path_str}"',
-                        "timeout": timeout,
-                    }
-                ]
+                "type": "command",
+                "command": command,
+                "timeout": timeout,
             }
         ]
+        hooks[event_name] = [entry]
 
     return hooks
 
@@ -167,7 +196,7 @@ def save_settings(settings_path: Path, settings: dict):
     print(f"[INFO] 配置已写入: {settings_path}")
 
 
-def install(hook_dir_arg = None):
+def install(hook_dir_arg = None, events=None, matchers=None, samples=None):
     """安装 hooks 到全局配置。"""
     settings_path = get_claude_global_settings_path()
     print(f"[INFO] 全局配置路径: {settings_path}")
@@ -185,7 +214,9 @@ def install(hook_dir_arg = None):
 
     # 4. 加载现有配置并合并
     settings = load_settings(settings_path)
-    new_hooks = build_hooks_config(python_exe, hook_dir)
+    new_hooks = build_hooks_config(python_exe, hook_dir, events, matchers, samples)
+    if samples and not (hook_dir / "hook_install.py").is_file():
+        print("[WARN] hook 文件夹中没有 hook_install.py，采样设置不会生效。")
 
     settings["hooks"] = new_hooks
 
@@ -193,8 +224,13 @@ def install(hook_dir_arg = None):
     save_settings(settings_path, settings)
 
     print(f"\n[OK] 已成功安装 {len(new_hooks)} 个 hook 事件:")
-    for name in new_hooks:
-        print(f"  - {name}")
+    for name, entries in new_hooks.items():
+        extra = []
+        if "matcher" in entries[0]:
+            extra.append(f"matcher={entries[0]['matcher']}")
+        if samples and samples.get(name, 1) > 1:
+            extra.append(f"采样 1/{samples[name]}")
+        print(f"  - {name}" + (f" ({', '.join(extra)})" if extra else ""))
 
 
 def uninstall():
@@ -226,16 +262,31 @@ def uninstall():
             print("[INFO] 配置中不存在 hooks，无需卸载。")
 
 
+def parse_args(argv):
+    """解析并校验命令行参数 (安装选项的定义和校验与 hook/hook_install.py 共用)"""
+    sys.path.insert(0, str(Path(__file__).resolve().parent / "hook"))
+    from hook_install import add_install_options, check_install_options
+
+    parser = argparse.ArgumentParser(
+        description="将 hook 注册到 Claude Code 全局配置",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("hook_dir", nargs="?", help="hook 文件夹路径 (默认 ./hook)")
+    parser.add_argument("--uninstall", action="store_true", help="从全局配置中移除 hooks")
+    add_install_options(parser)
+    args = parser.parse_args(argv)
+    check_install_options(parser, args)
+    return args
+
+
 def main():
-    args = sys.argv[1:]
+    args = parse_args(sys.argv[1:])
 
-    if "--uninstall" in args:
+    if args.uninstall:
         uninstall()
-    elif "--help" in args or "-h" in args:
-        print(__doc__)
     else:
-        hook_dir_arg = args[0] if args else None
-        install(hook_dir_arg)
+        install(args.hook_dir, args.events, args.matchers, args.samples)
 
 
 if __name__ == "__main__":
@@ -2,7 +2,10 @@
 4键键盘配置工具 — 入口
 """
 
+import multiprocessing
+
 from src.app import run
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后帧准备进程池需要
     run()
@@ -7,6 +7,9 @@ from PySide6.QtWidgets import QApplication
 from PySide6.QtCore import Qt
 
 from .ui.main_window import MainWindow
+from .core.frame_cache import default_cache
+from .core.frame_pool import default_preparer
+from .ui.widgets.frame_list_model import default_thumbnail_loader
 
 
 def run():
@@ -22,4 +25,9 @@ def run():
     window = MainWindow()
     window.show()
 
-    sys.exit(app.exec())
+    ret = app.exec()
+    # 取消尚未开始的后台帧预处理, 避免退出时等待
+    default_cache().shutdown()
+    default_preparer().shutdown()
+    default_thumbnail_loader().shutdown()
+    sys.exit(ret)
@@ -102,11 +102,13 @@ class DeviceService(QObject):
     # 大批量数据写入
     # ==============================
 
-    def write_large_data(self, address: int, data: bytes, timeout: float = 5.0):
-        """分块写入大量数据到设备"""
+    def write_large_data(self, address: int, data, timeout: float = 5.0):
+        """分块写入大量数据到设备, data 为任意 bytes-like 对象"""
         if address % 4096 != 0:
             raise ValueError("Address must be 4K aligned")
 
+        # 切片 memoryview 不复制数据 (帧包映射内存可直接传入)
+        data = memoryview(data).cast("B")
         total_len = len(data)
         offset = 0
 
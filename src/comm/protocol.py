@@ -102,9 +102,14 @@ class MacroAction(IntEnum):
 # TCP Packet Build/Parse
 # ==============================
 
+def build_tcp_header(pkt_type: int, length: int) -> bytes:
+    """TCP 包头: [Type:1][Length:2 LE]"""
+    return struct.pack("<BH", pkt_type, length)
+
+
 def build_tcp_packet(pkt_type: int, data: bytes = b"") -> bytes:
     """构建 TCP 包: [Type:1][Length:2 LE][Data:N]"""
-    return struct.pack("<BH", pkt_type, len(data)) + data
+    return build_tcp_header(pkt_type, len(data)) + data
 
 
 # ==============================
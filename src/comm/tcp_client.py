@@ -10,7 +10,7 @@ from typing import Optional
 
 from PySide6.QtCore import QObject, Signal
 
-from .protocol import build_tcp_packet
+from .protocol import build_tcp_header
 
 
 class TcpClient(QObject):
@@ -25,6 +25,7 @@ class TcpClient(QObject):
         self._connected = False
         self._recv_thread: Optional[threading.Thread] = None
         self._stop = False
+        self._send_lock = threading.Lock()
 
     @property
     def connected(self) -> bool:
@@ -34,6 +35,8 @@ class TcpClient(QObject):
         """连接到桥接器"""
         self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._sock.connect((host, port))
+        # 包头和数据分两次写入, 关闭 Nagle 避免数据等待包头的 ACK
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
         self._connected = True
         self._stop = False
         self._recv_thread = threading.Thread(target=self._recv_loop, daemon=True)
@@ -53,9 +56,26 @@ class TcpClient(QObject):
         self.connection_changed.emit(False)
 
     def send(self, pkt_type: int, data: bytes = b""):
-        """发送 TCP 包"""
-        if self._sock and self._connected:
-            self._sock.sendall(build_tcp_packet(pkt_type, data))
+        """
+        发送 TCP 包。data 可以是任意 bytes-like 对象 (如帧包映射内存的 memoryview),
+        包头和数据分别写入 socket, 数据不经过拼接复制; 发送锁保证多线程发送时包不交错。
+        """
+        sock = self._sock
+        if sock and self._connected:
+            header = build_tcp_header(pkt_type, len(data))
+            with self._send_lock:
+                if not data:
+                    sock.sendall(header)
+                elif hasattr(sock, "sendmsg"):
+                    sent = sock.sendmsg([header, data])
+                    if sent < len(header):
+                        sock.sendall(header[sent:])
+                        sent = len(header)
+                    if sent - len(header) < len(data):
+                        sock.sendall(memoryview(data)[sent - len(header):])
+                else:
+                    sock.sendall(header)
+                    sock.sendall(data)
 
     def _recv_loop(self):
         """接收线程"""
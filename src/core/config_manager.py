@@ -1,11 +1,20 @@
 """
 配置管理 — JSON 导入/导出
+
+模式引用的帧包 (DisplayMode.pack_path) 位于配置文件所在目录 (或其子目录) 时
+以相对路径保存, 配置和帧包一起复制到其他机器后仍可使用。
+
+给出 ContentWatcher 时监视最近一次加载/保存的配置文件, 文件在外部被修改后
+由 watcher.changed 通知; 自己保存时更新记录的哈希, 不会触发通知。
 """
 
 import json
+import os
 from pathlib import Path
+from typing import Optional
 
 from .keymap import KeyboardConfig
+from .frame_pack import PACK_SUFFIX, build_pack
 
 
 class ConfigManager:
@@ -13,11 +22,38 @@ class ConfigManager:
 
     SCHEMA_VERSION = 1
 
+    def __init__(self, watcher=None):
+        self.watcher = watcher       # 可选的 ContentWatcher
+        self.path: Optional[str] = None
+
     def save(self, config: KeyboardConfig, path: str):
         """保存配置到 JSON 文件"""
         data = config.to_dict()
+        base = Path(path).resolve().parent
+        for mode in data.get("modes", []):
+            display = mode.get("display", {})
+            if display.get("pack_path"):
+                display["pack_path"] = self._relative_to(display["pack_path"], base)
         with open(path, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        self._watch(path)
+
+    def save_with_packs(self, config: KeyboardConfig, path: str) -> list[str]:
+        """
+        为每个有帧的模式生成帧包 (<配置名>.mode<N>.kbpack, 与配置文件同目录),
+        写入 pack_path 后保存配置, 返回生成的帧包路径。
+        """
+        target = Path(path).resolve()
+        packs = []
+        for mode in config.modes:
+            if not mode.display.frame_paths:
+                continue
+            pack_path = target.with_name(f"{target.stem}.mode{mode.mode_id}{PACK_SUFFIX}")
+            if build_pack(str(pack_path), mode.display):
+                mode.display.pack_path = str(pack_path)
+                packs.append(str(pack_path))
+        self.save(config, path)
+        return packs
 
     def load(self, path: str) -> KeyboardConfig:
         """从 JSON 文件加载配置"""
@@ -28,4 +64,24 @@ class ConfigManager:
         if version > self.SCHEMA_VERSION:
             raise ValueError(f"配置文件版本 {version} 不兼容，当前支持版本 {self.SCHEMA_VERSION}")
 
-        return KeyboardConfig.from_dict(data)
+        config = KeyboardConfig.from_dict(data)
+        base = Path(path).resolve().parent
+        for mode in config.modes:
+            if mode.display.pack_path and not os.path.isabs(mode.display.pack_path):
+                mode.display.pack_path = str(base / mode.display.pack_path)
+        self._watch(path)
+        return config
+
+    def _watch(self, path: str):
+        """把 path 设为当前配置文件; 监视中时记录其当前内容"""
+        self.path = os.path.abspath(path)
+        if self.watcher is not None:
+            self.watcher.set_files([self.path])
+            self.watcher.refresh(self.path)
+
+    @staticmethod
+    def _relative_to(pack_path: str, base: Path) -> str:
+        try:
+            return Path(pack_path).resolve().relative_to(base).as_posix()
+        except ValueError:
+            return pack_path
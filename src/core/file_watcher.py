@@ -0,0 +1,148 @@
+"""
+文件监视 — 基于 QFileSystemWatcher, 只报告内容确实改变的文件
+
+编辑器保存文件的方式各不相同: 原地写入、先写临时文件再替换 (原文件被删除后
+QFileSystemWatcher 不再监视它)、一次保存触发多次通知, 或只更新了修改时间。因此:
+  - 同时监视文件所在目录, 文件被替换后重新加入监视
+  - 通知经短暂延迟合并后统一处理
+  - 先比较修改时间和大小, 未变的文件不读取内容 (目录通知会涉及所有同目录的文件);
+    变了再按内容哈希判断, 内容未变的通知被忽略
+  - 开始监视时的基准哈希在后台线程计算, 不阻塞界面
+  - 程序自己写入的文件调用 refresh() 更新基准
+不再需要时 (窗口关闭) 调用 shutdown() 停止监视并取消未完成的哈希。
+"""
+
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from PySide6.QtCore import QFileSystemWatcher, QObject, QTimer, Signal
+
+from .frame_cache import file_digest
+
+
+def _stat_key(path: str) -> Optional[tuple]:
+    """(mtime_ns, 大小), 文件不存在时返回 None"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _done(value) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class ContentWatcher(QObject):
+    """
+    监视一组文件, 内容改变 (或被删除) 时发出 changed(绝对路径列表)。
+
+    用法:
+        watcher = ContentWatcher(parent)
+        watcher.changed.connect(on_changed)
+        watcher.set_files(paths)
+    """
+
+    changed = Signal(list)
+
+    def __init__(self, parent=None, delay_ms: int = 300):
+        super().__init__(parent)
+        self._watcher = QFileSystemWatcher(self)
+        self._watcher.fileChanged.connect(self._on_file_changed)
+        self._watcher.directoryChanged.connect(self._on_directory_changed)
+        self._stats: dict[str, Optional[tuple]] = {}
+        self._digests: dict[str, Future] = {}     # 基准内容哈希 (可能仍在后台计算)
+        self._pending: set[str] = set()
+        self._hasher = None            # 计算基准哈希的线程, 首次需要时创建
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self._flush)
+
+    def files(self) -> list[str]:
+        return sorted(self._stats)
+
+    def set_files(self, paths: Iterable[str]):
+        """替换监视的文件集合; 新加入的文件记录当前状态和内容哈希, 已在监视的保持不变"""
+        wanted = {os.path.abspath(p) for p in paths}
+        removed = [p for p in self._stats if p not in wanted]
+        for path in removed:
+            del self._stats[path]
+            del self._digests[path]
+            self._pending.discard(path)
+        added = [p for p in wanted if p not in self._stats]
+        for path in added:
+            self._record(path)
+        self._sync_watches()
+
+    def refresh(self, path: str):
+        """重新记录 path 的状态和内容哈希 (程序自己写入后调用, 不触发 changed)"""
+        path = os.path.abspath(path)
+        if path in self._stats:
+            self._record(path)
+            self._pending.discard(path)
+            self._sync_watches()
+
+    def _record(self, path: str):
+        if self._hasher is None:
+            self._hasher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="file-digest")
+        self._stats[path] = _stat_key(path)
+        self._digests[path] = self._hasher.submit(file_digest, path)
+
+    def clear(self):
+        self.set_files(())
+
+    def shutdown(self):
+        """停止监视, 取消未开始的哈希计算 (不等待进行中的那个); 之后可以重新 set_files"""
+        self._timer.stop()
+        self.clear()
+        if self._hasher is not None:
+            self._hasher.shutdown(wait=False, cancel_futures=True)
+            self._hasher = None
+
+    def _sync_watches(self):
+        files = {p for p in self._stats if os.path.exists(p)}
+        dirs = {os.path.dirname(p) for p in self._stats}
+        dirs = {d for d in dirs if os.path.isdir(d)}
+        watched = set(self._watcher.files()) | set(self._watcher.directories())
+        stale = [p for p in watched if p not in files and p not in dirs]
+        if stale:
+            self._watcher.removePaths(stale)
+        new = [p for p in files | dirs if p not in watched]
+        if new:
+            self._watcher.addPaths(new)
+
+    def _on_file_changed(self, path: str):
+        if path in self._stats:
+            self._pending.add(path)
+            self._timer.start()
+
+    def _on_directory_changed(self, directory: str):
+        # 文件被替换、删除或重新创建, 目录内的监视文件都需要重新检查 (先只比较 stat)
+        for path in self._stats:
+            if os.path.dirname(path) == directory:
+                self._pending.add(path)
+        if self._pending:
+            self._timer.start()
+
+    def _flush(self):
+        changed = []
+        for path in sorted(self._pending):
+            if path not in self._stats:
+                continue
+            stat = _stat_key(path)
+            if stat == self._stats[path]:
+                continue   # 修改时间和大小都没变, 不读取内容
+            self._stats[path] = stat
+            old = self._digests[path].result()
+            digest = file_digest(path) if stat is not None else None
+            self._digests[path] = _done(digest)
+            if digest != old:
+                changed.append(path)
+        self._pending.clear()
+        self._sync_watches()
+        if changed:
+            self.changed.emit(changed)
@@ -0,0 +1,234 @@
+"""
+帧容量优化 — 把三个模式的动画重采样到设备帧容量 (all_mode_max_pic) 以内
+
+设备按固定间隔 (update_pic 的 time_delay) 播放, 而导入的 GIF 每帧时长不一、帧数往往
+远超容量。对每个模式:
+  1. 建立时间线: 动图帧引用使用源文件中的帧时长, 普通图片按模式 FPS 计时
+  2. 合并相邻的近似重复帧 (缩略灰度图的平均差值低于阈值), 时长累加
+  3. 按能分辨最短片段的帧率 (不超过模式 FPS) 在时间线上等间隔采样
+三个模式的总帧数超过容量时, 每次把当前帧数最多的模式降低 1 FPS, 直到放得下;
+全部降到 1 FPS 仍放不下时按比例截取 (播放会变快, ModePlan.truncated 为 True)。
+"""
+
+import math
+import os
+import threading
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+from PIL import Image
+
+from .image_processor import (
+    iter_animation_frames, load_image, parse_frame_ref, MAX_TOTAL_FRAMES,
+)
+from .frame_pack import open_pack
+
+MIN_FPS = 1
+MAX_FPS = 30
+DEFAULT_FRAME_MS = 100       # 源文件未给出时长 (或小于 20ms, 浏览器同样按 100ms 处理) 时使用
+DUPLICATE_THRESHOLD = 2.0    # 缩略灰度图平均差值 (0-255) 低于此值视为重复帧
+_SIGNATURE_SIZE = (32, 16)
+
+
+@dataclass
+class Segment:
+    """时间线上的一段: 显示 path 持续 duration_ms 毫秒"""
+    path: str
+    duration_ms: int
+    signature: Optional[np.ndarray] = field(default=None, repr=False)
+
+
+@dataclass
+class ModePlan:
+    """单个模式的上传方案"""
+    fps: int
+    frame_paths: list[str]       # 重采样后的帧, 相邻帧可能重复
+    source_frames: int           # 原始帧数
+    duration_ms: int             # 时间线总时长
+    truncated: bool = False      # 1 FPS 仍放不下, 按比例截取
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.frame_paths)
+
+
+def _signature(img: Image.Image) -> np.ndarray:
+    small = img.convert("L").resize(_SIGNATURE_SIZE, Image.BILINEAR, reducing_gap=2.0)
+    return np.asarray(small, dtype=np.float32)
+
+
+def _difference(a: np.ndarray, b: np.ndarray) -> float:
+    return float(np.mean(np.abs(a - b)))
+
+
+def frame_ms(duration) -> int:
+    """源文件给出的帧时长 (毫秒), 缺失或过短时使用 DEFAULT_FRAME_MS"""
+    if not duration or duration < 20:
+        return DEFAULT_FRAME_MS
+    return int(duration)
+
+
+# 动图信息缓存: (绝对路径, mtime_ns, 大小) -> [(帧时长, 缩略签名)]
+_animation_info = {}
+_animation_lock = threading.Lock()
+
+
+def animation_info(path: str) -> list[tuple[int, np.ndarray]]:
+    """顺序解码一遍动图, 返回每帧的 (时长毫秒, 缩略签名), 结果按文件状态缓存"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _animation_lock:
+        info = _animation_info.get(key)
+    if info is None:
+        info = [(frame_ms(frame.info.get("duration")), _signature(frame))
+                for frame in iter_animation_frames(path)]
+        with _animation_lock:
+            _animation_info[key] = info
+    return info
+
+
+# 静态图片签名缓存: (绝对路径, mtime_ns, 大小) -> 缩略签名
+_still_signatures = {}
+
+
+def still_signature(path: str) -> np.ndarray:
+    """静态图片的缩略签名, 结果按文件状态缓存 (重复规划时不再解码)"""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _animation_lock:
+        signature = _still_signatures.get(key)
+    if signature is None:
+        signature = _signature(load_image(path, _SIGNATURE_SIZE, "fast"))
+        with _animation_lock:
+            _still_signatures[key] = signature
+    return signature
+
+
+def build_timeline(paths: list[str], fps: int, pack=None) -> list[Segment]:
+    """把帧列表转换为时间线 (源文件不存在时使用帧包 pack 中的帧, 都没有则跳过)"""
+    still_ms = round(1000 / max(MIN_FPS, fps))
+    timeline = []
+    for path in paths:
+        source, index = parse_frame_ref(path)
+        if pack is not None and path in pack and not os.path.exists(source):
+            i = pack.index_of(path)
+            timeline.append(Segment(path, pack.duration(i), _signature(pack.thumbnail(i))))
+            continue
+        try:
+            if index is None:
+                timeline.append(Segment(path, still_ms, still_signature(path)))
+            else:
+                info = animation_info(source)
+                if index < len(info):
+                    duration, signature = info[index]
+                    timeline.append(Segment(path, duration, signature))
+        except (OSError, ValueError):
+            continue
+    return timeline
+
+
+def merge_similar(timeline: list[Segment], threshold: float = DUPLICATE_THRESHOLD) -> list[Segment]:
+    """合并相邻的近似重复帧; 与所在片段的第一帧比较, 缓慢渐变不会被逐帧累积合并"""
+    merged = []
+    for seg in timeline:
+        last = merged[-1] if merged else None
+        if (last is not None and last.signature is not None and seg.signature is not None
+                and _difference(last.signature, seg.signature) < threshold):
+            last.duration_ms += seg.duration_ms
+        else:
+            merged.append(Segment(seg.path, seg.duration_ms, seg.signature))
+    return merged
+
+
+def required_fps(timeline: list[Segment], max_fps: int) -> int:
+    """能让最短片段至少占一帧的帧率, 限制在 [MIN_FPS, max_fps]"""
+    if not timeline:
+        return max(MIN_FPS, max_fps)
+    shortest = min(seg.duration_ms for seg in timeline)
+    return max(MIN_FPS, min(max_fps, math.ceil(1000 / shortest)))
+
+
+def _frames_at(duration_ms: int, fps: int) -> int:
+    return max(1, round(duration_ms * fps / 1000))
+
+
+def resample(timeline: list[Segment], fps: int, count: Optional[int] = None) -> list[str]:
+    """
+    在时间线上等间隔采样, 每个采样点取当时显示的帧。
+    count 为 None 时按 fps 计算帧数, 否则恰好采样 count 帧 (覆盖整条时间线)。
+    """
+    if not timeline:
+        return []
+    ends = []
+    total = 0
+    for seg in timeline:
+        total += seg.duration_ms
+        ends.append(total)
+    n = count if count is not None else _frames_at(total, fps)
+    step = total / n
+    return [timeline[min(bisect_right(ends, (k + 0.5) * step), len(timeline) - 1)].path
+            for k in range(n)]
+
+
+def plan_modes(timelines: list[list[Segment]], max_fps: list[int],
+               capacity: int = MAX_TOTAL_FRAMES,
+               source_frames: Optional[list[int]] = None) -> list[ModePlan]:
+    """为多个模式分配帧预算, timelines 应已合并重复帧; source_frames 为合并前的帧数"""
+    if source_frames is None:
+        source_frames = [len(t) for t in timelines]
+    durations = [sum(seg.duration_ms for seg in t) for t in timelines]
+    fps = [required_fps(t, m) for t, m in zip(timelines, max_fps)]
+
+    def counts():
+        return [_frames_at(d, f) if t else 0 for t, d, f in zip(timelines, durations, fps)]
+
+    current = counts()
+    while sum(current) > capacity:
+        candidates = [i for i, t in enumerate(timelines) if t and fps[i] > MIN_FPS]
+        if not candidates:
+            break
+        i = max(candidates, key=lambda i: (current[i], fps[i]))
+        fps[i] -= 1
+        current = counts()
+
+    truncated = sum(current) > capacity
+    if truncated:
+        total = sum(current)
+        current = [max(1, c * capacity // total) if c else 0 for c in current]
+        while sum(current) > capacity:
+            i = max(range(len(current)), key=lambda i: current[i])
+            if current[i] <= 1:
+                raise ValueError(f"设备容量 {capacity} 帧不足以为每个模式保留 1 帧")
+            current[i] -= 1
+
+    plans = []
+    for t, d, f, c, limit, n in zip(timelines, durations, fps, current, max_fps, source_frames):
+        plans.append(ModePlan(
+            fps=f if t else max(MIN_FPS, limit),
+            frame_paths=resample(t, f, c if truncated else None),
+            source_frames=n,
+            duration_ms=d,
+            truncated=truncated and bool(t),
+        ))
+    return plans
+
+
+def plan_capacity(displays: list, capacity: int = MAX_TOTAL_FRAMES,
+                  threshold: float = DUPLICATE_THRESHOLD) -> list[ModePlan]:
+    """
+    为各模式的 DisplayMode 计算上传方案, 总帧数不超过 capacity。
+    首次会解码所有帧生成缩略签名 (结果按文件状态缓存), 耗时与帧数成正比,
+    界面中应在后台线程调用。
+    """
+    timelines = []
+    sources = []
+    for display in displays:
+        timeline = build_timeline(display.frame_paths, display.fps, open_pack(display.pack_path))
+        sources.append(len(timeline))
+        timelines.append(merge_similar(timeline, threshold))
+    max_fps = [min(MAX_FPS, max(MIN_FPS, display.fps)) for display in displays]
+    return plan_modes(timelines, max_fps, capacity, sources)
@@ -0,0 +1,339 @@
+"""
+帧缓存 — 复用 load_image + process_image 的结果
+
+同一张图片在选中预览、播放预览、上传时都需要缩放和 RGB565 编码, 结果只取决于
+源文件和处理参数。缓存键为 (路径, mtime, 文件大小, 宽, 高, 对齐方式, 背景色, 缩放预设):
+  - 内存: ProcessedFrame 的 LRU
+  - 磁盘: RGB565 数据 + 预览图原始 RGB 像素, 应用重启后仍可复用; 超过上限时按
+    最近使用时间淘汰 (命中时刷新文件的 mtime)
+添加帧时调用 prefetch() 在后台线程预先处理, 之后的预览和上传直接命中缓存。
+
+另有一层缩放结果缓存, 键为 (路径, mtime, 文件大小, 宽, 高, 缩放预设): 只改变对齐方式或
+背景色时跳过解码和缩放, 只重新合成、编码 (每帧约 0.1ms)。render() 走同样的路径但不写
+磁盘, 供调整对齐/背景时实时预览。
+"""
+
+import hashlib
+import os
+import struct
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from .image_processor import (
+    ProcessedFrame, load_image, resize_to_fit, compose_frame, make_frame_ref, parse_frame_ref,
+    DISPLAY_WIDTH, DISPLAY_HEIGHT, DEFAULT_PRESET,
+)
+
+# 磁盘文件格式: [magic:4][width:u16][height:u16][rgb565][preview rgb]
+_DISK_MAGIC = b"KBF1"
+_DISK_HEADER = struct.Struct("<4sHH")
+_DIGEST_CHUNK = 1024 * 1024
+
+
+def file_digest(path: str) -> Optional[str]:
+    """文件内容的哈希, 文件不存在或无法读取时返回 None (不依赖 Qt, 命令行工具也使用)"""
+    h = hashlib.blake2b(digest_size=16)
+    try:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(_DIGEST_CHUNK)
+                if not chunk:
+                    break
+                h.update(chunk)
+    except OSError:
+        return None
+    return h.hexdigest()
+
+
+@dataclass(frozen=True)
+class FrameKey:
+    """缓存键, 源文件被修改后 mtime/size 变化, 旧缓存自然失效 (帧引用按动图文件判断)"""
+    path: str
+    mtime_ns: int
+    size: int
+    width: int
+    height: int
+    h_align: int
+    v_align: int
+    bg_color: tuple
+    preset: str
+
+    @classmethod
+    def for_path(cls, path: str, width: int = DISPLAY_WIDTH, height: int = DISPLAY_HEIGHT,
+                 h_align: int = 0, v_align: int = 0,
+                 bg_color: tuple = (0, 0, 0), preset: str = DEFAULT_PRESET) -> "FrameKey":
+        source, index = parse_frame_ref(path)
+        source = os.path.abspath(source)
+        st = os.stat(source)
+        ref = source if index is None else make_frame_ref(source, index)
+        return cls(ref, st.st_mtime_ns, st.st_size, width, height,
+                   h_align, v_align, tuple(bg_color), preset)
+
+    def digest(self) -> str:
+        return hashlib.sha1(repr(self).encode("utf-8")).hexdigest()
+
+    def layer_key(self) -> tuple:
+        """缩放结果的缓存键 (与对齐方式、背景色无关)"""
+        return (self.path, self.mtime_ns, self.size, self.width, self.height, self.preset)
+
+
+def default_cache_dir() -> Path:
+    """本机缓存目录 (Windows: %LOCALAPPDATA%, 其他: ~/.cache)"""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(Path.home(), ".cache")
+    return Path(base) / "KeyboardConfig" / "frame_cache"
+
+
+class FrameCache:
+    """内存 LRU + 磁盘两级帧缓存, 线程安全"""
+
+    def __init__(self, cache_dir=None, max_items: int = 256,
+                 max_disk_bytes: int = 512 * 1024 * 1024, workers: int = 2,
+                 max_layers: int = 512):
+        self._dir = Path(cache_dir) if cache_dir is not None else default_cache_dir()
+        self._max_items = max_items
+        self._max_disk_bytes = max_disk_bytes
+        self._max_layers = max_layers
+        self._memory = OrderedDict()   # FrameKey -> ProcessedFrame
+        self._layers = OrderedDict()   # FrameKey.layer_key() -> 缩放后的 PIL Image
+        self._pending = {}             # FrameKey -> Future (正在处理的帧)
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._executor = None
+        self._writes = 0
+
+    # ---------------- 查询 ----------------
+
+    def get(self, path: str, **params) -> ProcessedFrame:
+        """
+        获取处理后的帧, 依次查内存、磁盘, 都未命中时处理并写入缓存。
+        params 同 process_image 的 width/height/h_align/v_align/bg_color/preset。
+        源文件不存在或无法解码时抛出 OSError。
+        """
+        key = FrameKey.for_path(path, **params)
+        frame = self._lookup(key)
+        if frame is not None:
+            return frame
+
+        # 后台预处理进行中时等待其结果, 避免重复计算
+        with self._lock:
+            future = self._pending.get(key)
+        if future is not None:
+            return future.result()
+        return self._compute(key)
+
+    def lookup(self, path: str, **params) -> Optional[ProcessedFrame]:
+        """查内存和磁盘缓存, 未命中返回 None (不做处理)"""
+        try:
+            key = FrameKey.for_path(path, **params)
+        except OSError:
+            return None
+        return self._lookup(key)
+
+    def render(self, path: str, **params) -> ProcessedFrame:
+        """
+        与 get 相同, 但新合成的帧只放入内存缓存, 不写磁盘。
+        用于调整对齐方式/背景色时的实时预览, 中间的每个取值不必持久化。
+        """
+        key = FrameKey.for_path(path, **params)
+        with self._lock:
+            frame = self._memory.get(key)
+            if frame is not None:
+                self._memory.move_to_end(key)
+                return frame
+        frame = self._compose(key)
+        self._remember(key, frame)
+        return frame
+
+    def put(self, key: FrameKey, frame: ProcessedFrame):
+        """
+        写入在别处 (如进程池) 处理好的帧。
+        key 应在读取源文件之前生成, 处理期间文件被修改时缓存不会错配。
+        """
+        self._remember(key, frame)
+        self._write_disk(key, frame)
+
+    def peek(self, path: str, **params) -> Optional[ProcessedFrame]:
+        """只查内存缓存, 未命中返回 None (适合 UI 线程的快速路径)"""
+        try:
+            key = FrameKey.for_path(path, **params)
+        except OSError:
+            return None
+        with self._lock:
+            frame = self._memory.get(key)
+            if frame is not None:
+                self._memory.move_to_end(key)
+            return frame
+
+    def prefetch(self, paths, **params) -> list:
+        """在后台线程预处理 paths, 返回 Future 列表 (已缓存的帧不会重复处理)"""
+        futures = []
+        for path in paths:
+            try:
+                key = FrameKey.for_path(path, **params)
+            except OSError:
+                continue
+            with self._lock:
+                if key in self._memory:
+                    continue
+                future = self._pending.get(key)
+                if future is None:
+                    if self._executor is None:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self._workers, thread_name_prefix="frame-cache"
+                        )
+                    future = self._executor.submit(self._prefetch_one, key)
+                    self._pending[key] = future
+            futures.append(future)
+        return futures
+
+    def clear_memory(self):
+        with self._lock:
+            self._memory.clear()
+            self._layers.clear()
+
+    def shutdown(self):
+        """取消未开始的预处理并等待进行中的任务结束"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    # ---------------- 内部实现 ----------------
+
+    def _prefetch_one(self, key: FrameKey) -> ProcessedFrame:
+        try:
+            frame = self._lookup(key)
+            return frame if frame is not None else self._compute(key)
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _lookup(self, key: FrameKey) -> Optional[ProcessedFrame]:
+        with self._lock:
+            frame = self._memory.get(key)
+            if frame is not None:
+                self._memory.move_to_end(key)
+                return frame
+        frame = self._read_disk(key)
+        if frame is not None:
+            self._remember(key, frame)
+        return frame
+
+    def _compute(self, key: FrameKey) -> ProcessedFrame:
+        frame = self._compose(key)
+        self._remember(key, frame)
+        self._write_disk(key, frame)
+        return frame
+
+    def _compose(self, key: FrameKey) -> ProcessedFrame:
+        """由缩放结果合成 key 对应的帧, 缩放结果未缓存时先解码并缩放"""
+        layer_key = key.layer_key()
+        with self._lock:
+            resized = self._layers.get(layer_key)
+            if resized is not None:
+                self._layers.move_to_end(layer_key)
+        if resized is None:
+            img = load_image(key.path, (key.width, key.height), key.preset)
+            resized = resize_to_fit(img, key.width, key.height, key.preset)
+            with self._lock:
+                self._layers[layer_key] = resized
+                while len(self._layers) > self._max_layers:
+                    self._layers.popitem(last=False)
+        return compose_frame(resized, key.width, key.height, key.h_align, key.v_align, key.bg_color)
+
+    def _remember(self, key: FrameKey, frame: ProcessedFrame):
+        with self._lock:
+            self._memory[key] = frame
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._max_items:
+                self._memory.popitem(last=False)
+
+    def _disk_path(self, key: FrameKey) -> Path:
+        digest = key.digest()
+        return self._dir / digest[:2] / f"{digest}.frame"
+
+    def _read_disk(self, key: FrameKey) -> Optional[ProcessedFrame]:
+        path = self._disk_path(key)
+        try:
+            with open(path, "rb") as f:
+                blob = f.read()
+        except OSError:
+            return None
+        if len(blob) < _DISK_HEADER.size:
+            return None
+        magic, width, height = _DISK_HEADER.unpack_from(blob)
+        rgb565_len = width * height * 2
+        if magic != _DISK_MAGIC or len(blob) != _DISK_HEADER.size + rgb565_len + width * height * 3:
+            return None
+        body = memoryview(blob)[_DISK_HEADER.size:]
+        preview = Image.frombytes("RGB", (width, height), bytes(body[rgb565_len:]))
+        try:
+            os.utime(path)   # 记录使用时间, _prune_disk 按它淘汰
+        except OSError:
+            pass
+        return ProcessedFrame(rgb565_data=bytes(body[:rgb565_len]), preview_image=preview)
+
+    def _write_disk(self, key: FrameKey, frame: ProcessedFrame):
+        path = self._disk_path(key)
+        preview = frame.preview_image
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(_DISK_HEADER.pack(_DISK_MAGIC, preview.width, preview.height))
+                f.write(frame.rgb565_data)
+                f.write(preview.tobytes())
+            os.replace(tmp_path, path)
+        except OSError:
+            # 磁盘缓存只是加速手段, 写入失败不影响使用
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        self._writes += 1
+        if self._writes % 64 == 0:
+            self._prune_disk()
+
+    def _prune_disk(self):
+        """磁盘缓存超过上限时删除最久未使用 (mtime 最早) 的文件, 降到上限的 3/4"""
+        entries = []
+        total = 0
+        for path in self._dir.glob("*/*.frame"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+        if total <= self._max_disk_bytes:
+            return
+        entries.sort()
+        target = self._max_disk_bytes * 3 // 4
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+                total -= size
+            except OSError:
+                continue
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def default_cache() -> FrameCache:
+    """应用共享的帧缓存实例"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = FrameCache()
+        return _default_cache
@@ -0,0 +1,288 @@
+"""
+帧包 (.kbpack) — 预编码的 RGB565 帧 + 预览缩略图, 内存映射读取
+
+配置只记录 frame_paths 时, 每次预览、上传都要重新读取并编码源图片, 换一台机器
+也无法使用。帧包把一个模式的帧预先编码好, 配置通过 DisplayMode.pack_path 引用:
+
+    [header][index: count * entry][meta JSON][填充到页边界]
+    [frame 0: rgb565, 填充到 stride][frame 1]...[thumb 0][thumb 1]...
+
+  - header: magic "KBPK", 版本, 帧尺寸, 缩略图尺寸, fps, 帧数, stride, 各区偏移
+  - index:  每帧的显示时长 (毫秒) 和 RGB565 数据的 SHA-1
+  - meta:   每帧的源路径 (帧引用) 及写入时源文件的 mtime/size, 处理参数
+  - 帧数据按页 (4096) 对齐, 160x80 时 stride 正好等于设备的 FRAME_SLOT_SIZE
+
+FramePack 用 mmap 打开, frame(i) 返回映射内存的 memoryview, 上传时直接发送不复制。
+源文件仍存在且未修改、处理参数一致时帧包与源图片等价; 源文件缺失时帧包是唯一来源。
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+from PIL import Image
+
+from .image_processor import (
+    ProcessedFrame, decode_rgb565_be, parse_frame_ref, DISPLAY_WIDTH, DISPLAY_HEIGHT,
+)
+
+PACK_SUFFIX = ".kbpack"
+PACK_MAGIC = b"KBPK"
+PACK_VERSION = 1
+PAGE_SIZE = 4096
+THUMB_SIZE = (80, 40)
+
+# magic, version, width, height, thumb_w, thumb_h, fps, count, stride,
+# meta_offset, meta_len, frames_offset, thumbs_offset
+_HEADER = struct.Struct("<4sHHHHHHIIQIQQ")
+_ENTRY = struct.Struct("<I20s")   # duration_ms, sha1(rgb565)
+
+
+def _align(value: int, alignment: int = PAGE_SIZE) -> int:
+    return (value + alignment - 1) // alignment * alignment
+
+
+def _source_stat(ref: str) -> Optional[list]:
+    try:
+        st = os.stat(parse_frame_ref(ref)[0])
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def write_pack(
+    path: str,
+    sources: list[str],
+    frames: Iterable[ProcessedFrame],
+    durations: list[int],
+    fps: int,
+    params: Optional[dict] = None,
+    width: int = DISPLAY_WIDTH,
+    height: int = DISPLAY_HEIGHT,
+):
+    """
+    写入帧包。frames 按 sources 的顺序逐帧产出 (可以是生成器), 内存中只保留缩略图。
+    先写入临时文件, 完成后替换目标文件。
+    """
+    count = len(sources)
+    meta = json.dumps({
+        "sources": list(sources),
+        "stats": [_source_stat(s) for s in sources],
+        "params": params or {},
+    }, ensure_ascii=False).encode("utf-8")
+    meta_offset = _HEADER.size + count * _ENTRY.size
+    frames_offset = _align(meta_offset + len(meta))
+    frame_len = width * height * 2
+    stride = _align(frame_len)
+    thumbs_offset = frames_offset + count * stride
+    thumb_len = THUMB_SIZE[0] * THUMB_SIZE[1] * 3
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    entries = []
+    try:
+        with open(tmp_path, "wb") as f:
+            f.seek(frames_offset)
+            thumbs = []
+            for frame in frames:
+                if len(entries) >= count:
+                    raise ValueError("帧数多于 sources")
+                data = frame.rgb565_data
+                if len(data) != frame_len:
+                    raise ValueError(f"第 {len(entries)} 帧大小 {len(data)} 与 {width}x{height} 不符")
+                f.write(data)
+                f.write(bytes(stride - frame_len))
+                thumbs.append(frame.preview_image.resize(THUMB_SIZE, Image.BILINEAR).tobytes())
+                entries.append(_ENTRY.pack(int(durations[len(entries)]), hashlib.sha1(data).digest()))
+            if len(entries) != count:
+                raise ValueError(f"只产出 {len(entries)} 帧, 需要 {count} 帧")
+            for thumb in thumbs:
+                f.write(thumb)
+            assert f.tell() == thumbs_offset + count * thumb_len
+
+            f.seek(0)
+            f.write(_HEADER.pack(
+                PACK_MAGIC, PACK_VERSION, width, height, THUMB_SIZE[0], THUMB_SIZE[1],
+                fps, count, stride, meta_offset, len(meta), frames_offset, thumbs_offset,
+            ))
+            f.write(b"".join(entries))
+            f.write(meta)
+        _release(path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class FramePack:
+    """只读的帧包, 通过 mmap 访问"""
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except Exception:
+            self._mm.close()
+            raise
+
+    def _parse(self):
+        buf = self._mm
+        if len(buf) < _HEADER.size:
+            raise ValueError(f"{self.path} 不是有效的帧包")
+        (magic, version, self.width, self.height, tw, th, self.fps, count, self._stride,
+         meta_offset, meta_len, self._frames_offset, self._thumbs_offset) = _HEADER.unpack_from(buf)
+        if magic != PACK_MAGIC:
+            raise ValueError(f"{self.path} 不是有效的帧包")
+        if version > PACK_VERSION:
+            raise ValueError(f"帧包版本 {version} 不兼容，当前支持版本 {PACK_VERSION}")
+        self.thumb_size = (tw, th)
+        self._frame_len = self.width * self.height * 2
+        self._thumb_len = tw * th * 3
+        if (self._stride < self._frame_len
+                or self._thumbs_offset + count * self._thumb_len > len(buf)
+                or self._frames_offset + count * self._stride > self._thumbs_offset):
+            raise ValueError(f"{self.path} 已损坏")
+
+        self._entries = [_ENTRY.unpack_from(buf, _HEADER.size + i * _ENTRY.size) for i in range(count)]
+        meta = json.loads(bytes(buf[meta_offset:meta_offset + meta_len]).decode("utf-8"))
+        self.sources = meta.get("sources", [])
+        self.params = meta.get("params", {})
+        self._stats = meta.get("stats", [None] * count)
+        self._index = {source: i for i, source in enumerate(self.sources)}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, source: str) -> bool:
+        return source in self._index
+
+    def index_of(self, source: str) -> int:
+        return self._index[source]
+
+    def frame(self, index: int) -> memoryview:
+        """第 index 帧的 RGB565 数据 (映射内存的视图, 不复制)"""
+        base = self._frames_offset + index * self._stride
+        return memoryview(self._mm)[base:base + self._frame_len]
+
+    def duration(self, index: int) -> int:
+        return self._entries[index][0]
+
+    def digest(self, index: int) -> bytes:
+        """第 index 帧 RGB565 数据的 SHA-1"""
+        return self._entries[index][1]
+
+    def thumbnail(self, index: int) -> Image.Image:
+        base = self._thumbs_offset + index * self._thumb_len
+        return Image.frombytes("RGB", self.thumb_size, bytes(self._mm[base:base + self._thumb_len]))
+
+    def preview(self, index: int) -> Image.Image:
+        """由 RGB565 数据还原的预览图 (即设备上的显示效果)"""
+        return decode_rgb565_be(self.frame(index), self.width, self.height)
+
+    def close(self):
+        """关闭映射; 仍有 memoryview 在使用时抛出 BufferError"""
+        self._mm.close()
+
+    def processed(self, index: int) -> ProcessedFrame:
+        return ProcessedFrame(rgb565_data=bytes(self.frame(index)), preview_image=self.preview(index))
+
+    def usable(self, source: str, params: Optional[dict] = None) -> bool:
+        """
+        帧包中的 source 能否代替源文件:
+        源文件缺失时总是可用; 存在时要求未被修改且处理参数一致。
+        """
+        index = self._index.get(source)
+        if index is None:
+            return False
+        stat = _source_stat(source)
+        if stat is None:
+            return True
+        if params is not None:
+            # 与写入时一样经过 JSON, 元组 (bg_color) 与列表才能比较
+            params = json.loads(json.dumps(params))
+        return stat == self._stats[index] and (params is None or params == self.params)
+
+
+_packs = OrderedDict()   # (路径, mtime_ns, 大小) -> FramePack
+_packs_lock = threading.Lock()
+_MAX_PACKS = 8
+
+
+def open_pack(path: str) -> Optional[FramePack]:
+    """
+    打开 (并缓存) 帧包, 文件不存在或无效时返回 None。
+    映射在缓存淘汰后由垃圾回收关闭, 已交给上传线程的 memoryview 仍然有效。
+    """
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_mtime_ns, st.st_size)
+    with _packs_lock:
+        pack = _packs.get(key)
+        if pack is None:
+            try:
+                pack = FramePack(path)
+            except (OSError, ValueError):
+                return None
+            _packs[key] = pack
+            while len(_packs) > _MAX_PACKS:
+                _packs.popitem(last=False)
+        _packs.move_to_end(key)
+        return pack
+
+
+def _release(path: str):
+    """替换帧包文件前关闭它的映射 (Windows 不能替换仍被映射的文件)"""
+    path = os.path.abspath(path)
+    with _packs_lock:
+        for key in [k for k in _packs if k[0] == path]:
+            pack = _packs.pop(key)
+            try:
+                pack.close()
+            except BufferError:
+                pass   # 上传线程仍在使用, 由垃圾回收关闭
+
+
+def build_pack(path: str, display, cache=None) -> int:
+    """
+    把 DisplayMode 中存在的帧编码写入帧包 (经 FrameCache, 已缓存的帧不重新处理),
+    返回写入的帧数。源文件缺失的帧若在原帧包中可用则从原帧包复制。
+    """
+    from .frame_budget import build_timeline
+    from .frame_cache import default_cache
+
+    cache = cache or default_cache()
+    params = display.frame_params()
+    old = open_pack(display.pack_path)
+    timeline = {seg.path: seg.duration_ms for seg in build_timeline(display.frame_paths, display.fps)}
+    sources, durations = [], []
+    for ref in display.frame_paths:
+        if ref in timeline:
+            sources.append(ref)
+            durations.append(timeline[ref])
+        elif old is not None and ref in old:
+            sources.append(ref)
+            durations.append(old.duration(old.index_of(ref)))
+
+    def frames():
+        for ref in sources:
+            if ref in timeline:
+                yield cache.get(ref, **params)
+            else:
+                yield old.processed(old.index_of(ref))
+
+    write_pack(path, sources, frames(), durations, display.fps, params)
+    return len(sources)
@@ -0,0 +1,272 @@
+"""
+并行帧准备 — 在进程池中完成图片解码、缩放和 RGB565 编码
+
+缩放和编码是 CPU 密集型操作, 放在独立进程中才能利用多核且不阻塞界面。
+每批任务分配一块共享内存, 第 i 帧的结果由子进程直接写入第 i 个槽位:
+    [rgb565: w*h*2][预览图 RGB: w*h*3]
+RGB565 由 encode_rgb565_batch 直接编码进槽位, 不经过中间的 bytes 对象。
+进程间只传递路径、参数和槽位号, 帧数据不经过 pickle。
+结果按输入顺序返回, 与完成顺序无关; 已在 FrameCache 中的帧不会再提交到进程池。
+
+FrameStream 把逐帧产出的结果经有界队列交给上传线程, 编码与 BLE 传输重叠进行,
+总耗时接近 max(编码, 传输), 内存中只保留少量帧。
+"""
+
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Iterator, Optional
+
+import numpy as np
+from PIL import Image
+
+from .image_processor import (
+    ProcessedFrame, load_image, resize_to_fit, compose_canvas, encode_rgb565_batch,
+    DISPLAY_WIDTH, DISPLAY_HEIGHT, DEFAULT_PRESET,
+)
+from .frame_cache import FrameCache, FrameKey
+
+
+def slot_size(width: int, height: int) -> int:
+    """单帧在共享内存中占用的字节数"""
+    return width * height * 5
+
+
+def _prepare_into(shm_name: str, index: int, path: str, params: dict) -> int:
+    """子进程入口: 处理一帧并写入共享内存的第 index 个槽位"""
+    width, height = params["width"], params["height"]
+    img = load_image(path, (width, height), params["preset"])
+    canvas = compose_canvas(resize_to_fit(img, width, height, params["preset"]), width, height,
+                            params["h_align"], params["v_align"], params["bg_color"])
+    size = slot_size(width, height)
+    rgb565_len = width * height * 2
+
+    # 子进程与父进程共用 resource_tracker, 共享内存只由父进程 unlink
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        base = index * size
+        slot = shm.buf[base:base + rgb565_len]
+        encode_rgb565_batch(np.asarray(canvas)[np.newaxis], slot, slot_size=rgb565_len)
+        slot.release()
+        shm.buf[base + rgb565_len:base + size] = canvas.tobytes()
+    finally:
+        shm.close()
+    return index
+
+
+class FramePreparer:
+    """
+    用进程池批量准备帧。
+
+    用法:
+        preparer = FramePreparer(cache)
+        for frame in preparer.iter_prepare(paths, window=4):
+            ...
+        # 其他线程调用 preparer.cancel() 可中止未给出 cancel_event 的迭代
+    """
+
+    def __init__(self, cache: Optional[FrameCache] = None, max_workers: Optional[int] = None):
+        self._cache = cache
+        self._max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self._executor = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+            return self._executor
+
+    def iter_prepare(
+        self,
+        paths: list,
+        width: int = DISPLAY_WIDTH,
+        height: int = DISPLAY_HEIGHT,
+        h_align: int = 0,
+        v_align: int = 0,
+        bg_color: tuple = (0, 0, 0),
+        preset: str = DEFAULT_PRESET,
+        window: Optional[int] = None,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> Iterator[Optional[ProcessedFrame]]:
+        """
+        按输入顺序逐帧产出 ProcessedFrame (无法处理的帧为 None)。
+
+        最多有 window 帧同时在处理或等待取走, 共享内存也只分配 window 个槽位,
+        槽位在帧被取走后复用; window 为 None 时一次提交全部帧。
+        被 cancel() 中止或迭代被提前关闭时停止产出。
+        给出 cancel_event 时只响应该事件, 多个迭代可以共用一个准备器而互不影响。
+        """
+        if cancel_event is None:
+            cancel_event = self._cancel
+            cancel_event.clear()
+        params = dict(width=width, height=height, h_align=h_align,
+                      v_align=v_align, bg_color=tuple(bg_color), preset=preset)
+        window = max(1, window or len(paths))
+        size = slot_size(width, height)
+        rgb565_len = width * height * 2
+
+        shm = None
+        pending = deque()          # [(key, frame 或 future, slot)]
+        free_slots = list(range(window))
+        remaining = iter(paths)
+
+        def fill():
+            nonlocal shm
+            while len(pending) < window:
+                path = next(remaining, None)
+                if path is None:
+                    return
+                try:
+                    key = FrameKey.for_path(path, **params)
+                except OSError:
+                    pending.append((None, None, None))
+                    continue
+                frame = self._cache.lookup(path, **params) if self._cache is not None else None
+                if frame is not None:
+                    pending.append((key, frame, None))
+                    continue
+                if shm is None:
+                    shm = shared_memory.SharedMemory(create=True, size=size * window)
+                slot = free_slots.pop()
+                future = self._pool().submit(_prepare_into, shm.name, slot, path, params)
+                pending.append((key, future, slot))
+
+        try:
+            fill()
+            while pending and not cancel_event.is_set():
+                key, item, slot = pending[0]
+                frame = item
+                if slot is not None:
+                    try:
+                        item.result()
+                    except Exception:
+                        frame = None
+                    else:
+                        base = slot * size
+                        frame = ProcessedFrame(
+                            rgb565_data=bytes(shm.buf[base:base + rgb565_len]),
+                            preview_image=Image.frombytes(
+                                "RGB", (width, height),
+                                bytes(shm.buf[base + rgb565_len:base + size]),
+                            ),
+                        )
+                        if self._cache is not None:
+                            self._cache.put(key, frame)
+                    free_slots.append(slot)
+                pending.popleft()
+                if cancel_event.is_set():
+                    return
+                yield frame
+                fill()
+        finally:
+            futures = [item for _, item, slot in pending if slot is not None]
+            for f in futures:
+                f.cancel()
+            # 等正在执行的任务写完再释放共享内存 (每个进程最多一帧)
+            wait(futures)
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+
+
+class FrameStream:
+    """
+    帧生产者与上传消费者之间的有界缓冲。
+
+    后台线程通过 FramePreparer.iter_prepare 按顺序准备帧并放入队列,
+    消费方迭代本对象逐帧取出 RGB565 数据 (无法处理的帧为 None)。
+    队列满时生产者等待, 内存中最多只有 buffer_size 帧加上正在处理的帧。
+    ready 给出已编码好的帧 {序号: RGB565 数据} (如帧包中的帧), 这些帧不再准备,
+    按原顺序与其余帧一起产出。
+    """
+
+    _END = object()
+
+    def __init__(self, preparer: FramePreparer, paths: list, buffer_size: int = 4,
+                 ready: Optional[dict] = None, **params):
+        self._preparer = preparer
+        self._paths = list(paths)
+        self._ready = dict(ready or {})
+        self._params = params
+        self._window = max(1, buffer_size)
+        self._queue = queue.Queue(maxsize=self._window)
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._produce, name="frame-stream", daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def _put(self, item) -> bool:
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        todo = [p for i, p in enumerate(self._paths) if i not in self._ready]
+        frames = self._preparer.iter_prepare(
+            todo, window=self._window, cancel_event=self._cancelled, **self._params
+        )
+        try:
+            for i in range(len(self._paths)):
+                if i in self._ready:
+                    item = self._ready[i]
+                else:
+                    frame = next(frames)
+                    item = None if frame is None else frame.rgb565_data
+                if not self._put(item):
+                    return
+        except Exception as e:
+            self._put(e)
+        finally:
+            frames.close()
+            self._put(self._END)
+
+    def __iter__(self) -> Iterator[Optional[bytes]]:
+        while True:
+            try:
+                item = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if self._cancelled.is_set():
+                    return
+                continue
+            if item is self._END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+_default_preparer = None
+_default_lock = threading.Lock()
+
+
+def default_preparer() -> FramePreparer:
+    """应用共享的帧准备器 (进程池在首次使用时创建)"""
+    global _default_preparer
+    with _default_lock:
+        if _default_preparer is None:
+            from .frame_cache import default_cache
+            _default_preparer = FramePreparer(default_cache())
+        return _default_preparer
@@ -1,10 +1,22 @@
 """
-图片处理 — 图片加载、缩放、RGB565 编码、GIF 帧提取
+图片处理 — 图片加载、缩放、RGB565 编码、动图逐帧解码
 使用 Pillow 替代 OpenCV，数学运算一致
+
+大图 (手机照片、4K 截图) 缩到 160x80 时, 完整解码的像素几乎全部被丢弃。
+缩放预设 (RESAMPLE_PRESETS) 控制:
+  - JPEG draft 模式: 解码时直接按 1/2、1/4、1/8 缩小, 只解码到目标尺寸的若干倍
+  - 两级缩放: 先用 Image.reduce 做整数倍盒式缩小, 再用指定滤波器缩放到目标尺寸
+处理分两层: resize_to_fit (缩放, 耗时) 和 compose_frame (对齐、背景、编码, 很快),
+只改对齐方式或背景色时可以复用缩放结果。
 """
 
+import math
+import os
+import re
+import threading
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional
+from typing import Iterator, Optional
 
 import numpy as np
 from PIL import Image
@@ -15,6 +27,26 @@ FRAME_SLOT_SIZE = 4096 * 7  # 28672 bytes per frame slot
 MAX_TOTAL_FRAMES = 74       # 设备限制
 
 
+@dataclass(frozen=True)
+class ResamplePreset:
+    """缩放速度/质量预设"""
+    draft_margin: float             # JPEG draft 解码尺寸至少为目标尺寸的倍数, 0 表示完整解码
+    reducing_gap: Optional[float]   # 两级缩放的 reducing_gap, None 表示单级缩放
+    resample: int                   # 最终缩放滤波器
+
+
+RESAMPLE_PRESETS = {
+    "fast": ResamplePreset(draft_margin=1.0, reducing_gap=1.0, resample=Image.BILINEAR),
+    "balanced": ResamplePreset(draft_margin=2.0, reducing_gap=2.0, resample=Image.LANCZOS),
+    "quality": ResamplePreset(draft_margin=0, reducing_gap=None, resample=Image.LANCZOS),
+}
+DEFAULT_PRESET = "balanced"
+
+
+def get_preset(name: str) -> ResamplePreset:
+    return RESAMPLE_PRESETS.get(name, RESAMPLE_PRESETS[DEFAULT_PRESET])
+
+
 @dataclass
 class ProcessedFrame:
     """处理后的单帧"""
@@ -22,41 +54,183 @@ class ProcessedFrame:
     preview_image: Image.Image  # 160x80 RGB PIL Image for UI preview
 
 
+# 帧引用: "动图路径#frame=N" 表示动图的第 N 帧 (从 0 开始), 使用时才解码
+_FRAME_REF = re.compile(r"^(?P<path>.+)#frame=(?P<index>\d+)$")
+
+
+def make_frame_ref(path: str, index: int) -> str:
+    return f"{path}#frame={index}"
+
+
+def parse_frame_ref(ref: str) -> tuple[str, Optional[int]]:
+    """拆分帧引用, 返回 (文件路径, 帧序号); 普通图片路径的帧序号为 None"""
+    m = _FRAME_REF.match(ref)
+    if m is None:
+        return ref, None
+    return m.group("path"), int(m.group("index"))
+
+
+def frame_source_exists(ref: str) -> bool:
+    """帧引用 (或普通路径) 对应的文件是否存在"""
+    return os.path.exists(parse_frame_ref(ref)[0])
+
+
+def count_frames(path: str) -> int:
+    """动图的帧数 (只读取帧头, 不解码像素)"""
+    with Image.open(path) as img:
+        return getattr(img, "n_frames", 1)
+
+
+def _flatten(frame: Image.Image, background: tuple[int, int, int]) -> Image.Image:
+    """把带透明度的帧合成到纯色背景上 (直接 convert("RGB") 会露出透明像素的原始颜色)"""
+    if frame.mode in ("RGBA", "LA", "PA") or "transparency" in frame.info:
+        rgba = frame.convert("RGBA")
+        canvas = Image.new("RGBA", rgba.size, background + (255,))
+        canvas.alpha_composite(rgba)
+        return canvas.convert("RGB")
+    return frame.convert("RGB")
+
+
+def iter_animation_frames(
+    path: str, background: tuple[int, int, int] = (0, 0, 0)
+) -> Iterator[Image.Image]:
+    """
+    逐帧产出动图 (GIF / APNG / 动态 WebP, 普通图片视为 1 帧) 合成后的 RGB 图像。
+
+    各帧按格式的处置方式 (disposal) 与混合方式 (blend) 合成到画布上, 由 Pillow 的
+    seek 完成: GIF 的 restore-to-background/previous, APNG 的 dispose_op/blend_op,
+    WebP 由 libwebp 的动画解码器合成。画布仍透明的区域填充 background。
+    任何时刻只持有当前帧, 内存占用与动画长度无关; 每次产出的都是新图像, 调用方可以保留。
+    源文件中该帧的显示时长 (毫秒, 可能缺失或为 0) 保存在产出图像的 info["duration"]。
+    """
+    with Image.open(path) as img:
+        for index in range(getattr(img, "n_frames", 1)):
+            if index:
+                img.seek(index)
+            frame = _flatten(img, background)
+            frame.info["duration"] = img.info.get("duration")
+            yield frame
+
+
+class _AnimationReader:
+    """
+    保持打开的动图及当前帧位置。
+
+    动图的每一帧都依赖前面帧的处置方式合成, 只能顺序解码。这里保留
+    iter_animation_frames 的迭代位置, 顺序访问 (预览、上传) 时每帧只
+    向前解码一次, 只有回退时才从头开始。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.mtime_ns = os.stat(path).st_mtime_ns
+        self.lock = threading.Lock()
+        self._n_frames = count_frames(path)
+        self._frames = None
+        self._next = 0        # 下一次迭代产出的帧序号
+        self._current = None  # 第 _next - 1 帧
+
+    def frame(self, index: int) -> Image.Image:
+        if not 0 <= index < self._n_frames:
+            raise ValueError(f"{self.path} 没有第 {index} 帧 (共 {self._n_frames} 帧)")
+        if self._frames is None or index < self._next - 1:
+            self.close()
+            self._frames = iter_animation_frames(self.path)
+        while self._next <= index:
+            self._current = next(self._frames)
+            self._next += 1
+        return self._current.copy()
+
+    def close(self):
+        if self._frames is not None:
+            self._frames.close()
+            self._frames = None
+        self._next = 0
+        self._current = None
+
+
+_readers = OrderedDict()   # path -> _AnimationReader
+_readers_lock = threading.Lock()
+_MAX_READERS = 4
+
+
+def _load_animation_frame(path: str, index: int) -> Image.Image:
+    path = os.path.abspath(path)
+    with _readers_lock:
+        reader = _readers.get(path)
+        if reader is not None and reader.mtime_ns != os.stat(path).st_mtime_ns:
+            with reader.lock:
+                reader.close()
+            reader = None
+        if reader is None:
+            reader = _AnimationReader(path)
+            _readers[path] = reader
+            while len(_readers) > _MAX_READERS:
+                evicted = _readers.popitem(last=False)[1]
+                with evicted.lock:
+                    evicted.close()
+        _readers.move_to_end(path)
+    with reader.lock:
+        return reader.frame(index)
+
+
 def extract_gif_frames(gif_path: str) -> list[Image.Image]:
-    """从 GIF 文件提取所有帧"""
-    frames = []
-    with Image.open(gif_path) as img:
-        for i in range(getattr(img, 'n_frames', 1)):
-            img.seek(i)
-            frames.append(img.convert("RGB").copy())
-    return frames
+    """从 GIF 文件提取所有帧 (一次性全部解码, 长动画请用 iter_animation_frames)"""
+    return list(iter_animation_frames(gif_path))
 
 
-def load_image(path: str) -> Image.Image:
-    """加载单张图片"""
-    return Image.open(path).convert("RGB")
+def load_image(path: str, target_size: Optional[tuple[int, int]] = None,
+               preset: str = DEFAULT_PRESET) -> Image.Image:
+    """
+    加载单张图片, 也支持 "动图路径#frame=N" 形式的帧引用。
+    给出 target_size 时, JPEG 按预设以 draft 模式只解码到目标尺寸附近。
+    """
+    path, index = parse_frame_ref(path)
+    if index is not None:
+        return _load_animation_frame(path, index)
+    img = Image.open(path)
+    margin = get_preset(preset).draft_margin
+    if target_size is not None and margin and img.format == "JPEG":
+        scale = min(target_size[0] / img.width, target_size[1] / img.height) * margin
+        if scale < 1:
+            img.draft("RGB", (math.ceil(img.width * scale), math.ceil(img.height * scale)))
+    return img.convert("RGB")
 
 
-def process_image(
+def fit_size(src_size: tuple[int, int], width: int = DISPLAY_WIDTH,
+             height: int = DISPLAY_HEIGHT) -> tuple[int, int]:
+    """等比缩放到 width x height 以内后的尺寸"""
+    w_src, h_src = src_size
+    scale = min(width / w_src, height / h_src)
+    return int(w_src * scale), int(h_src * scale)
+
+
+def resize_to_fit(
     img: Image.Image,
     width: int = DISPLAY_WIDTH,
     height: int = DISPLAY_HEIGHT,
+    preset: str = DEFAULT_PRESET,
+) -> Image.Image:
+    """等比缩放 (处理流程中唯一耗时的一步, 结果与对齐方式、背景色无关, 可单独缓存)"""
+    p = get_preset(preset)
+    return img.resize(fit_size(img.size, width, height), p.resample, reducing_gap=p.reducing_gap)
+
+
+def compose_canvas(
+    resized: Image.Image,
+    width: int = DISPLAY_WIDTH,
+    height: int = DISPLAY_HEIGHT,
     h_align: int = 0,
     v_align: int = 0,
     bg_color: tuple[int, int, int] = (0, 0, 0),
-) -> ProcessedFrame:
-    """缩放图片并编码为 RGB565"""
-    # 1. 等比缩放
-    w_src, h_src = img.size
-    scale = min(width / w_src, height / h_src)
-    new_w = int(w_src * scale)
-    new_h = int(h_src * scale)
-    resized = img.resize((new_w, new_h), Image.LANCZOS)
+) -> Image.Image:
+    """把已缩放的图片按对齐方式放到背景上, 返回 width x height 的 RGB 画布"""
+    new_w, new_h = resized.size
 
-    # 2. 创建背景
-    canvas = Image.new("RGB", (width, height), bg_color)
+    # 1. 创建背景
+    canvas = Image.new("RGB", (width, height), tuple(bg_color))
 
-    # 3. 计算对齐偏移
+    # 2. 计算对齐偏移
     if h_align < 0:
         x_offset = 0
     elif h_align == 0:
@@ -71,26 +245,106 @@ def process_image(
     else:
         y_offset = height - new_h
 
-    # 4. 合成
+    # 3. 合成
     canvas.paste(resized, (x_offset, y_offset))
+    return canvas
 
-    # 5. 编码 RGB565
-    rgb565_data = encode_rgb565_be(canvas)
 
-    return ProcessedFrame(rgb565_data=rgb565_data, preview_image=canvas)
+def compose_frame(
+    resized: Image.Image,
+    width: int = DISPLAY_WIDTH,
+    height: int = DISPLAY_HEIGHT,
+    h_align: int = 0,
+    v_align: int = 0,
+    bg_color: tuple[int, int, int] = (0, 0, 0),
+) -> ProcessedFrame:
+    """把已缩放的图片按对齐方式放到背景上并编码为 RGB565"""
+    canvas = compose_canvas(resized, width, height, h_align, v_align, bg_color)
+    return ProcessedFrame(rgb565_data=encode_rgb565_be(canvas), preview_image=canvas)
+
+
+def process_image(
+    img: Image.Image,
+    width: int = DISPLAY_WIDTH,
+    height: int = DISPLAY_HEIGHT,
+    h_align: int = 0,
+    v_align: int = 0,
+    bg_color: tuple[int, int, int] = (0, 0, 0),
+    preset: str = DEFAULT_PRESET,
+) -> ProcessedFrame:
+    """缩放图片并编码为 RGB565, preset 见 RESAMPLE_PRESETS"""
+    resized = resize_to_fit(img, width, height, preset)
+    return compose_frame(resized, width, height, h_align, v_align, bg_color)
 
 
 def encode_rgb565_be(img: Image.Image) -> bytes:
     """将 PIL RGB Image 编码为 RGB565 大端字节"""
-    arr = np.array(img)
-    r = arr[:, :, 0].astype(np.uint16)
-    g = arr[:, :, 1].astype(np.uint16)
-    b = arr[:, :, 2].astype(np.uint16)
+    arr = np.asarray(img)
+    out = np.empty(arr.shape[0] * arr.shape[1] * 2, dtype=np.uint8)
+    encode_rgb565_batch(arr[np.newaxis], out, slot_size=out.size)
+    return out.tobytes()
 
-    rgb565 = ((r << 8) & 0xF800) | ((g << 3) & 0x07E0) | (b >> 3)
 
-    # Big-endian
-    high = (rgb565 >> 8).astype(np.uint8)
-    low = (rgb565 & 0xFF).astype(np.uint8)
+def decode_rgb565_be(data, width: int = DISPLAY_WIDTH, height: int = DISPLAY_HEIGHT) -> Image.Image:
+    """把 RGB565 大端数据还原为 RGB 图像 (即设备上的显示效果)"""
+    v = np.frombuffer(data, dtype=">u2", count=width * height).reshape(height, width)
+    rgb = np.empty((height, width, 3), dtype=np.uint8)
+    rgb[..., 0] = (v >> 11 & 0x1F) * 255 // 31
+    rgb[..., 1] = (v >> 5 & 0x3F) * 255 // 63
+    rgb[..., 2] = (v & 0x1F) * 255 // 31
+    return Image.fromarray(rgb)
+
+
+def encode_rgb565_batch(
+    frames: np.ndarray,
+    out=None,
+    slot_size: int = FRAME_SLOT_SIZE,
+    scratch: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    批量编码 RGB565 大端数据, 直接写入调用方提供的连续缓冲区。
+
+    :param frames: (N, H, W, 3) uint8 数组
+    :param out: 可写缓冲区 (bytearray / numpy 数组 / mmap 等), 至少 N * slot_size 字节;
+                第 i 帧写入 [i * slot_size, i * slot_size + H*W*2), 与设备帧槽位地址一致,
+                槽位剩余部分保持不变。为 None 时分配一块全 0 的缓冲区
+    :param scratch: (N, H, W) 或更大的 uint16 工作数组, 重复调用时传入可避免任何分配
+    :return: out 的 uint8 一维视图
+    """
+    if frames.ndim != 4 or frames.shape[-1] != 3 or frames.dtype != np.uint8:
+        raise ValueError(f"需要 (N, H, W, 3) uint8 数组, 收到 {frames.shape} {frames.dtype}")
+    n, h, w, _ = frames.shape
+    frame_bytes = h * w * 2
+    if slot_size < frame_bytes:
+        raise ValueError(f"slot_size {slot_size} 小于单帧大小 {frame_bytes}")
+
+    if out is None:
+        buf = np.zeros(n * slot_size, dtype=np.uint8)
+    else:
+        buf = np.frombuffer(out, dtype=np.uint8) if not isinstance(out, np.ndarray) else out.reshape(-1)
+        if buf.size < n * slot_size:
+            raise ValueError(f"输出缓冲区 {buf.size} 字节, 需要 {n * slot_size} 字节")
+    if n == 0:
+        return buf
+
+    if scratch is None:
+        tmp = np.empty((n, h, w), dtype=np.uint16)
+        acc = np.empty((n, h, w), dtype=np.uint16)
+    else:
+        flat = scratch.reshape(-1)
+        if flat.size < 2 * n * h * w or scratch.dtype != np.uint16:
+            raise ValueError("scratch 需为至少 2*N*H*W 个元素的 uint16 数组")
+        acc = flat[:n * h * w].reshape(n, h, w)
+        tmp = flat[n * h * w:2 * n * h * w].reshape(n, h, w)
+
+    # 目标: 每个槽位开头 H*W*2 字节, 按大端 uint16 解释
+    dst = buf[:n * slot_size].reshape(n, slot_size)[:, :frame_bytes].view(">u2").reshape(n, h, w)
 
-    return np.stack((high, low), axis=-1).reshape(-1).tobytes()
+    np.left_shift(frames[..., 0], 8, out=acc, dtype=np.uint16)
+    np.bitwise_and(acc, 0xF800, out=acc)
+    np.left_shift(frames[..., 1], 3, out=tmp, dtype=np.uint16)
+    np.bitwise_and(tmp, 0x07E0, out=tmp)
+    np.bitwise_or(acc, tmp, out=acc)
+    np.right_shift(frames[..., 2], 3, out=tmp, dtype=np.uint16)
+    np.bitwise_or(acc, tmp, out=dst)  # 写入时转换为大端
+    return buf
@@ -62,11 +62,34 @@ class DisplayMode:
     """单个模式的显示/动画配置"""
     fps: int = 10
     frame_paths: list[str] = field(default_factory=list)
+    quality: str = "balanced"   # 缩放预设: fast / balanced / quality
+    pack_path: str = ""         # 预编码帧包 (.kbpack), 空表示未打包
+    h_align: int = 0            # 水平对齐: -1 左, 0 居中, 1 右
+    v_align: int = 0            # 垂直对齐: -1 上, 0 居中, 1 下
+    bg_color: tuple[int, int, int] = (0, 0, 0)   # 图片未覆盖区域的背景色
+
+    def frame_params(self) -> dict:
+        """帧处理参数 (process_image / FrameCache / 帧包)"""
+        return {
+            "h_align": self.h_align,
+            "v_align": self.v_align,
+            "bg_color": tuple(self.bg_color),
+            "preset": self.quality,
+        }
+
+    def snapshot(self) -> "DisplayMode":
+        """独立的副本, 交给后台线程使用时界面上的修改不会影响它"""
+        return DisplayMode.from_dict(self.to_dict())
 
     def to_dict(self) -> dict:
         return {
             "fps": self.fps,
             "frame_paths": list(self.frame_paths),
+            "quality": self.quality,
+            "pack_path": self.pack_path,
+            "h_align": self.h_align,
+            "v_align": self.v_align,
+            "bg_color": list(self.bg_color),
         }
 
     @classmethod
@@ -74,6 +97,11 @@ class DisplayMode:
         return cls(
             fps=d.get("fps", 10),
             frame_paths=d.get("frame_paths", []),
+            quality=d.get("quality", "balanced"),
+            pack_path=d.get("pack_path", ""),
+            h_align=d.get("h_align", 0),
+            v_align=d.get("v_align", 0),
+            bg_color=tuple(d.get("bg_color", (0, 0, 0))),
         )
 
 
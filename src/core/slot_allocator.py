@@ -0,0 +1,239 @@
+"""
+帧槽位分配 — 管理设备 Flash 中按 FRAME_SLOT_SIZE 划分的帧槽位
+
+每个模式的动画占用一段连续槽位 [start_index, start_index + pic_length),
+由 read_pic_state 读出。分配策略:
+  - best-fit: 选能放下的最小空闲区间, 大块空闲区留给之后更长的动画
+  - 放不下时生成整理方案 (AllocationPlan): 在 "原地保留 / 搬移 / 清空" 之间
+    枚举其他模式的处理方式, 优先不清空任何模式, 其次重写的字节数最少。
+    只有主机上仍有帧数据 (可重新编码上传) 的模式才能搬移, 其余只能清空。
+设备没有槽位复制命令, 搬移即由主机重新上传该模式的帧到新位置。
+"""
+
+from dataclasses import dataclass, field
+from itertools import permutations, product
+from typing import Iterable, Optional
+
+from .image_processor import FRAME_SLOT_SIZE, MAX_TOTAL_FRAMES
+
+
+@dataclass(frozen=True)
+class Region:
+    """一个模式占用的连续槽位"""
+    mode_id: int
+    start: int
+    length: int
+
+    @property
+    def end(self) -> int:
+        return self.start + self.length
+
+
+@dataclass(frozen=True)
+class Move:
+    """把模式 mode_id 的 length 帧从 src_start 搬到 dst_start"""
+    mode_id: int
+    src_start: int
+    dst_start: int
+    length: int
+
+    @property
+    def bytes(self) -> int:
+        return self.length * FRAME_SLOT_SIZE
+
+
+@dataclass
+class AllocationPlan:
+    """为 mode_id 分配 length 帧的方案"""
+    mode_id: int
+    start: int
+    length: int
+    moves: list[Move] = field(default_factory=list)   # 需先搬移的其他模式
+    cleared: list[int] = field(default_factory=list)  # 需清空的模式 (长度置 0)
+    fragmentation: float = 0.0                        # 执行后的碎片率
+
+    @property
+    def rewritten_frames(self) -> int:
+        """需要写入的总帧数 (本模式 + 搬移的模式)"""
+        return self.length + sum(m.length for m in self.moves)
+
+    @property
+    def rewritten_bytes(self) -> int:
+        return self.rewritten_frames * FRAME_SLOT_SIZE
+
+
+def _gaps(occupied: list[tuple[int, int]], capacity: int) -> list[tuple[int, int]]:
+    """已占用区间 [(start, end)] 之间的空闲区间 [(start, length)]"""
+    gaps = []
+    pos = 0
+    for start, end in sorted(occupied):
+        if start > pos:
+            gaps.append((pos, start - pos))
+        pos = max(pos, end)
+    if capacity > pos:
+        gaps.append((pos, capacity - pos))
+    return gaps
+
+
+def _fragmentation(gaps: list[tuple[int, int]]) -> float:
+    total = sum(length for _, length in gaps)
+    if total == 0:
+        return 0.0
+    return 1.0 - max(length for _, length in gaps) / total
+
+
+def _best_fit(gaps: list[tuple[int, int]], count: int) -> Optional[int]:
+    fits = [(length, start) for start, length in gaps if length >= count]
+    return min(fits)[1] if fits else None
+
+
+class SlotAllocator:
+    """
+    槽位分配器 (只做计算, 不与设备通信)。
+
+    用法:
+        allocator = SlotAllocator.from_pic_states(states)
+        plan = allocator.plan(mode_id, count, relocatable={1})
+        # 按 plan.moves 重新上传其他模式, plan.cleared 置空, 再上传到 plan.start
+        allocator.apply(plan)
+    """
+
+    def __init__(self, capacity: int = MAX_TOTAL_FRAMES, regions: Iterable[Region] = ()):
+        self.capacity = capacity
+        self._regions = {r.mode_id: r for r in regions if r.length > 0}
+
+    @classmethod
+    def from_pic_states(cls, states: list[dict]) -> "SlotAllocator":
+        """由各模式的 read_pic_state 结果构建"""
+        capacity = MAX_TOTAL_FRAMES
+        regions = []
+        for mode_id, state in enumerate(states):
+            capacity = state.get("all_mode_max_pic", capacity)
+            regions.append(Region(
+                state.get("mode", mode_id), state.get("start_index", 0), state.get("pic_length", 0)
+            ))
+        return cls(capacity, regions)
+
+    @property
+    def regions(self) -> list[Region]:
+        return sorted(self._regions.values(), key=lambda r: r.start)
+
+    def region(self, mode_id: int) -> Optional[Region]:
+        return self._regions.get(mode_id)
+
+    def free_spans(self, exclude_mode: Optional[int] = None) -> list[tuple[int, int]]:
+        """空闲区间 [(start, length)], exclude_mode 的区域视为空闲"""
+        occupied = [(r.start, r.end) for r in self._regions.values() if r.mode_id != exclude_mode]
+        return _gaps(occupied, self.capacity)
+
+    def free_frames(self) -> int:
+        return sum(length for _, length in self.free_spans())
+
+    def fragmentation(self) -> float:
+        """碎片率: 1 - 最大空闲区间 / 总空闲, 0 表示空闲槽位全部连续"""
+        return _fragmentation(self.free_spans())
+
+    def best_fit(self, count: int, exclude_mode: Optional[int] = None) -> Optional[int]:
+        """能放下 count 帧的最小空闲区间起点, 没有则返回 None"""
+        return _best_fit(self.free_spans(exclude_mode), count)
+
+    def plan(self, mode_id: int, count: int, relocatable: Iterable[int] = ()) -> AllocationPlan:
+        """
+        为 mode_id 分配 count 帧 (它原来的区域可被覆盖)。
+        relocatable 为可以搬移的模式, 其余挡路的模式只能清空。
+        count 超过总容量时抛出 ValueError。
+        """
+        if count > self.capacity:
+            raise ValueError(f"需要 {count} 帧, 超过设备容量 {self.capacity} 帧")
+        start = self.best_fit(count, exclude_mode=mode_id)
+        if start is not None:
+            occupied = [(r.start, r.end) for r in self._regions.values() if r.mode_id != mode_id]
+            occupied.append((start, start + count))
+            return AllocationPlan(mode_id, start, count,
+                                  fragmentation=_fragmentation(_gaps(occupied, self.capacity)))
+
+        relocatable = set(relocatable)
+        others = [r for r in self.regions if r.mode_id != mode_id]
+        choices = [("stay", "move", "clear") if r.mode_id in relocatable else ("stay", "clear")
+                   for r in others]
+        best, best_cost = None, None
+        for actions in product(*choices):
+            fixed = [r for r, a in zip(others, actions) if a == "stay"]
+            moving = [r for r, a in zip(others, actions) if a == "move"]
+            cleared = [r.mode_id for r, a in zip(others, actions) if a == "clear"]
+            placed = self._pack(fixed, [(mode_id, count)] + [(r.mode_id, r.length) for r in moving])
+            if placed is None:
+                continue
+            placement, frag = placed
+            moves = [Move(r.mode_id, r.start, placement[r.mode_id], r.length)
+                     for r in moving if placement[r.mode_id] != r.start]
+            cost = (len(cleared), sum(m.length for m in moves), frag)
+            if best_cost is None or cost < best_cost:
+                best_cost = cost
+                best = AllocationPlan(mode_id, placement[mode_id], count, moves, cleared, frag)
+        # count <= capacity 时清空所有其他模式总能放下
+        return best
+
+    def _pack(self, fixed: list[Region], items: list[tuple[int, int]]):
+        """把 items [(mode_id, length)] 逐个 best-fit 放入 fixed 之外的空间, 返回碎片最少的放法"""
+        best = None
+        for order in permutations(items):
+            occupied = [(r.start, r.end) for r in fixed]
+            placement = {}
+            for item_mode, length in order:
+                start = _best_fit(_gaps(occupied, self.capacity), length)
+                if start is None:
+                    break
+                placement[item_mode] = start
+                occupied.append((start, start + length))
+            else:
+                frag = _fragmentation(_gaps(occupied, self.capacity))
+                if best is None or frag < best[1]:
+                    best = (placement, frag)
+        return best
+
+    def apply(self, plan: AllocationPlan):
+        """记录方案执行后的布局"""
+        for mode_id in plan.cleared:
+            self._regions.pop(mode_id, None)
+        for move in plan.moves:
+            self._regions[move.mode_id] = Region(move.mode_id, move.dst_start, move.length)
+        self._regions.pop(plan.mode_id, None)
+        if plan.length > 0:
+            self._regions[plan.mode_id] = Region(plan.mode_id, plan.start, plan.length)
+
+    def layout(self, counts: dict[int, int]) -> dict[int, int]:
+        """
+        为所有模式重新布局 (全部重写时使用), 返回 {mode_id: start}。
+        尽量让模式留在原来的起点 (之后的增量上传可复用槽位), 放不下的再 best-fit,
+        仍放不下时从 0 开始紧密排列。总帧数超过容量时抛出 ValueError。
+        """
+        total = sum(counts.values())
+        if total > self.capacity:
+            raise ValueError(f"总帧数 {total} 超过设备容量 {self.capacity} 帧")
+        occupied = []
+        starts = {}
+        pending = []
+        for mode_id, count in sorted(counts.items(), key=lambda kv: -kv[1]):
+            if count == 0:
+                starts[mode_id] = 0
+                continue
+            old = self._regions.get(mode_id)
+            if old is not None and old.start + count <= self.capacity and all(
+                    old.start + count <= s or old.start >= e for s, e in occupied):
+                starts[mode_id] = old.start
+                occupied.append((old.start, old.start + count))
+            else:
+                pending.append((mode_id, count))
+        for mode_id, count in pending:
+            start = _best_fit(_gaps(occupied, self.capacity), count)
+            if start is None:
+                # 原位保留导致碎片, 放弃保留, 顺序紧密排列
+                pos = 0
+                for m in sorted(counts):
+                    starts[m] = pos if counts[m] else 0
+                    pos += counts[m]
+                return starts
+            starts[mode_id] = start
+            occupied.append((start, start + count))
+        return starts
@@ -2,8 +2,10 @@
 主窗口 — 顶部连接栏 + 模式选择器 + 内容区（标签页）
 """
 
+import os
+
 from PySide6.QtWidgets import (
-    QMainWindow, QWidget, QVBoxLayout, QStackedWidget,
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QStackedWidget,
     QTabWidget, QMessageBox, QFileDialog,
 )
 from PySide6.QtCore import Qt
@@ -12,11 +14,14 @@ from PySide6.QtGui import QAction
 from .widgets.connection_bar import ConnectionBar
 from .widgets.mode_selector import ModeSelector
 from .widgets.device_info_bar import DeviceInfoBar
-from .pages.mode_page import ModePage
+from .pages.mode_page import ModePage, plan_in_background
 from .pages.device_page import DevicePage
 from ..core.device_state import DeviceState
 from ..core.keymap import KeyboardConfig
 from ..core.config_manager import ConfigManager
+from ..core.file_watcher import ContentWatcher
+from ..core.frame_budget import plan_capacity
+from ..core.slot_allocator import SlotAllocator
 
 
 class MainWindow(QMainWindow):
@@ -28,7 +33,8 @@ class MainWindow(QMainWindow):
         self.setMinimumSize(900, 700)
 
         self._state = DeviceState(self)
-        self._config_manager = ConfigManager()
+        self._config_manager = ConfigManager(ContentWatcher(self))
+        self._config_manager.watcher.changed.connect(self._on_config_file_changed)
 
         self._setup_menu()
         self._setup_ui()
@@ -51,6 +57,11 @@ class MainWindow(QMainWindow):
         save_action.triggered.connect(self._save_config)
         file_menu.addAction(save_action)
 
+        save_pack_action = QAction("保存配置和帧包", self)
+        save_pack_action.setToolTip("同时把各模式的帧预编码为 .kbpack, 配置可脱离源图片使用")
+        save_pack_action.triggered.connect(self._save_config_with_packs)
+        file_menu.addAction(save_pack_action)
+
         file_menu.addSeparator()
 
         save_device_action = QAction("写入设备并保存", self)
@@ -105,6 +116,12 @@ class MainWindow(QMainWindow):
 
         main_layout.addWidget(self.tabs)
 
+    def closeEvent(self, event):
+        # 停止监视配置和帧源文件, 取消尚未完成的后台哈希
+        for watcher in self.findChildren(ContentWatcher):
+            watcher.shutdown()
+        super().closeEvent(event)
+
     def _connect_signals(self):
         # 连接栏
         self.connection_bar.connect_requested.connect(self._on_connect)
@@ -176,22 +193,40 @@ class MainWindow(QMainWindow):
 
     def _new_config(self):
         self._state.config = KeyboardConfig()
+        self._config_manager.watcher.clear()
         for i, page in enumerate(self._mode_pages):
             page.set_config(self._state.config.modes[i])
 
+    def _on_config_file_changed(self, paths: list):
+        """当前配置文件在外部被修改 (如版本控制更新、手动编辑), 询问是否重新加载"""
+        path = self._config_manager.path
+        if path not in paths or not os.path.exists(path):
+            return
+        reply = QMessageBox.question(
+            self, "配置文件已修改",
+            f"{os.path.basename(path)} 已在外部修改, 是否重新加载?\n未保存的更改将丢失。",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.Yes
+        )
+        if reply == QMessageBox.Yes:
+            self._load_config(path)
+
     def _open_config(self):
         path, _ = QFileDialog.getOpenFileName(
             self, "打开配置", "",
             "配置文件 (*.json);;All Files (*)"
         )
         if path:
-            try:
-                config = self._config_manager.load(path)
-                self._state.config = config
-                for i, page in enumerate(self._mode_pages):
-                    page.set_config(config.modes[i])
-            except Exception as e:
-                QMessageBox.warning(self, "打开失败", str(e))
+            self._load_config(path)
+
+    def _load_config(self, path: str):
+        try:
+            config = self._config_manager.load(path)
+            self._state.config = config
+            for i, page in enumerate(self._mode_pages):
+                page.set_config(config.modes[i])
+        except Exception as e:
+            QMessageBox.warning(self, "打开失败", str(e))
 
     def _save_config(self):
         path, _ = QFileDialog.getSaveFileName(
@@ -204,6 +239,22 @@ class MainWindow(QMainWindow):
             except Exception as e:
                 QMessageBox.warning(self, "保存失败", str(e))
 
+    def _save_config_with_packs(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "保存配置和帧包", "keyboard_config.json",
+            "配置文件 (*.json);;All Files (*)"
+        )
+        if path:
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                packs = self._config_manager.save_with_packs(self._state.config, path)
+            except Exception as e:
+                QApplication.restoreOverrideCursor()
+                QMessageBox.warning(self, "保存失败", str(e))
+                return
+            QApplication.restoreOverrideCursor()
+            QMessageBox.information(self, "成功", f"配置已保存, 生成 {len(packs)} 个帧包")
+
     def _save_to_device(self):
         """将所有模式的按键配置和动画上传到设备并保存"""
         if not self._state.connected:
@@ -211,37 +262,80 @@ class MainWindow(QMainWindow):
             return
 
         try:
-            # 0. 查询设备状态，获取最大帧数限制
-            state0 = self._state.service.read_pic_state(0)
-            max_frames = state0.get("all_mode_max_pic", 74)
-
-            # 计算各模式的帧数
-            frame_counts = [len(page.mode_config.display.frame_paths) for page in self._mode_pages]
-            total_frames = sum(frame_counts)
-
-            # 检查是否超出容量
-            if total_frames > max_frames:
-                QMessageBox.warning(
-                    self, "容量不足",
-                    f"总帧数 {total_frames} 超过设备最大容量 {max_frames}。\n"
-                    f"模式0: {frame_counts[0]} 帧\n"
-                    f"模式1: {frame_counts[1]} 帧\n"
-                    f"模式2: {frame_counts[2]} 帧\n\n"
-                    "请减少部分模式的帧数后重试。"
+            # 0. 查询设备状态，获取最大帧数限制和当前布局
+            allocator = SlotAllocator.from_pic_states(
+                [self._state.service.read_pic_state(mode_id) for mode_id in range(3)]
+            )
+        except Exception as e:
+            QMessageBox.warning(self, "写入失败", str(e))
+            return
+
+        # 按设备容量为各模式重采样 (合并重复帧、必要时降低 FPS), 需要解码帧, 在后台线程中进行;
+        # 后台只使用配置的副本
+        displays = [page.mode_config.display.snapshot() for page in self._mode_pages]
+        plan_in_background(
+            self,
+            lambda: plan_capacity(displays, allocator.capacity),
+            lambda plans: self._write_with_plans(allocator, plans),
+            lambda msg: QMessageBox.warning(self, "写入失败", msg),
+        )
+
+    def _write_with_plans(self, allocator: SlotAllocator, plans: list):
+        """容量规划完成后上传按键配置和各模式动画, 全部成功后保存到 Flash"""
+        max_frames = allocator.capacity
+        try:
+            adjusted = [
+                (i, page.mode_config.display.fps, plan)
+                for i, (page, plan) in enumerate(zip(self._mode_pages, plans))
+                if plan.frame_count != plan.source_frames or plan.fps != page.mode_config.display.fps
+            ]
+            if adjusted:
+                lines = [
+                    f"模式{i}: {plan.source_frames} 帧 @ {fps} FPS → {plan.frame_count} 帧 @ {plan.fps} FPS"
+                    + (" (已压缩时长)" if plan.truncated else "")
+                    for i, fps, plan in adjusted
+                ]
+                QMessageBox.information(
+                    self, "自动适配容量",
+                    f"设备最大容量 {max_frames} 帧, 已按帧时长重采样:\n" + "\n".join(lines)
                 )
-                return
 
             # 1. 上传按键配置
             for page in self._mode_pages:
                 page.upload_keys_to_device(self._state.service)
 
-            # 2. 上传动画帧（从 start_index=0 开始顺序分配）
-            start_index = 0
-            for page in self._mode_pages:
-                start_index = page.upload_to_device(self._state.service, start_index)
-
-            # 3. 保存到设备 Flash
-            self._state.service.save_config()
-            QMessageBox.information(self, "成功", "配置已写入设备")
+            # 2. 上传动画帧（尽量保持各模式原来的起始槽位）
+            starts = allocator.layout({
+                page.mode_config.mode_id: plan.frame_count
+                for page, plan in zip(self._mode_pages, plans)
+            })
+            # 没有帧的模式显式清空, 否则设备仍指向它原来的槽位, 而那些槽位可能被其他模式覆盖
+            for page, plan in zip(self._mode_pages, plans):
+                if plan.frame_count == 0:
+                    self._state.service.update_pic(page.mode_config.mode_id, 0, 0, fps=10)
         except Exception as e:
             QMessageBox.warning(self, "写入失败", str(e))
+            return
+
+        # 各模式的上传是异步的, 依次执行; 全部成功后才保存到 Flash
+        pending = list(zip(self._mode_pages, plans))
+        service = self._state.service
+
+        def upload_next(ok: bool = True, msg: str = ""):
+            if not ok:
+                QMessageBox.warning(self, "写入失败", f"{msg}\n\n配置未保存到设备")
+                return
+            try:
+                if pending:
+                    page, plan = pending.pop(0)
+                    page.upload_to_device(service, starts[page.mode_config.mode_id], plan,
+                                          on_done=upload_next)
+                    return
+                # 3. 保存到设备 Flash
+                service.save_config()
+            except Exception as e:
+                QMessageBox.warning(self, "写入失败", str(e))
+                return
+            QMessageBox.information(self, "成功", "配置已写入设备")
+
+        upload_next()
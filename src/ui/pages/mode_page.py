@@ -1,57 +1,186 @@
 """
 模式配置页 — 单个模式的按键映射 + 动画管理
+
+页面监视帧的源文件: 内容改变后重新生成缩略图、在后台重新编码这些帧、标记预览过期,
+并把它们记为待上传。设备上的帧与上次上传时一致 (布局、帧列表、处理参数都未改变) 时,
+"上传修改" 只重写编码结果确实变化的槽位。
 """
 
+import hashlib
 import os
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
 from PySide6.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QSplitter, QGroupBox,
-    QLabel, QPushButton, QSpinBox, QFileDialog, QListWidget,
-    QListWidgetItem, QAbstractItemView, QMessageBox, QProgressDialog,
+    QApplication, QWidget, QVBoxLayout, QHBoxLayout, QSplitter, QGroupBox,
+    QLabel, QPushButton, QSpinBox, QComboBox, QFileDialog, QListView, QColorDialog,
+    QAbstractItemView, QMessageBox, QProgressDialog,
 )
 from PySide6.QtCore import Qt, Signal, QThread
-from PySide6.QtGui import QIcon
+from PySide6.QtGui import QIcon, QColor
 
 from ..widgets.keyboard_view import KeyboardView
 from ..widgets.key_editor import KeyEditor
 from ..widgets.image_preview import ImagePreview
+from ..widgets.frame_list_model import FrameListModel, THUMB_SIZE
 from ...core.keymap import ModeConfig, KeyBinding, MAX_KEY_DATA_LEN, MAX_DESCRIPTION_LEN
 from ...core.keycodes import KeyType
 from ...comm.protocol import KeySubType
 from ...core.image_processor import (
-    process_image, extract_gif_frames, load_image,
-    DISPLAY_WIDTH, DISPLAY_HEIGHT, FRAME_SLOT_SIZE, MAX_TOTAL_FRAMES,
+    ProcessedFrame, count_frames, frame_source_exists, make_frame_ref, parse_frame_ref,
+    RESAMPLE_PRESETS,
+    DISPLAY_WIDTH, DISPLAY_HEIGHT, FRAME_SLOT_SIZE,
 )
+from ...core.frame_cache import default_cache
+from ...core.frame_pool import FrameStream, default_preparer
+from ...core.frame_budget import ModePlan, plan_capacity
+from ...core.slot_allocator import SlotAllocator
+from ...core.frame_pack import open_pack
+from ...core.file_watcher import ContentWatcher
+
+
+@dataclass
+class UploadRecord:
+    """上次成功上传到设备的内容, 用于增量上传"""
+    start_index: int
+    fps: int
+    params: dict
+    config_paths: list           # 上传时 DisplayMode.frame_paths 的快照
+    config_fps: int              # 上传时 DisplayMode.fps
+    paths: list                  # 设备上每个槽位的帧
+    digests: list = field(default_factory=list)   # 每个槽位 RGB565 数据的 SHA-1
+
+
+@dataclass
+class UploadJob:
+    """一次上传任务: 把 paths 编码后写入 mode_id 从 start_index 开始的槽位"""
+    mode_id: int
+    paths: list
+    start_index: int
+    fps: int
+    params: dict
+    pack_path: str = ""
+    slots: Optional[list] = None   # 增量上传: paths[i] 写入 start_index + slots[i], 其余槽位不变
+    length: int = 0                # 增量上传时动画的总帧数
+
+    def frames(self):
+        """
+        逐帧选择来源: 帧包中可用的帧直接发送映射内存 (不解码、不复制),
+        其余帧边编码边上传源文件; 帧顺序不变。
+        两者都没有的帧 (源文件缺失且不在帧包中) 跳过, 增量上传时槽位固定, 不跳过。
+        """
+        pack = open_pack(self.pack_path)
+        ready = {}
+        if pack is not None:
+            ready = {i: pack.frame(pack.index_of(p)) for i, p in enumerate(self.paths)
+                     if pack.usable(p, self.params)}
+        if len(ready) == len(self.paths):
+            return [ready[i] for i in range(len(self.paths))]
+        paths = self.paths
+        if self.slots is None:
+            keep = [i for i, p in enumerate(self.paths) if i in ready or frame_source_exists(p)]
+            paths = [self.paths[i] for i in keep]
+            ready = {n: ready[i] for n, i in enumerate(keep) if i in ready}
+        return FrameStream(default_preparer(), paths, buffer_size=4, ready=ready, **self.params)
 
 
 class UploadWorker(QThread):
-    """后台上传线程"""
-    progress = Signal(int, int)  # sent, total
+    """
+    后台上传线程。
+
+    frames 可以是 RGB565 数据列表, 也可以是边编码边产出的 FrameStream
+    (无法处理的帧为 None, 跳过且不占用槽位), 编码与传输重叠进行。
+    """
+    progress = Signal(int, int)  # done, total
     finished = Signal(bool, str)  # success, message
 
-    def __init__(self, service, mode_id, frames_data, start_index, fps):
+    def __init__(self, service, mode_id, frames, start_index, fps, slots=None, length=0):
         super().__init__()
         self._service = service
         self._mode_id = mode_id
-        self._frames_data = frames_data
+        self._frames = frames
         self._start_index = start_index
         self._fps = fps
+        self._slots = slots        # 给出时第 i 帧写入 start_index + slots[i], 动画长度为 length
+        self._length = length
+        self._cancelled = False
+        self.digests = []          # 已发送各帧的 SHA-1, 按发送顺序
+
+    def cancel(self):
+        self._cancelled = True
+        if hasattr(self._frames, "cancel"):
+            self._frames.cancel()
 
     def run(self):
         try:
-            total = len(self._frames_data)
-            for i, frame_bytes in enumerate(self._frames_data):
-                addr = (self._start_index + i) * FRAME_SLOT_SIZE
-                self._service.write_large_data(addr, frame_bytes)
+            total = len(self._frames)
+            sent = 0
+            for i, frame_bytes in enumerate(self._frames):
+                if self._cancelled:
+                    break
+                if frame_bytes is None and self._slots is not None:
+                    raise OSError(f"无法处理第 {self._slots[i]} 帧")
+                if frame_bytes is not None:
+                    slot = sent if self._slots is None else self._slots[i]
+                    addr = (self._start_index + slot) * FRAME_SLOT_SIZE
+                    self._service.write_large_data(addr, frame_bytes)
+                    self.digests.append(hashlib.sha1(frame_bytes).digest())
+                    sent += 1
                 self.progress.emit(i + 1, total)
 
+            if self._cancelled:
+                self.finished.emit(False, "上传已取消")
+                return
+            if sent == 0:
+                self.finished.emit(False, "没有可上传的帧")
+                return
             self._service.update_pic(
-                self._mode_id, self._start_index, total, fps=self._fps
+                self._mode_id, self._start_index, sent if self._slots is None else self._length,
+                fps=self._fps
             )
             self.finished.emit(True, "上传完成")
         except Exception as e:
+            self.cancel()
             self.finished.emit(False, str(e))
 
 
+class PlanWorker(QThread):
+    """后台执行容量规划 (解码所有帧生成缩略签名, 耗时与帧数成正比)"""
+    done = Signal(object)   # fn 的返回值
+    failed = Signal(str)
+
+    def __init__(self, fn: Callable, parent=None):
+        super().__init__(parent)
+        self._fn = fn
+
+    def run(self):
+        try:
+            self.done.emit(self._fn())
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+def plan_in_background(parent: QWidget, fn: Callable, on_done: Callable, on_error: Callable):
+    """
+    在 PlanWorker 中执行 fn, 期间显示模态的忙碌进度条 (界面保持响应但不能操作),
+    完成后在 GUI 线程调用 on_done(结果) 或 on_error(消息)。
+    """
+    progress = QProgressDialog("正在按设备容量规划帧...", None, 0, 0, parent)
+    progress.setWindowModality(Qt.WindowModal)
+    progress.setMinimumDuration(300)
+    worker = PlanWorker(fn, parent)
+
+    def finish(callback, value):
+        progress.close()
+        callback(value)
+
+    worker.done.connect(lambda result: finish(on_done, result))
+    worker.failed.connect(lambda msg: finish(on_error, msg))
+    worker.finished.connect(worker.deleteLater)
+    worker.start()
+    return worker
+
+
 class ModePage(QWidget):
     """单个模式的完整配置页面"""
 
@@ -61,8 +190,13 @@ class ModePage(QWidget):
         super().__init__(parent)
         self._config = mode_config
         self._device_state = device_state  # 保存 DeviceState 引用
-        self._processed_frames = []  # list of ProcessedFrame
+        self._frame_cache = default_cache()
+        self._preview_paths = None   # 当前预览的帧 (单帧或整个动画), 参数改变时重新合成
         self._upload_worker = None
+        self._uploaded: Optional[UploadRecord] = None   # 本模式上次上传的内容
+        self._dirty: set[str] = set()                   # 源文件已修改、尚未上传的帧
+        self._source_watcher = ContentWatcher(self)
+        self._source_watcher.changed.connect(self._on_sources_changed)
         self._setup_ui()
         self._refresh_ui()
 
@@ -120,9 +254,19 @@ class ModePage(QWidget):
         # 左: 帧列表
         frame_list_layout = QVBoxLayout()
 
-        self.frame_list = QListWidget()
+        # 模型/视图: 增删和拖动排序只更新受影响的行, 缩略图在后台生成
+        self.frame_model = FrameListModel(parent=self)
+        self.frame_model.frames_changed.connect(self._on_frames_changed)
+        self.frame_list = QListView()
+        self.frame_list.setModel(self.frame_model)
+        self.frame_list.setUniformItemSizes(True)
+        self.frame_list.setIconSize(THUMB_SIZE)
+        self.frame_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
         self.frame_list.setDragDropMode(QAbstractItemView.InternalMove)
-        self.frame_list.currentRowChanged.connect(self._on_frame_selected)
+        self.frame_list.setDefaultDropAction(Qt.MoveAction)
+        self.frame_list.selectionModel().currentRowChanged.connect(
+            lambda current, _previous: self._on_frame_selected(current.row())
+        )
         frame_list_layout.addWidget(self.frame_list)
 
         # 按钮行
@@ -153,6 +297,14 @@ class ModePage(QWidget):
         self.fps_spin.setValue(10)
         self.fps_spin.valueChanged.connect(self._on_fps_changed)
         fps_row.addWidget(self.fps_spin)
+
+        fps_row.addWidget(QLabel("画质:"))
+        self.quality_combo = QComboBox()
+        for name, label in (("fast", "快速"), ("balanced", "均衡"), ("quality", "最佳")):
+            self.quality_combo.addItem(label, name)
+        self.quality_combo.setToolTip("快速/均衡: 大图按目标尺寸缩小解码; 最佳: 完整解码后缩放")
+        self.quality_combo.currentIndexChanged.connect(self._on_quality_changed)
+        fps_row.addWidget(self.quality_combo)
         fps_row.addStretch()
 
         self.frame_count_label = QLabel("0 帧")
@@ -160,6 +312,31 @@ class ModePage(QWidget):
 
         frame_list_layout.addLayout(fps_row)
 
+        # 对齐方式 / 背景色: 只重新合成, 预览实时更新
+        layout_row = QHBoxLayout()
+        layout_row.addWidget(QLabel("水平:"))
+        self.h_align_combo = QComboBox()
+        for label, value in (("左", -1), ("居中", 0), ("右", 1)):
+            self.h_align_combo.addItem(label, value)
+        self.h_align_combo.currentIndexChanged.connect(self._on_layout_changed)
+        layout_row.addWidget(self.h_align_combo)
+
+        layout_row.addWidget(QLabel("垂直:"))
+        self.v_align_combo = QComboBox()
+        for label, value in (("上", -1), ("居中", 0), ("下", 1)):
+            self.v_align_combo.addItem(label, value)
+        self.v_align_combo.currentIndexChanged.connect(self._on_layout_changed)
+        layout_row.addWidget(self.v_align_combo)
+
+        layout_row.addWidget(QLabel("背景:"))
+        self.bg_color_btn = QPushButton()
+        self.bg_color_btn.setFixedWidth(48)
+        self.bg_color_btn.clicked.connect(self._choose_bg_color)
+        layout_row.addWidget(self.bg_color_btn)
+        layout_row.addStretch()
+
+        frame_list_layout.addLayout(layout_row)
+
         display_layout.addLayout(frame_list_layout, stretch=2)
 
         # 右: 预览
@@ -177,6 +354,12 @@ class ModePage(QWidget):
         upload_btn.clicked.connect(self._upload_to_device)
         preview_btn_row.addWidget(upload_btn)
 
+        self.delta_upload_btn = QPushButton("上传修改")
+        self.delta_upload_btn.setToolTip("只重新上传源文件已修改且编码结果变化的帧")
+        self.delta_upload_btn.setEnabled(False)
+        self.delta_upload_btn.clicked.connect(self._upload_changes)
+        preview_btn_row.addWidget(self.delta_upload_btn)
+
         preview_layout.addLayout(preview_btn_row)
 
         display_layout.addLayout(preview_layout, stretch=3)
@@ -203,9 +386,27 @@ class ModePage(QWidget):
 
         # 更新 FPS
         self.fps_spin.setValue(self._config.display.fps)
+        index = self.quality_combo.findData(self._config.display.quality)
+        self.quality_combo.blockSignals(True)
+        self.quality_combo.setCurrentIndex(max(0, index))
+        self.quality_combo.blockSignals(False)
+
+        # 更新对齐方式和背景色
+        display = self._config.display
+        for combo, value in ((self.h_align_combo, display.h_align),
+                             (self.v_align_combo, display.v_align)):
+            combo.blockSignals(True)
+            combo.setCurrentIndex(max(0, combo.findData(value)))
+            combo.blockSignals(False)
+        self._update_bg_color_button()
 
         # 更新帧列表
-        self._update_frame_list()
+        self.frame_model.set_paths(self._config.display.frame_paths,
+                                   lambda: self._config.display.pack_path)
+        self.frame_count_label.setText(f"{self.frame_model.rowCount()} 帧")
+        self._watch_sources()
+        # 后台预处理, 之后的预览/上传直接命中缓存
+        self._frame_cache.prefetch(self._config.display.frame_paths, **self._frame_params())
 
     def _on_key_selected(self, key_index: int):
         if 0 <= key_index < len(self._config.keys):
@@ -223,19 +424,127 @@ class ModePage(QWidget):
         self._config.display.fps = value
         self.config_changed.emit()
 
+    def _on_quality_changed(self, index: int):
+        quality = self.quality_combo.itemData(index)
+        if quality not in RESAMPLE_PRESETS or quality == self._config.display.quality:
+            return
+        self._config.display.quality = quality
+        self._frame_cache.prefetch(self._config.display.frame_paths, **self._frame_params())
+        self.config_changed.emit()
+
+    def _on_layout_changed(self, _index: int = 0):
+        display = self._config.display
+        h_align = self.h_align_combo.currentData()
+        v_align = self.v_align_combo.currentData()
+        if (h_align, v_align) == (display.h_align, display.v_align):
+            return
+        display.h_align = h_align
+        display.v_align = v_align
+        self._rerender_preview()
+        self.config_changed.emit()
+
+    def _choose_bg_color(self):
+        display = self._config.display
+        color = QColorDialog.getColor(QColor(*display.bg_color), self, "选择背景色")
+        if not color.isValid():
+            return
+        bg_color = (color.red(), color.green(), color.blue())
+        if bg_color == tuple(display.bg_color):
+            return
+        display.bg_color = bg_color
+        self._update_bg_color_button()
+        self._rerender_preview()
+        self.config_changed.emit()
+
+    def _update_bg_color_button(self):
+        r, g, b = self._config.display.bg_color
+        self.bg_color_btn.setStyleSheet(
+            f"background-color: rgb({r}, {g}, {b}); border: 1px solid #555;"
+        )
+
+    def _rerender_preview(self):
+        """
+        对齐方式/背景色改变后按新参数刷新预览。
+        缩放结果已在帧缓存中, 每帧只需重新合成和编码, 整个模式的动画也能即时刷新;
+        render() 不写磁盘缓存, 上传时再按最终参数处理。
+        """
+        if self._preview_paths is None:
+            return
+        frames = []
+        for path in self._preview_paths:
+            try:
+                frames.append(self._processed_frame(path, persist=False))
+            except (OSError, ValueError):
+                continue
+        if not frames:
+            return
+        if len(self._preview_paths) == 1:
+            self.image_preview.set_single_image(frames[0])
+        else:
+            self.image_preview.set_animation(frames, self._config.display.fps)
+
+    def _frame_params(self) -> dict:
+        """帧处理参数 (FrameCache / FrameStream)"""
+        return self._config.display.frame_params()
+
+    def _frame_available(self, path: str) -> bool:
+        """源文件存在, 或帧包中有该帧"""
+        if frame_source_exists(path):
+            return True
+        pack = open_pack(self._config.display.pack_path)
+        return pack is not None and path in pack
+
+    def _processed_frame(self, path: str, persist: bool = True) -> ProcessedFrame:
+        """
+        优先取帧包中仍然有效的帧, 否则经帧缓存处理源文件。
+        persist 为 False 时新合成的帧不写入磁盘缓存 (实时预览)。
+        """
+        pack = open_pack(self._config.display.pack_path)
+        if pack is not None and pack.usable(path, self._frame_params()):
+            return pack.processed(pack.index_of(path))
+        if persist:
+            return self._frame_cache.get(path, **self._frame_params())
+        return self._frame_cache.render(path, **self._frame_params())
+
     # ==============================
     # 帧管理
     # ==============================
 
-    def _update_frame_list(self):
-        self.frame_list.clear()
-        self._processed_frames.clear()
-        for path in self._config.display.frame_paths:
-            if os.path.exists(path):
-                item = QListWidgetItem(os.path.basename(path))
-                item.setData(Qt.UserRole, path)
-                self.frame_list.addItem(item)
-        self.frame_count_label.setText(f"{self.frame_list.count()} 帧")
+    def _on_frames_changed(self):
+        self.frame_count_label.setText(f"{self.frame_model.rowCount()} 帧")
+        self._watch_sources()
+        self.config_changed.emit()
+
+    def _watch_sources(self):
+        self._source_watcher.set_files(
+            {parse_frame_ref(p)[0] for p in self._config.display.frame_paths}
+        )
+        self._update_delta_button()
+
+    def _on_sources_changed(self, sources: list):
+        """源文件内容改变: 刷新缩略图, 只重新编码受影响的帧, 标记预览过期并记为待上传"""
+        changed = set(sources)
+        refs = [p for p in dict.fromkeys(self._config.display.frame_paths)
+                if os.path.abspath(parse_frame_ref(p)[0]) in changed]
+        if not refs:
+            return
+        self._dirty.update(refs)
+        self.frame_model.invalidate_thumbnails(refs)
+        self._frame_cache.prefetch([p for p in refs if frame_source_exists(p)],
+                                   **self._frame_params())
+        if self._preview_paths and not set(self._preview_paths).isdisjoint(refs):
+            self.image_preview.set_stale(True)
+        self._update_delta_button()
+
+    def _update_delta_button(self):
+        count = len(self._dirty.intersection(self._config.display.frame_paths))
+        self.delta_upload_btn.setEnabled(count > 0)
+        self.delta_upload_btn.setText(f"上传修改 ({count})" if count else "上传修改")
+
+    def _append_frames(self, paths: list[str]):
+        self.frame_model.append_paths(paths)
+        # 只预处理新加入的帧
+        self._frame_cache.prefetch(paths, **self._frame_params())
 
     def _add_images(self):
         files, _ = QFileDialog.getOpenFileNames(
@@ -243,9 +552,7 @@ class ModePage(QWidget):
             "Images (*.png *.jpg *.jpeg *.bmp);;All Files (*)"
         )
         if files:
-            self._config.display.frame_paths.extend(files)
-            self._update_frame_list()
-            self.config_changed.emit()
+            self._append_frames(files)
 
     def _add_gif(self):
         file, _ = QFileDialog.getOpenFileName(
@@ -254,56 +561,48 @@ class ModePage(QWidget):
         )
         if file:
             try:
-                frames = extract_gif_frames(file)
-                # 将 GIF 帧保存为临时 PNG
-                import tempfile
-                temp_dir = tempfile.mkdtemp(prefix="kb_frames_")
-                for i, frame in enumerate(frames):
-                    path = os.path.join(temp_dir, f"frame_{i:04d}.png")
-                    frame.save(path)
-                    self._config.display.frame_paths.append(path)
-                self._update_frame_list()
-                self.config_changed.emit()
+                # 只记录帧引用 "file.gif#frame=N", 预览/上传时才解码
+                n_frames = count_frames(file)
+                self._append_frames([make_frame_ref(file, i) for i in range(n_frames)])
             except Exception as e:
                 QMessageBox.warning(self, "错误", f"GIF 解析失败: {e}")
 
     def _remove_frame(self):
-        row = self.frame_list.currentRow()
-        if row >= 0:
-            self._config.display.frame_paths.pop(row)
-            self._update_frame_list()
-            self.config_changed.emit()
+        rows = [index.row() for index in self.frame_list.selectionModel().selectedRows()]
+        if not rows and self.frame_list.currentIndex().isValid():
+            rows = [self.frame_list.currentIndex().row()]
+        self.frame_model.remove_rows(rows)
 
     def _clear_frames(self):
-        self._config.display.frame_paths.clear()
-        self._update_frame_list()
+        self.frame_model.clear()
+        self._preview_paths = None
         self.image_preview.clear()
-        self.config_changed.emit()
 
     def _on_frame_selected(self, row: int):
         if row >= 0 and row < len(self._config.display.frame_paths):
             path = self._config.display.frame_paths[row]
-            if os.path.exists(path):
+            if self._frame_available(path):
                 try:
-                    img = load_image(path)
-                    processed = process_image(img)
-                    self.image_preview.set_single_image(processed.preview_image)
+                    processed = self._processed_frame(path)
+                    self.image_preview.set_single_image(processed)
+                    self._preview_paths = [path]
                 except Exception:
                     pass
 
     def _play_preview(self):
         """播放所有帧的动画预览"""
-        preview_images = []
+        frames = []
+        paths = []
         for path in self._config.display.frame_paths:
-            if os.path.exists(path):
+            if self._frame_available(path):
                 try:
-                    img = load_image(path)
-                    processed = process_image(img)
-                    preview_images.append(processed.preview_image)
+                    frames.append(self._processed_frame(path))
+                    paths.append(path)
                 except Exception:
                     continue
-        if preview_images:
-            self.image_preview.set_animation(preview_images, self._config.display.fps)
+        if frames:
+            self.image_preview.set_animation(frames, self._config.display.fps)
+            self._preview_paths = paths
 
     # ==============================
     # 按键配置上传
@@ -340,109 +639,214 @@ class ModePage(QWidget):
     # 动画上传到设备
     # ==============================
 
-    def upload_to_device(self, service, start_index: int):
-        """准备并上传帧数据到设备（由外部调用）"""
-        total_frames = len(self._config.display.frame_paths)
+    def upload_to_device(self, service, start_index: int, plan: Optional[ModePlan] = None,
+                         on_done: Optional[Callable[[bool, str], None]] = None):
+        """
+        准备并上传帧数据到设备（由外部调用）。
+        编码在进程池中进行, 每帧编码完成后立即由上传线程发送, 两者重叠执行。
+        给出 plan 时上传重采样后的帧并使用其 FPS (见 frame_budget)。
+        上传是异步的: 给出 on_done 时完成后调用 on_done(成功, 消息) 而不弹出结果对话框,
+        没有可上传的帧时立即以成功调用。
+        返回下一个可用的帧槽位 (按存在的帧文件数预留)。
+        """
+        if plan is not None:
+            paths, fps = plan.frame_paths, plan.fps
+        else:
+            paths = [p for p in self._config.display.frame_paths if self._frame_available(p)]
+            fps = self._config.display.fps
 
-        if total_frames == 0:
-            QMessageBox.information(self, "提示", "没有可上传的帧")
+        if not paths:
+            if on_done is not None:
+                on_done(True, "")
+            else:
+                QMessageBox.information(self, "提示", "没有可上传的帧")
             return start_index
 
+        self._start_upload(service, [
+            UploadJob(self._config.mode_id, paths, start_index, fps, self._frame_params(),
+                      self._config.display.pack_path)
+        ], on_done)
+        return start_index + len(paths)
+
+    def _start_upload(self, service, jobs: list["UploadJob"],
+                      on_done: Optional[Callable[[bool, str], None]] = None):
+        """
+        依次执行上传任务, 共用一个进度条; 前一个成功后才开始下一个。
+        全部完成、失败或取消后调用 on_done(成功, 消息), 未给出时弹出结果对话框。
+        """
+        jobs = list(jobs)
+        total = sum(len(job.paths) for job in jobs)
+
         # 立即创建并显示进度条
-        progress = QProgressDialog("正在准备图片数据...", "取消", 0, total_frames, self)
+        progress = QProgressDialog("正在编码并上传到设备...", "取消", 0, total, self)
         progress.setWindowModality(Qt.WindowModal)
         progress.setMinimumDuration(0)  # 立即显示，不等待
         progress.setValue(0)  # 强制立即显示
 
-        # 处理图片数据
-        frames_data = []
-        for i, path in enumerate(self._config.display.frame_paths):
-            if progress.wasCanceled():
-                return start_index
-
-            if os.path.exists(path):
-                try:
-                    img = load_image(path)
-                    processed = process_image(img)
-                    frames_data.append(processed.rgb565_data)
-                except Exception:
-                    continue
-
-        if not frames_data:
-            progress.close()
-            QMessageBox.information(self, "提示", "没有可上传的帧")
-            return start_index
+        done_before = 0
+
+        def run_next():
+            job = jobs.pop(0)
+            base = done_before
+            worker = UploadWorker(service, job.mode_id, job.frames(), job.start_index, job.fps,
+                                  job.slots, job.length)
+            worker.progress.connect(lambda done, _total: progress.setValue(base + done))
+            worker.finished.connect(lambda ok, msg: on_finished(ok, msg, job, worker))
+            progress.canceled.connect(worker.cancel)
+            self._upload_worker = worker
+            worker.start()
+
+        def on_finished(ok: bool, msg: str, job: UploadJob, worker: UploadWorker):
+            nonlocal done_before
+            done_before += len(job.paths)
+            self._record_upload(ok, job, worker)
+            if ok and jobs:
+                run_next()
+            elif on_done is not None:
+                progress.close()
+                on_done(ok, msg)
+            else:
+                self._on_upload_done(ok, msg, progress)
+
+        run_next()
+
+    def _record_upload(self, ok: bool, job: UploadJob, worker: UploadWorker):
+        """记录本模式设备上的内容 (搬移的其他模式由各自页面在增量上传前校验)"""
+        if job.mode_id != self._config.mode_id:
+            return
+        if job.slots is not None:
+            # 增量上传: 已写入的槽位即使中途失败也已更新
+            if self._uploaded is not None:
+                for slot, digest in zip(job.slots, worker.digests):
+                    self._uploaded.digests[slot] = digest
+        elif ok and len(worker.digests) == len(job.paths):
+            display = self._config.display
+            self._uploaded = UploadRecord(
+                job.start_index, job.fps, dict(job.params), list(display.frame_paths),
+                display.fps, list(job.paths), list(worker.digests),
+            )
+        else:
+            # 部分写入或跳过了缺失的帧, 槽位与帧的对应关系未知
+            self._uploaded = None
+        if ok:
+            self._dirty.clear()
+            self._update_delta_button()
 
-        # 更新进度条文本
-        progress.setLabelText("正在上传到设备...")
-        progress.setMaximum(len(frames_data))
-        progress.setValue(0)
+    def _upload_changes(self):
+        """
+        增量上传: 只重写源文件修改后编码结果变化的槽位。
+        要求设备上本模式的起点/长度、帧列表、FPS 和处理参数都与上次上传时一致,
+        否则需要完整上传 (动图帧时长的变化不在增量上传中体现)。
+        """
+        if not self._device_state or not self._device_state.connected:
+            QMessageBox.information(self, "提示", "请先连接设备")
+            return
 
-        self._upload_worker = UploadWorker(
-            service, self._config.mode_id, frames_data, start_index, self._config.display.fps
-        )
+        service = self._device_state.service
+        display = self._config.display
+        record = self._uploaded
+        params = self._frame_params()
+        try:
+            state = service.read_pic_state(self._config.mode_id)
+            if (record is None
+                    or state.get("start_index") != record.start_index
+                    or state.get("pic_length") != len(record.paths)
+                    or record.config_paths != display.frame_paths
+                    or record.config_fps != display.fps
+                    or record.params != params):
+                reply = QMessageBox.question(
+                    self, "需要完整上传",
+                    "设备上的动画与上次上传时不一致, 或帧列表、FPS、处理参数已修改, "
+                    "无法只上传修改的帧。\n\n是否完整上传?",
+                    QMessageBox.Yes | QMessageBox.No,
+                    QMessageBox.Yes
+                )
+                if reply == QMessageBox.Yes:
+                    self._upload_to_device()
+                return
 
-        self._upload_worker.progress.connect(lambda sent, total: progress.setValue(sent))
-        self._upload_worker.finished.connect(lambda ok, msg: self._on_upload_done(ok, msg, progress))
-        self._upload_worker.start()
+            # 修改的帧已在后台重新编码, 这里通常直接命中缓存
+            QApplication.setOverrideCursor(Qt.WaitCursor)
+            try:
+                slots, paths = [], []
+                for slot, path in enumerate(record.paths):
+                    if path not in self._dirty:
+                        continue
+                    frame = self._frame_cache.get(path, **params)
+                    if hashlib.sha1(frame.rgb565_data).digest() != record.digests[slot]:
+                        slots.append(slot)
+                        paths.append(path)
+            finally:
+                QApplication.restoreOverrideCursor()
+
+            if not slots:
+                self._dirty.clear()
+                self._update_delta_button()
+                QMessageBox.information(self, "提示", "设备上的帧已是最新")
+                return
 
-        return start_index + len(frames_data)
+            self._start_upload(service, [
+                UploadJob(self._config.mode_id, paths, record.start_index, record.fps, params,
+                          slots=slots, length=len(record.paths))
+            ])
+        except Exception as e:
+            QMessageBox.warning(self, "上传失败", str(e))
 
     def _upload_to_device(self):
-        """UI 按钮触发的动画上传（查询设备当前状态后上传）"""
+        """UI 按钮触发的动画上传（查询设备当前状态后分配槽位并上传）"""
         if not self._device_state or not self._device_state.connected:
             QMessageBox.information(self, "提示", "请先连接设备")
             return
 
         try:
+            service = self._device_state.service
+
             # 1. 查询所有模式的状态
-            all_states = []
-            max_capacity = 0
-            for mode_id in range(3):
-                state = self._device_state.service.read_pic_state(mode_id)
-                all_states.append(state)
-                max_capacity = state.get("all_mode_max_pic", MAX_TOTAL_FRAMES)
-
-            # 2. 获取当前要上传的模式和帧数
+            allocator = SlotAllocator.from_pic_states(
+                [service.read_pic_state(mode_id) for mode_id in range(3)]
+            )
+        except Exception as e:
+            QMessageBox.warning(self, "上传失败", str(e))
+            return
+
+        # 2. 获取当前要上传的模式和帧数 (超出设备容量时自动重采样), 以及可搬移的其他模式;
+        #    需要解码帧, 在后台线程中进行; 后台只使用此处复制的配置, 不读取界面正在编辑的对象
+        current_mode = self._config.mode_id
+        display = self._config.display.snapshot()
+        others = {
+            mode_id: mode.display.snapshot()
+            for mode_id, mode in enumerate(self._device_state.config.modes)
+            if mode_id != current_mode
+        }
+        plan_in_background(
+            self,
+            lambda: (plan_capacity([display], allocator.capacity)[0],
+                     self._relocatable_modes(allocator, others)),
+            lambda result: self._upload_with_plan(service, allocator, *result),
+            lambda msg: QMessageBox.warning(self, "上传失败", msg),
+        )
+
+    def _upload_with_plan(self, service, allocator: SlotAllocator, plan: ModePlan,
+                          relocatable: dict):
+        """容量规划完成后分配槽位并上传"""
+        try:
             current_mode = self._config.mode_id
-            new_count = len(self._config.display.frame_paths)
+            new_count = plan.frame_count
 
             if new_count == 0:
                 QMessageBox.information(self, "提示", "没有可上传的帧")
                 return
 
-            # 3. 构建除当前模式外的占用区域
-            occupied_regions = []  # [(start, end, mode_id), ...]
-            for state in all_states:
-                mode_id = state.get("mode", 0)
-                if mode_id == current_mode:
-                    continue  # 跳过当前模式
-                start = state.get("start_index", 0)
-                length = state.get("pic_length", 0)
-                if length > 0:
-                    occupied_regions.append((start, start + length, mode_id))
-
-            # 按起始位置排序
-            occupied_regions.sort(key=lambda x: x[0])
-
-            # 4. 寻找能容纳 new_count 帧的连续空间
-            start_index = self._find_free_space(occupied_regions, new_count, max_capacity)
-
-            # 5. 检测是否会覆盖其他模式
-            end_index = start_index + new_count
-            overlapped_modes = []
-            for region_start, region_end, mode_id in occupied_regions:
-                # 检查区间是否重叠
-                if not (end_index <= region_start or start_index >= region_end):
-                    overlapped_modes.append(mode_id)
-
-            # 6. 如果有覆盖，弹出确认对话框
-            if overlapped_modes:
-                mode_names = [f"模式 {m}" for m in overlapped_modes]
+            # 3. 分配槽位: 优先 best-fit, 放不下时搬移主机上有帧数据的模式, 最后才清空
+            alloc = allocator.plan(current_mode, new_count, relocatable)
+
+            # 4. 需要清空其他模式时弹出确认对话框
+            if alloc.cleared:
+                mode_names = [f"模式 {m}" for m in alloc.cleared]
                 reply = QMessageBox.question(
                     self, "空间不足",
                     f"没有足够的连续空间存储 {new_count} 帧动画。\n\n"
-                    f"上传到位置 {start_index} 将会覆盖以下模式：\n"
+                    f"上传到位置 {alloc.start} 将会覆盖以下模式：\n"
                     f"{', '.join(mode_names)}\n\n"
                     f"这些模式的动画将被清空（长度设为0）。\n\n"
                     f"是否继续？",
@@ -453,57 +857,43 @@ class ModePage(QWidget):
                 if reply != QMessageBox.Yes:
                     return
 
-                # 7. 用户确认，清空被覆盖的模式
-                for mode_id in overlapped_modes:
-                    self._device_state.service.update_pic(mode_id, 0, 0, fps=10)
+                for mode_id in alloc.cleared:
+                    service.update_pic(mode_id, 0, 0, fps=10)
 
-            # 8. 执行上传
-            self.upload_to_device(self._device_state.service, start_index)
+            # 5. 先把挡路的模式重新上传到新位置, 再上传当前模式
+            jobs = []
+            for move in alloc.moves:
+                moved_plan, params, pack_path = relocatable[move.mode_id]
+                jobs.append(UploadJob(move.mode_id, moved_plan.frame_paths, move.dst_start,
+                                      moved_plan.fps, params, pack_path))
+            jobs.append(UploadJob(current_mode, plan.frame_paths, alloc.start, plan.fps,
+                                  self._frame_params(), self._config.display.pack_path))
+            self._start_upload(service, jobs)
 
         except Exception as e:
             QMessageBox.warning(self, "上传失败", str(e))
 
-    def _find_free_space(self, occupied_regions, needed_count, max_capacity):
-        """寻找能容纳 needed_count 帧的连续空间
-
-        Args:
-            occupied_regions: [(start, end, mode_id), ...] 已占用区域列表（已排序）
-            needed_count: 需要的帧数
-            max_capacity: 设备最大容量
-
-        Returns:
-            int: 起始位置
+    def _relocatable_modes(self, allocator: SlotAllocator, displays: dict) -> dict:
+        """
+        可以搬移的其他模式 {mode_id: (ModePlan, 帧处理参数, 帧包路径)}:
+        按主机配置 displays {mode_id: DisplayMode 副本} 重采样后的帧数与设备上一致,
+        且每帧都已在帧包或帧缓存中。需要解码帧做容量规划, 在 PlanWorker 中调用。
         """
-        # 没有任何占用区域，从头开始
-        if not occupied_regions:
-            return 0
-
-        # 检查开头是否有空间
-        first_start = occupied_regions[0][0]
-        if first_start >= needed_count:
-            return 0
-
-        # 检查相邻区域之间的间隙
-        for i in range(len(occupied_regions) - 1):
-            gap_start = occupied_regions[i][1]  # 当前区域结束位置
-            gap_end = occupied_regions[i + 1][0]  # 下一区域开始位置
-            gap_size = gap_end - gap_start
-
-            if gap_size >= needed_count:
-                return gap_start
-
-        # 检查末尾是否有空间
-        last_end = occupied_regions[-1][1]
-        if last_end + needed_count <= max_capacity:
-            return last_end
-
-        # 没有足够的连续空间，选择最优覆盖位置：
-        # 1. 如果从位置0开始能放下，就从0开始（覆盖第一个模式）
-        if needed_count <= max_capacity:
-            return 0
-
-        # 2. 如果连容量都不够，从末尾开始（尽量保留前面的）
-        return max(0, max_capacity - needed_count)
+        result = {}
+        for region in allocator.regions:
+            display = displays.get(region.mode_id)
+            if display is None:
+                continue
+            plan = plan_capacity([display], allocator.capacity)[0]
+            params = display.frame_params()
+            pack = open_pack(display.pack_path)
+            if plan.frame_count == region.length and all(
+                (pack is not None and pack.usable(path, params))
+                or self._frame_cache.lookup(path, **params) is not None
+                for path in plan.frame_paths
+            ):
+                result[region.mode_id] = (plan, params, display.pack_path)
+        return result
 
     def _on_upload_done(self, success: bool, message: str, progress: QProgressDialog):
         progress.close()
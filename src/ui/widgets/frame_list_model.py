@@ -0,0 +1,304 @@
+"""
+帧列表模型 — QAbstractListModel 包装 DisplayMode.frame_paths, 后台生成缩略图
+
+模型直接持有配置中的 frame_paths 列表 (同一个对象), 添加、删除、拖动排序都按行
+增量修改并发出对应的 rows 信号, 视图只重绘受影响的行, 也不会重新访问文件系统。
+缩略图在视图第一次请求 (即该行可见) 时提交到线程池生成, 完成后按路径缓存:
+  - 普通图片: 按缩略图尺寸 draft 解码
+  - 动图帧引用: 同一动图的所有帧由一个任务顺序解码一遍, 避免逐帧从头 seek
+  - 源文件缺失时从模式的帧包 (.kbpack) 中读取缩略图, 都没有则标记为缺失
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from PySide6.QtCore import (
+    QAbstractListModel, QMimeData, QModelIndex, QObject, QSize, Qt, Signal,
+)
+from PySide6.QtGui import QBrush, QColor, QImage, QPixmap
+
+from ...core.image_processor import (
+    iter_animation_frames, load_image, make_frame_ref, parse_frame_ref,
+)
+from ...core.frame_pack import open_pack
+
+THUMB_SIZE = QSize(64, 32)
+_ROWS_MIME = "application/x-kb-frame-rows"
+
+
+def _to_qimage(img) -> QImage:
+    img = img.convert("RGB")
+    img.thumbnail((THUMB_SIZE.width(), THUMB_SIZE.height()))
+    data = img.tobytes()
+    # copy(): QImage 不持有 data, 离开作用域前复制一份
+    return QImage(data, img.width, img.height, img.width * 3, QImage.Format_RGB888).copy()
+
+
+class ThumbnailLoader(QObject):
+    """在线程池中生成缩略图 (QImage), 通过信号交回 GUI 线程"""
+
+    thumbnail_ready = Signal(str, object)   # path, QImage (None 表示无法生成)
+
+    def __init__(self, workers: int = 2, parent=None):
+        super().__init__(parent)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+        self._pending = set()        # 已提交的普通图片路径 / 动图源文件
+        self._lock = threading.Lock()
+
+    def request(self, path: str, pack_path: str = ""):
+        """请求 path 的缩略图, 重复请求会被合并"""
+        source, index = parse_frame_ref(path)
+        key = source if index is not None else path
+        with self._lock:
+            if key in self._pending:
+                return
+            self._pending.add(key)
+        if index is not None:
+            self._executor.submit(self._load_animation, source, path, pack_path)
+        else:
+            self._executor.submit(self._load_image, path, pack_path)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load_image(self, path: str, pack_path: str):
+        try:
+            try:
+                image = _to_qimage(load_image(path, (THUMB_SIZE.width(), THUMB_SIZE.height()), "fast"))
+            except (OSError, ValueError):
+                image = self._from_pack(path, pack_path)
+            self.thumbnail_ready.emit(path, image)
+        finally:
+            with self._lock:
+                self._pending.discard(path)
+
+    def _load_animation(self, source: str, requested: str, pack_path: str):
+        """顺序解码整个动图, 为每一帧发出缩略图"""
+        try:
+            try:
+                for index, frame in enumerate(iter_animation_frames(source)):
+                    self.thumbnail_ready.emit(make_frame_ref(source, index), _to_qimage(frame))
+            except (OSError, ValueError):
+                self.thumbnail_ready.emit(requested, self._from_pack(requested, pack_path))
+        finally:
+            with self._lock:
+                self._pending.discard(source)
+
+    @staticmethod
+    def _from_pack(path: str, pack_path: str) -> Optional[QImage]:
+        pack = open_pack(pack_path)
+        if pack is None or path not in pack:
+            return None
+        return _to_qimage(pack.thumbnail(pack.index_of(path)))
+
+
+_default_loader = None
+
+
+def default_thumbnail_loader() -> ThumbnailLoader:
+    """各模式页共享的缩略图加载器 (在 GUI 线程中首次调用时创建, 退出时调用 shutdown)"""
+    global _default_loader
+    if _default_loader is None:
+        _default_loader = ThumbnailLoader()
+    return _default_loader
+
+
+class FrameListModel(QAbstractListModel):
+    """
+    帧列表模型。
+
+    set_paths() 绑定配置中的 frame_paths 列表, 之后通过 insert_paths / remove_rows /
+    moveRows / clear 修改, 模型与列表始终一致。这些修改完成后发出 frames_changed
+    (set_paths 只是重新绑定, 不发出)。
+    """
+
+    PathRole = Qt.UserRole
+    frames_changed = Signal()
+
+    _MAX_THUMBNAILS = 4096
+
+    def __init__(self, loader: Optional[ThumbnailLoader] = None, parent=None):
+        super().__init__(parent)
+        self._paths: list[str] = []
+        self._pack_path: Callable[[], str] = lambda: ""
+        self._loader = loader or default_thumbnail_loader()
+        self._loader.thumbnail_ready.connect(self._on_thumbnail)
+        self._thumbnails = OrderedDict()   # path -> QPixmap
+        self._missing = set()              # 无法生成缩略图的路径
+        self._placeholder = QPixmap(THUMB_SIZE)
+        self._placeholder.fill(QColor("#2a2a2a"))
+
+    # ---------------- 数据绑定 ----------------
+
+    def set_paths(self, paths: list, pack_path: Callable[[], str] = None):
+        """绑定 frame_paths 列表 (模型会原地修改它); pack_path 返回当前帧包路径"""
+        self.beginResetModel()
+        self._paths = paths
+        if pack_path is not None:
+            self._pack_path = pack_path
+        self._missing.clear()
+        self.endResetModel()
+
+    def paths(self) -> list:
+        return self._paths
+
+    def path(self, row: int) -> str:
+        return self._paths[row]
+
+    # ---------------- 增量修改 ----------------
+
+    def insert_paths(self, row: int, paths: list):
+        if not paths:
+            return
+        row = max(0, min(row, len(self._paths)))
+        self.beginInsertRows(QModelIndex(), row, row + len(paths) - 1)
+        self._paths[row:row] = list(paths)
+        self.endInsertRows()
+        self.frames_changed.emit()
+
+    def append_paths(self, paths: list):
+        self.insert_paths(len(self._paths), paths)
+
+    def remove_rows(self, rows):
+        """删除若干行, 连续的行合并为一次 beginRemoveRows"""
+        rows = sorted(set(r for r in rows if 0 <= r < len(self._paths)), reverse=True)
+        if not rows:
+            return
+        while rows:
+            last = first = rows.pop(0)
+            while rows and rows[0] == first - 1:
+                first = rows.pop(0)
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self._paths[first:last + 1]
+            self.endRemoveRows()
+        self.frames_changed.emit()
+
+    def clear(self):
+        if not self._paths:
+            return
+        self.beginRemoveRows(QModelIndex(), 0, len(self._paths) - 1)
+        self._paths.clear()
+        self.endRemoveRows()
+        self.frames_changed.emit()
+
+    def moveRows(self, source_parent, source_row, count, dest_parent, dest_row) -> bool:
+        if (source_parent.isValid() or dest_parent.isValid() or count <= 0
+                or source_row < 0 or source_row + count > len(self._paths)
+                or not 0 <= dest_row <= len(self._paths)
+                or source_row <= dest_row <= source_row + count):
+            return False
+        if not self.beginMoveRows(QModelIndex(), source_row, source_row + count - 1,
+                                  QModelIndex(), dest_row):
+            return False
+        moved = self._paths[source_row:source_row + count]
+        del self._paths[source_row:source_row + count]
+        insert_at = dest_row - count if dest_row > source_row else dest_row
+        self._paths[insert_at:insert_at] = moved
+        self.endMoveRows()
+        self.frames_changed.emit()
+        return True
+
+    # ---------------- QAbstractListModel ----------------
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self._paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self._paths):
+            return None
+        path = self._paths[index.row()]
+        if role == Qt.DisplayRole:
+            source, frame = parse_frame_ref(path)
+            name = os.path.basename(source)
+            return name if frame is None else f"{name} #{frame}"
+        if role == Qt.DecorationRole:
+            pixmap = self._thumbnails.get(path)
+            if pixmap is not None:
+                self._thumbnails.move_to_end(path)
+                return pixmap
+            if path not in self._missing:
+                self._loader.request(path, self._pack_path())
+            return self._placeholder
+        if role == Qt.ToolTipRole:
+            return path + ("\n(文件缺失)" if path in self._missing else "")
+        if role == Qt.ForegroundRole and path in self._missing:
+            return QBrush(QColor("#c62828"))
+        if role == self.PathRole:
+            return path
+        return None
+
+    def flags(self, index):
+        base = super().flags(index)
+        if index.isValid():
+            return base | Qt.ItemIsDragEnabled
+        return base | Qt.ItemIsDropEnabled
+
+    def supportedDropActions(self):
+        return Qt.MoveAction
+
+    def mimeTypes(self):
+        return [_ROWS_MIME]
+
+    def mimeData(self, indexes):
+        mime = QMimeData()
+        rows = sorted({i.row() for i in indexes if i.isValid()})
+        mime.setData(_ROWS_MIME, json.dumps(rows).encode("utf-8"))
+        return mime
+
+    def dropMimeData(self, mime, action, row, column, parent) -> bool:
+        """
+        拖动排序: 把拖动的行依次移动到 row 处。
+        返回 False, 视图不会再删除源行 (移动已在这里完成)。
+        """
+        if action != Qt.MoveAction or not mime.hasFormat(_ROWS_MIME):
+            return False
+        rows = json.loads(bytes(mime.data(_ROWS_MIME)).decode("utf-8"))
+        if row < 0:
+            row = parent.row() if parent.isValid() else len(self._paths)
+        # 从后往前移动, 已移动的行不影响其余行的序号
+        target = row
+        for source in sorted(rows, reverse=True):
+            if source < target:
+                self.moveRows(QModelIndex(), source, 1, QModelIndex(), target)
+                target -= 1
+        target = row
+        for source in sorted(r for r in rows if r >= row):
+            self.moveRows(QModelIndex(), source, 1, QModelIndex(), target)
+            target += 1
+        return False
+
+    # ---------------- 缩略图 ----------------
+
+    def invalidate_thumbnails(self, paths=None):
+        """源文件改变后丢弃缩略图缓存 (paths 为 None 时全部丢弃)"""
+        if paths is None:
+            self._thumbnails.clear()
+            self._missing.clear()
+        else:
+            for path in paths:
+                self._thumbnails.pop(path, None)
+                self._missing.discard(path)
+        if self._paths:
+            self.dataChanged.emit(self.index(0), self.index(len(self._paths) - 1),
+                                  [Qt.DecorationRole])
+
+    def _on_thumbnail(self, path: str, image: Optional[QImage]):
+        # 加载器可能由多个模型共享, 只保留本模型中的帧
+        rows = [row for row, p in enumerate(self._paths) if p == path]
+        if not rows:
+            return
+        if image is None:
+            self._missing.add(path)
+        else:
+            self._missing.discard(path)
+            self._thumbnails[path] = QPixmap.fromImage(image)
+            self._thumbnails.move_to_end(path)
+            while len(self._thumbnails) > self._MAX_THUMBNAILS:
+                self._thumbnails.popitem(last=False)
+        for row in rows:
+            index = self.index(row)
+            self.dataChanged.emit(index, index)
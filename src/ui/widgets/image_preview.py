@@ -1,12 +1,35 @@
 """
 图片预览控件 — 显示单帧或动画预览
+
+帧可以是 PIL Image, 也可以是 ProcessedFrame (带 rgb565_data): 后者直接用上传到
+设备的 RGB565 数据构建 QImage, 预览效果与设备显示一致。
+每帧只在第一次显示时转换并放大成 QPixmap, 结果按内容哈希存入 QPixmapCache,
+定时器每次只切换已准备好的 QPixmap; 重新播放、停止、拖动到某一帧都不再转换。
 """
 
+import hashlib
+
+import numpy as np
 from PySide6.QtWidgets import QLabel, QFrame, QVBoxLayout
-from PySide6.QtGui import QImage, QPixmap
+from PySide6.QtGui import QImage, QPixmap, QPixmapCache
 from PySide6.QtCore import Qt, QTimer
 from PIL import Image
 
+from ...core.image_processor import DISPLAY_WIDTH, DISPLAY_HEIGHT
+
+PREVIEW_SCALE = 2
+_CACHE_LIMIT_KB = 64 * 1024   # 约 300 帧 320x160 预览
+
+
+def _scaled(pixmap: QPixmap, scale: int) -> QPixmap:
+    if scale == 1:
+        return pixmap
+    return pixmap.scaled(
+        pixmap.width() * scale, pixmap.height() * scale,
+        Qt.KeepAspectRatio,
+        Qt.FastTransformation,
+    )
+
 
 def pil_to_qpixmap(img: Image.Image, scale: int = 2) -> QPixmap:
     """将 PIL Image 转换为 QPixmap"""
@@ -14,13 +37,39 @@ def pil_to_qpixmap(img: Image.Image, scale: int = 2) -> QPixmap:
     data = img_rgb.tobytes()
     w, h = img_rgb.size
     qimg = QImage(data, w, h, w * 3, QImage.Format_RGB888)
-    pixmap = QPixmap.fromImage(qimg)
-    if scale != 1:
-        pixmap = pixmap.scaled(
-            w * scale, h * scale,
-            Qt.KeepAspectRatio,
-            Qt.FastTransformation,
-        )
+    return _scaled(QPixmap.fromImage(qimg), scale)
+
+
+def rgb565_to_qpixmap(data, width: int = DISPLAY_WIDTH, height: int = DISPLAY_HEIGHT,
+                      scale: int = 2) -> QPixmap:
+    """
+    将设备的 RGB565 大端数据转换为 QPixmap。
+    只做一次字节序转换, QImage 直接引用该缓冲区 (Format_RGB16), 不经过 PIL。
+    """
+    native = np.frombuffer(data, dtype=">u2", count=width * height).astype("=u2")
+    qimg = QImage(native.data, width, height, width * 2, QImage.Format_RGB16)
+    return _scaled(QPixmap.fromImage(qimg), scale)
+
+
+def cached_pixmap(frame, scale: int = PREVIEW_SCALE) -> QPixmap:
+    """frame (PIL Image 或 ProcessedFrame) 的放大预览, 按内容缓存在 QPixmapCache"""
+    rgb565 = getattr(frame, "rgb565_data", None)
+    if rgb565 is not None:
+        width, height = frame.preview_image.size
+        digest = hashlib.blake2b(rgb565, digest_size=16).hexdigest()
+        key = f"kb-preview/565/{width}x{height}/{digest}/{scale}"
+    else:
+        img = frame.convert("RGB")
+        digest = hashlib.blake2b(img.tobytes(), digest_size=16).hexdigest()
+        key = f"kb-preview/rgb/{img.width}x{img.height}/{digest}/{scale}"
+
+    pixmap = QPixmapCache.find(key)
+    if pixmap is None:
+        if rgb565 is not None:
+            pixmap = rgb565_to_qpixmap(rgb565, width, height, scale)
+        else:
+            pixmap = pil_to_qpixmap(img, scale)
+        QPixmapCache.insert(key, pixmap)
     return pixmap
 
 
@@ -29,10 +78,12 @@ class ImagePreview(QFrame):
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self._frames: list[Image.Image] = []
+        self._pixmaps: list[QPixmap] = []
         self._current_frame = 0
         self._timer = QTimer(self)
         self._timer.timeout.connect(self._next_frame)
+        if QPixmapCache.cacheLimit() < _CACHE_LIMIT_KB:
+            QPixmapCache.setCacheLimit(_CACHE_LIMIT_KB)
 
         self._setup_ui()
 
@@ -43,48 +94,71 @@ class ImagePreview(QFrame):
         self._label = QLabel()
         self._label.setAlignment(Qt.AlignCenter)
         self._label.setMinimumSize(320, 160)
-        self._label.setStyleSheet("background-color: #1a1a1a; border: 1px solid #333; border-radius: 4px;")
         layout.addWidget(self._label)
 
         self._info_label = QLabel("无图片")
         self._info_label.setAlignment(Qt.AlignCenter)
-        self._info_label.setStyleSheet("color: #888; font-size: 11px;")
         layout.addWidget(self._info_label)
+        self._info = "无图片"
+        self.set_stale(False)
+
+    def set_stale(self, stale: bool = True):
+        """标记预览已过期 (源文件已修改); 重新设置图片或动画后自动清除"""
+        self._stale = stale
+        border = "#ef6c00" if stale else "#333"
+        self._label.setStyleSheet(
+            f"background-color: #1a1a1a; border: 1px solid {border}; border-radius: 4px;"
+        )
+        self._info_label.setStyleSheet(f"color: {'#ef6c00' if stale else '#888'}; font-size: 11px;")
+        self._info_label.setText(f"{self._info} (源文件已修改)" if stale else self._info)
 
-    def set_single_image(self, img: Image.Image):
-        """显示单张图片"""
+    def is_stale(self) -> bool:
+        return self._stale
+
+    def _set_info(self, text: str):
+        self._info = text
+        self.set_stale(False)
+
+    def set_single_image(self, img):
+        """显示单张图片 (PIL Image 或 ProcessedFrame)"""
         self._timer.stop()
-        self._frames = [img]
+        self._pixmaps = [cached_pixmap(img)]
         self._current_frame = 0
         self._show_frame(0)
-        self._info_label.setText("1 帧")
+        self._set_info("1 帧")
 
-    def set_animation(self, frames: list[Image.Image], fps: int = 10):
-        """设置动画帧并开始播放"""
+    def set_animation(self, frames: list, fps: int = 10):
+        """设置动画帧 (PIL Image 或 ProcessedFrame) 并开始播放"""
         self._timer.stop()
-        self._frames = frames
+        # 播放前一次性准备好所有 QPixmap, 定时器回调只切换显示
+        self._pixmaps = [cached_pixmap(frame) for frame in frames]
         self._current_frame = 0
-        if frames:
+        if self._pixmaps:
             self._show_frame(0)
-            self._info_label.setText(f"{len(frames)} 帧 @ {fps} FPS")
-            if len(frames) > 1:
+            self._set_info(f"{len(frames)} 帧 @ {fps} FPS")
+            if len(self._pixmaps) > 1:
                 self._timer.start(int(1000 / fps))
         else:
             self._label.clear()
-            self._info_label.setText("无图片")
+            self._set_info("无图片")
+
+    def show_frame(self, index: int):
+        """停止播放并显示动画的第 index 帧"""
+        self._timer.stop()
+        self._current_frame = index
+        self._show_frame(index)
 
     def clear(self):
         self._timer.stop()
-        self._frames = []
+        self._pixmaps = []
         self._label.clear()
-        self._info_label.setText("无图片")
+        self._set_info("无图片")
 
     def _show_frame(self, index: int):
-        if 0 <= index < len(self._frames):
-            pixmap = pil_to_qpixmap(self._frames[index], scale=2)
-            self._label.setPixmap(pixmap)
+        if 0 <= index < len(self._pixmaps):
+            self._label.setPixmap(self._pixmaps[index])
 
     def _next_frame(self):
-        if self._frames:
-            self._current_frame = (self._current_frame + 1) % len(self._frames)
+        if self._pixmaps:
+            self._current_frame = (self._current_frame + 1) % len(self._pixmaps)
             self._show_frame(self._current_frame)
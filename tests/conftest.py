@@ -0,0 +1,20 @@
+"""
+测试公共配置 — hook 脚本以 hook/ 为工作目录运行, 模块之间按顶层名称互相导入
+"""
+
+import os
+import sys
+
+import pytest
+
+HOOK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hook")
+if HOOK_DIR not in sys.path:
+    sys.path.insert(0, HOOK_DIR)
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """界面相关测试共用的 QApplication (无显示环境下使用 offscreen 平台)"""
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
@@ -0,0 +1,82 @@
+"""批量转换: manifest 增量跳过, 输入/fps/顺序改变时重新生成帧包"""
+
+import json
+import os
+
+from PIL import Image
+
+import convert_frames
+from src.core.frame_pack import FramePack
+
+
+def _inputs(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    for name, color in (("a.png", (255, 0, 0)), ("b.png", (0, 255, 0))):
+        Image.new("RGB", (64, 32), color).save(src / name)
+    return src
+
+
+def _run(*args) -> int:
+    return convert_frames.main([*map(str, args), "-j", "1", "--no-preview"])
+
+
+def _pack(out) -> FramePack:
+    return FramePack(str(out / "frames.kbpack"))
+
+
+def test_rerun_skips_unchanged(tmp_path, capsys):
+    src, out = _inputs(tmp_path), tmp_path / "out"
+    assert _run(src, "-o", out) == 0
+    assert sorted(os.listdir(out / "bin")) == ["a.bin", "b.bin"]
+    mtime = os.stat(out / "frames.kbpack").st_mtime_ns
+    capsys.readouterr()
+
+    assert _run(src, "-o", out) == 0
+    output = capsys.readouterr().out
+    assert "转换 0, 跳过 2" in output and "未改变" in output
+    assert os.stat(out / "frames.kbpack").st_mtime_ns == mtime
+
+
+def test_changed_input_and_removed_input(tmp_path, capsys):
+    src, out = _inputs(tmp_path), tmp_path / "out"
+    _run(src, "-o", out)
+    Image.new("RGB", (64, 32), (0, 0, 255)).save(src / "a.png")
+    (src / "b.png").unlink()
+    capsys.readouterr()
+
+    assert _run(src, "-o", out) == 0
+    assert "转换 1, 跳过 0" in capsys.readouterr().out
+    assert os.listdir(out / "bin") == ["a.bin"]
+    pack = _pack(out)
+    try:
+        assert pack.sources == [str(src / "a.png")]
+        assert bytes(pack.frame(0))[:2] == b"\x00\x1F"   # 蓝色
+    finally:
+        pack.close()
+
+
+def test_fps_change_rebuilds_pack(tmp_path):
+    src, out = _inputs(tmp_path), tmp_path / "out"
+    _run(src, "-o", out, "--fps", "10")
+    _run(src, "-o", out, "--fps", "4")
+    pack = _pack(out)
+    try:
+        assert pack.fps == 4
+        assert [pack.duration(i) for i in range(len(pack))] == [250, 250]
+    finally:
+        pack.close()
+    with open(out / "manifest.json", encoding="utf-8") as f:
+        assert json.load(f)["pack"]["fps"] == 4
+
+
+def test_input_order_change_rebuilds_pack(tmp_path):
+    src, out = _inputs(tmp_path), tmp_path / "out"
+    a, b = src / "a.png", src / "b.png"
+    _run(a, b, "-o", out)
+    _run(b, a, "-o", out)
+    pack = _pack(out)
+    try:
+        assert pack.sources == [str(b), str(a)]
+    finally:
+        pack.close()
@@ -0,0 +1,132 @@
+"""文件监视: 只报告内容确实改变的文件, stat 未变时不读取内容"""
+
+import os
+import time
+
+import pytest
+
+from src.core import file_watcher
+from src.core.file_watcher import ContentWatcher
+
+
+@pytest.fixture
+def digests(monkeypatch):
+    """记录 file_digest 的调用"""
+    calls = []
+    file_digest = file_watcher.file_digest
+
+    def counting(path):
+        calls.append(path)
+        return file_digest(path)
+
+    monkeypatch.setattr(file_watcher, "file_digest", counting)
+    return calls
+
+
+@pytest.fixture
+def watcher(qapp):
+    watcher = ContentWatcher(delay_ms=10)
+    events = []
+    watcher.changed.connect(events.append)
+    watcher.events = events
+    yield watcher
+    watcher.shutdown()
+
+
+def _wait(qapp, watcher, timeout=2.0):
+    """处理事件直到收到 changed 或超时, 返回收到的路径列表"""
+    deadline = time.monotonic() + timeout
+    while not watcher.events and time.monotonic() < deadline:
+        qapp.processEvents()
+        time.sleep(0.01)
+    # 再处理一会儿, 确认没有多余的通知
+    end = time.monotonic() + 0.1
+    while time.monotonic() < end:
+        qapp.processEvents()
+        time.sleep(0.01)
+    return [path for event in watcher.events for path in event]
+
+
+def _write(path, data: bytes, mtime_offset: int = 0):
+    path.write_bytes(data)
+    if mtime_offset:
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + mtime_offset))
+
+
+def _baseline(watcher):
+    for future in list(watcher._digests.values()):
+        future.result()
+
+
+def test_reports_content_change(qapp, tmp_path, watcher):
+    a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+    _write(a, b"one")
+    _write(b, b"two")
+    watcher.set_files([str(a), str(b)])
+    _baseline(watcher)
+    assert watcher.files() == sorted([str(a), str(b)])
+
+    _write(a, b"changed", mtime_offset=10**9)
+    assert _wait(qapp, watcher) == [str(a)]
+
+
+def test_ignores_touch_and_sibling_changes(qapp, tmp_path, watcher, digests):
+    a = tmp_path / "a.txt"
+    _write(a, b"same")
+    watcher.set_files([str(a)])
+    _baseline(watcher)
+    digests.clear()
+
+    # 其他文件的改变只引起目录通知, stat 未变不读取内容
+    _write(tmp_path / "other.txt", b"x")
+    assert _wait(qapp, watcher, timeout=0.3) == []
+    assert digests == []
+
+    # 只更新修改时间: 读取内容但不报告
+    _write(a, b"same", mtime_offset=10**9)
+    assert _wait(qapp, watcher, timeout=0.5) == []
+    assert digests == [str(a)]
+
+
+def test_reports_deleted_and_replaced_file(qapp, tmp_path, watcher):
+    a = tmp_path / "a.txt"
+    _write(a, b"one")
+    watcher.set_files([str(a)])
+    _baseline(watcher)
+
+    # 编辑器式保存: 写临时文件再替换
+    tmp = tmp_path / "a.txt.tmp"
+    _write(tmp, b"two", mtime_offset=10**9)
+    os.replace(tmp, a)
+    assert _wait(qapp, watcher) == [str(a)]
+
+    watcher.events.clear()
+    a.unlink()
+    assert _wait(qapp, watcher) == [str(a)]
+
+
+def test_refresh_updates_baseline(qapp, tmp_path, watcher):
+    a = tmp_path / "a.txt"
+    _write(a, b"one")
+    watcher.set_files([str(a)])
+    _write(a, b"written by us", mtime_offset=10**9)
+    watcher.refresh(str(a))
+    assert _wait(qapp, watcher, timeout=0.3) == []
+
+
+def test_shutdown(qapp, tmp_path, watcher):
+    paths = []
+    for i in range(20):
+        path = tmp_path / f"{i}.bin"
+        _write(path, bytes(1024 * 1024))
+        paths.append(str(path))
+    watcher.set_files(paths)
+    watcher.shutdown()
+    assert watcher.files() == []
+    assert watcher._hasher is None
+
+    # 关闭后仍可重新开始监视
+    watcher.set_files(paths[:1])
+    _baseline(watcher)
+    assert watcher.files() == paths[:1]
@@ -0,0 +1,44 @@
+"""帧容量规划: 合并重复帧、降低 FPS、按比例截取"""
+
+from PIL import Image
+
+from src.core.frame_budget import Segment, plan_capacity, plan_modes, resample
+from src.core.keymap import DisplayMode
+
+
+def _save(path, color):
+    Image.new("RGB", (32, 16), color).save(path)
+    return str(path)
+
+
+def test_resample_by_duration():
+    timeline = [Segment("a", 100), Segment("b", 300)]
+    assert resample(timeline, 10) == ["a", "b", "b", "b"]
+    assert resample(timeline, 10, count=1) == ["b"]
+    assert resample([Segment("a", 200), Segment("b", 200)], 10, count=2) == ["a", "b"]
+
+
+def test_plan_modes_reduces_fps_of_largest_mode():
+    long = [Segment(str(i), 100) for i in range(30)]     # 3 秒
+    short = [Segment(str(i), 100) for i in range(5)]     # 0.5 秒
+    plans = plan_modes([long, short, []], [10, 10, 10], capacity=20)
+    assert sum(p.frame_count for p in plans) <= 20
+    assert plans[0].fps < 10 and plans[1].fps == 10
+    assert plans[2].frame_count == 0
+    assert not any(p.truncated for p in plans)
+
+
+def test_plan_modes_truncates_at_min_fps():
+    timeline = [Segment(str(i), 1000) for i in range(30)]
+    plans = plan_modes([timeline], [1], capacity=10)
+    assert plans[0].frame_count == 10 and plans[0].truncated
+
+
+def test_plan_capacity_merges_duplicate_stills(tmp_path):
+    red = [_save(tmp_path / f"r{i}.png", (255, 0, 0)) for i in range(4)]
+    blue = _save(tmp_path / "b.png", (0, 0, 255))
+    display = DisplayMode(fps=10, frame_paths=red + [blue])
+    [plan] = plan_capacity([display], capacity=74)
+    assert plan.source_frames == 5
+    assert plan.duration_ms == 500
+    assert plan.frame_paths == [red[0]] * 4 + [blue]
@@ -0,0 +1,103 @@
+"""帧缓存: 内存/磁盘/缩放结果三层命中, 磁盘按最近使用淘汰"""
+
+import os
+
+import pytest
+from PIL import Image
+
+from src.core import frame_cache
+from src.core.frame_cache import FrameCache, FrameKey
+from src.core.image_processor import process_image
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """记录 load_image 的调用 (即需要解码缩放的次数)"""
+    calls = []
+    load_image = frame_cache.load_image
+
+    def counting(path, *args, **kwargs):
+        calls.append(path)
+        return load_image(path, *args, **kwargs)
+
+    monkeypatch.setattr(frame_cache, "load_image", counting)
+    return calls
+
+
+def _image(tmp_path, name, color):
+    path = tmp_path / name
+    Image.new("RGB", (320, 100), color).save(path)
+    return str(path)
+
+
+def test_get_matches_process_image(tmp_path, decodes):
+    path = _image(tmp_path, "a.png", (10, 200, 30))
+    frame = FrameCache(tmp_path / "cache").get(path, h_align=-1, bg_color=(1, 2, 3))
+    expected = process_image(Image.open(path).convert("RGB"), h_align=-1, bg_color=(1, 2, 3))
+    assert frame.rgb565_data == expected.rgb565_data
+
+
+def test_memory_disk_and_layer_hits(tmp_path, decodes):
+    path = _image(tmp_path, "a.png", (255, 0, 0))
+    cache = FrameCache(tmp_path / "cache")
+    first = cache.get(path)
+    assert cache.get(path) is first          # 内存命中
+    assert cache.peek(path) is first
+    assert len(decodes) == 1
+
+    # 只改对齐/背景: 复用缩放结果, 不重新解码
+    cache.get(path, h_align=1, bg_color=(0, 0, 255))
+    cache.render(path, v_align=-1)
+    assert len(decodes) == 1
+
+    # 新实例 (如应用重启): 磁盘命中
+    other = FrameCache(tmp_path / "cache")
+    assert other.peek(path) is None
+    assert other.lookup(path).rgb565_data == first.rgb565_data
+    assert len(decodes) == 1
+
+
+def test_modified_source_misses(tmp_path, decodes):
+    path = _image(tmp_path, "a.png", (255, 0, 0))
+    cache = FrameCache(tmp_path / "cache")
+    cache.get(path)
+    Image.new("RGB", (300, 100), (0, 255, 0)).save(path)
+    assert cache.lookup(path) is None
+    assert cache.get(path).preview_image.getpixel((80, 40)) == (0, 255, 0)
+    assert len(decodes) == 2
+
+
+def test_prefetch(tmp_path, decodes):
+    paths = [_image(tmp_path, f"{i}.png", (i * 40, 0, 0)) for i in range(4)]
+    cache = FrameCache(tmp_path / "cache", workers=2)
+    try:
+        futures = cache.prefetch(paths + [str(tmp_path / "missing.png")])
+        assert len(futures) == 4
+        for future in futures:
+            future.result()
+        assert all(cache.peek(p) is not None for p in paths)
+        assert cache.prefetch(paths) == []
+    finally:
+        cache.shutdown()
+    assert sorted(decodes) == sorted(paths)
+
+
+def test_disk_prune_keeps_recently_used(tmp_path):
+    paths = [_image(tmp_path, f"{i}.png", (0, 0, i * 40)) for i in range(3)]
+    cache_dir = tmp_path / "cache"
+    writer = FrameCache(cache_dir)
+    for i, path in enumerate(paths):
+        writer.get(path)
+        # 写入时间依次为 300s / 200s / 100s 前, paths[0] 最旧
+        disk = writer._disk_path(FrameKey.for_path(path))
+        old = os.stat(disk).st_mtime - (3 - i) * 100
+        os.utime(disk, (old, old))
+    size = os.path.getsize(writer._disk_path(FrameKey.for_path(paths[0])))
+
+    # 读取最旧的条目, 之后它应是最近使用的
+    assert FrameCache(cache_dir).lookup(paths[0]) is not None
+
+    pruner = FrameCache(cache_dir, max_disk_bytes=2 * size)
+    pruner._prune_disk()
+    remaining = [p for p in paths if FrameCache(cache_dir).lookup(p) is not None]
+    assert remaining == [paths[0]]
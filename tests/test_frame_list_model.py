@@ -0,0 +1,62 @@
+"""帧列表模型的增删与拖动排序, 模型始终原地修改绑定的 frame_paths"""
+
+import pytest
+from PySide6.QtCore import QModelIndex, Qt
+
+from src.ui.widgets.frame_list_model import FrameListModel, ThumbnailLoader
+
+
+@pytest.fixture
+def model(qapp):
+    loader = ThumbnailLoader(workers=1)
+    model = FrameListModel(loader)
+    yield model
+    loader.shutdown()
+
+
+def test_edits_update_bound_list(model):
+    paths = ["a", "b"]
+    model.set_paths(paths)
+    changed = []
+    model.frames_changed.connect(lambda: changed.append(True))
+
+    model.insert_paths(1, ["x", "y"])
+    assert paths == ["a", "x", "y", "b"]
+    model.remove_rows([0, 2, 9])
+    assert paths == ["x", "b"]
+    model.clear()
+    assert paths == [] and model.rowCount() == 0
+    assert len(changed) == 3
+
+
+@pytest.mark.parametrize("source, dest, expected", [
+    (0, 3, ["b", "c", "a", "d"]),
+    (3, 0, ["d", "a", "b", "c"]),
+    (1, 4, ["a", "c", "d", "b"]),
+])
+def test_move_rows(model, source, dest, expected):
+    paths = ["a", "b", "c", "d"]
+    model.set_paths(paths)
+    assert model.moveRows(QModelIndex(), source, 1, QModelIndex(), dest)
+    assert paths == expected
+
+
+def test_move_rows_rejects_noop_and_out_of_range(model):
+    paths = ["a", "b", "c"]
+    model.set_paths(paths)
+    assert not model.moveRows(QModelIndex(), 1, 1, QModelIndex(), 1)
+    assert not model.moveRows(QModelIndex(), 1, 1, QModelIndex(), 2)
+    assert not model.moveRows(QModelIndex(), 2, 2, QModelIndex(), 0)
+    assert paths == ["a", "b", "c"]
+
+
+def test_drop_moves_selected_rows(model):
+    paths = ["a", "b", "c", "d", "e"]
+    model.set_paths(paths)
+    mime = model.mimeData([model.index(0), model.index(3)])
+    assert not model.dropMimeData(mime, Qt.MoveAction, 2, 0, QModelIndex())
+    assert paths == ["b", "a", "d", "c", "e"]
+
+    mime = model.mimeData([model.index(1), model.index(2)])
+    model.dropMimeData(mime, Qt.MoveAction, -1, 0, QModelIndex())
+    assert paths == ["b", "c", "e", "a", "d"]
@@ -0,0 +1,71 @@
+"""帧包写入/读取往返, 源文件变化后的可用性判断"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.core.frame_pack import FramePack, open_pack, write_pack
+from src.core.image_processor import (
+    DISPLAY_HEIGHT, DISPLAY_WIDTH, ProcessedFrame, encode_rgb565_be,
+)
+
+
+def _gradient(seed: int) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    arr = rng.integers(0, 256, (DISPLAY_HEIGHT, DISPLAY_WIDTH, 3), dtype=np.uint8)
+    return Image.fromarray(arr)
+
+
+def _frame(seed: int) -> ProcessedFrame:
+    img = _gradient(seed)
+    return ProcessedFrame(rgb565_data=encode_rgb565_be(img), preview_image=img)
+
+
+def test_pack_round_trip(tmp_path):
+    sources = []
+    for i in range(3):
+        path = tmp_path / f"{i}.png"
+        _gradient(i).save(path)
+        sources.append(str(path))
+    frames = [_frame(i) for i in range(3)]
+    params = {"h_align": 0, "v_align": 0, "bg_color": (0, 0, 0), "preset": "balanced"}
+    pack_path = str(tmp_path / "mode.kbpack")
+
+    write_pack(pack_path, sources, iter(frames), [100, 50, 200], 10, params)
+
+    pack = FramePack(pack_path)
+    try:
+        assert len(pack) == 3
+        for i, source in enumerate(sources):
+            assert source in pack
+            assert pack.index_of(source) == i
+            assert bytes(pack.frame(i)) == frames[i].rgb565_data
+        assert [pack.duration(i) for i in range(3)] == [100, 50, 200]
+        assert pack.thumbnail(0).size == (80, 40)
+        assert pack.usable(sources[0], params)
+        assert not pack.usable(sources[0], dict(params, h_align=1))
+        assert not pack.usable(str(tmp_path / "other.png"))
+    finally:
+        pack.close()
+
+
+def test_pack_usable_after_source_removed_or_modified(tmp_path):
+    kept, removed = str(tmp_path / "kept.png"), str(tmp_path / "removed.png")
+    _gradient(0).save(kept)
+    _gradient(1).save(removed)
+    pack_path = str(tmp_path / "mode.kbpack")
+    write_pack(pack_path, [kept, removed], [_frame(0), _frame(1)], [100, 100], 10)
+
+    _gradient(2).resize((40, 20)).save(kept)
+    (tmp_path / "removed.png").unlink()
+    pack = open_pack(pack_path)
+    assert not pack.usable(kept)    # 源文件已修改
+    assert pack.usable(removed)     # 源文件缺失时帧包是唯一来源
+
+
+def test_write_pack_frame_count_mismatch(tmp_path):
+    pack_path = tmp_path / "mode.kbpack"
+    with pytest.raises(ValueError):
+        write_pack(str(pack_path), ["a", "b"], [_frame(0)], [100, 100], 10)
+    assert not pack_path.exists()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,141 @@
+"""并行帧准备: 结果按输入顺序产出, 取消后停止产出并释放资源"""
+
+import threading
+
+import pytest
+from PIL import Image
+
+from src.core.frame_cache import FrameCache
+from src.core.frame_pool import FramePreparer, FrameStream
+from src.core.image_processor import process_image
+from src.core.keymap import DisplayMode
+
+
+SIZE = dict(width=32, height=16)
+
+
+@pytest.fixture
+def preparer():
+    p = FramePreparer(max_workers=2)
+    yield p
+    p.shutdown()
+
+
+def _images(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"{i}.png"
+        # 尺寸各不相同, 完成顺序与提交顺序无关
+        Image.new("RGB", (64 + 40 * (count - i), 32), (i * 20, 255 - i * 20, 7)).save(path)
+        paths.append(str(path))
+    return paths
+
+
+def _expected(path):
+    return process_image(Image.open(path).convert("RGB"), **SIZE).rgb565_data
+
+
+def test_frames_yielded_in_input_order(tmp_path, preparer):
+    paths = _images(tmp_path, 6)
+    paths.insert(2, str(tmp_path / "missing.png"))
+    frames = list(preparer.iter_prepare(paths, window=2, **SIZE))
+    assert len(frames) == len(paths)
+    assert frames[2] is None
+    for path, frame in zip(paths, frames):
+        if frame is not None:
+            assert frame.rgb565_data == _expected(path)
+            assert frame.preview_image.size == (32, 16)
+
+
+def test_cached_frames_not_resubmitted(tmp_path):
+    paths = _images(tmp_path, 3)
+    cached = FramePreparer(FrameCache(tmp_path / "cache"), max_workers=1)
+    first = [f.rgb565_data for f in cached.iter_prepare(paths, **SIZE)]
+    cached.shutdown()
+
+    def no_pool():
+        raise AssertionError("命中缓存的帧不应提交到进程池")
+
+    cached._pool = no_pool
+    assert [f.rgb565_data for f in cached.iter_prepare(paths, **SIZE)] == first
+
+
+def test_cancel_stops_iteration(tmp_path, preparer):
+    paths = _images(tmp_path, 8)
+    cancel = threading.Event()
+    got = []
+    for frame in preparer.iter_prepare(paths, window=2, cancel_event=cancel, **SIZE):
+        got.append(frame)
+        if len(got) == 2:
+            cancel.set()
+    assert len(got) == 2
+
+    # 取消只影响传入的事件, 之后同一个准备器仍可正常使用
+    assert len(list(preparer.iter_prepare(paths[:3], **SIZE))) == 3
+
+
+def test_cancel_method_aborts_default_iteration(tmp_path, preparer):
+    frames = preparer.iter_prepare(_images(tmp_path, 5), window=2, **SIZE)
+    assert next(frames) is not None
+    preparer.cancel()
+    assert list(frames) == []
+
+
+def test_stream_merges_ready_frames_in_order(tmp_path, preparer):
+    paths = _images(tmp_path, 4)
+    ready = {1: b"packed-1", 3: b"packed-3"}
+    stream = FrameStream(preparer, paths, buffer_size=2, ready=ready, **SIZE)
+    assert len(stream) == 4
+    items = list(stream)
+    assert items == [_expected(paths[0]), b"packed-1", _expected(paths[2]), b"packed-3"]
+
+
+class _EndlessPreparer:
+    """不断产出帧的假准备器, 记录迭代是否被关闭"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def iter_prepare(self, paths, window=None, cancel_event=None, **params):
+        try:
+            while not cancel_event.is_set():
+                yield None
+        finally:
+            self.closed.set()
+
+
+def test_stream_cancel_stops_producer():
+    fake = _EndlessPreparer()
+    stream = FrameStream(fake, ["x"] * 1000, buffer_size=2)
+    got = 0
+    for _ in stream:
+        got += 1
+        if got == 3:
+            stream.cancel()
+    assert got < 1000
+    assert fake.closed.wait(2)
+    stream._thread.join(2)
+    assert not stream._thread.is_alive()
+
+
+def test_stream_reraises_producer_error():
+    class Failing:
+        def iter_prepare(self, paths, **kwargs):
+            yield None
+            raise RuntimeError("decode failed")
+
+    stream = FrameStream(Failing(), ["a", "b"])
+    items = iter(stream)
+    assert next(items) is None
+    with pytest.raises(RuntimeError, match="decode failed"):
+        next(items)
+
+
+def test_display_snapshot_is_independent():
+    display = DisplayMode(fps=12, frame_paths=["a.png"], bg_color=(1, 2, 3))
+    snap = display.snapshot()
+    display.frame_paths.append("b.png")
+    display.fps = 30
+    assert snap.frame_paths == ["a.png"]
+    assert snap.fps == 12
+    assert snap.bg_color == (1, 2, 3)
@@ -0,0 +1,92 @@
+"""hook 安装: 事件选择、工具匹配 (matcher) 与采样 (--sample) 选项及生成的配置"""
+
+import json
+
+import pytest
+
+import hook_install
+import hook_sampling
+import install_hook
+
+
+@pytest.fixture
+def settings_path(tmp_path, monkeypatch):
+    path = tmp_path / ".claude" / "settings.json"
+    monkeypatch.setattr(hook_install, "get_claude_global_settings_path", lambda: path)
+    monkeypatch.setattr(hook_install, "detect_python_executable", lambda: "/usr/bin/python3")
+    return path
+
+
+def test_parse_install_options():
+    args = hook_install.parse_install_options([
+        "--install", "--events", "PreToolUse, Stop",
+        "--matcher", "PreToolUse=Bash|Edit", "--sample", "PreToolUse=4",
+    ])
+    assert args.install and not args.uninstall
+    assert args.events == ["PreToolUse", "Stop"]
+    assert args.matchers == {"PreToolUse": "Bash|Edit"}
+    assert args.samples == {"PreToolUse": 4}
+
+
+@pytest.mark.parametrize("argv", [
+    ["--install", "--events", "Nope"],
+    ["--install", "--matcher", "Stop=Bash"],            # Stop 不支持 matcher
+    ["--install", "--matcher", "PreToolUse"],           # 缺少 =
+    ["--install", "--sample", "Notification=2"],        # 只能采样高频事件
+    ["--install", "--sample", "PreToolUse=0"],
+    ["--install", "--uninstall"],
+])
+def test_parse_install_options_rejects(argv, capsys):
+    with pytest.raises(SystemExit):
+        hook_install.parse_install_options(argv)
+    assert "error" in capsys.readouterr().err
+
+
+def test_install_writes_matcher_and_sample(settings_path):
+    settings_path.parent.mkdir(parents=True)
+    settings_path.write_text(json.dumps({"theme": "dark"}), encoding="utf-8")
+
+    output = hook_install.install_hooks(
+        ["PreToolUse", "PostToolUse", "Stop"], {"PreToolUse": "Bash"}, {"PostToolUse": 4})
+    assert "PreToolUse: matcher=Bash" in output and "PostToolUse: 采样 1/4" in output
+
+    settings = json.loads(settings_path.read_text(encoding="utf-8"))
+    assert settings["theme"] == "dark"
+    hooks = settings["hooks"]
+    assert sorted(hooks) == ["PostToolUse", "PreToolUse", "Stop"]
+    assert hooks["PreToolUse"][0]["matcher"] == "Bash"
+    assert "matcher" not in hooks["Stop"][0]
+    assert hooks["PostToolUse"][0]["hooks"][0]["command"].endswith("PostToolUse --sample 4")
+    assert hooks["PreToolUse"][0]["hooks"][0]["command"].endswith("hook_install.py\" PreToolUse")
+
+    # 卸载时从安装前的备份恢复
+    hook_install.uninstall_hooks()
+    assert json.loads(settings_path.read_text(encoding="utf-8")) == {"theme": "dark"}
+
+
+def test_install_hook_script_shares_options(tmp_path, capsys):
+    args = install_hook.parse_args(["--matcher", "PermissionRequest=Bash", "--sample", "PreToolUse=3"])
+    assert args.matchers == {"PermissionRequest": "Bash"} and args.samples == {"PreToolUse": 3}
+    with pytest.raises(SystemExit):
+        install_hook.parse_args(["--sample", "Stop=2"])
+    capsys.readouterr()
+
+    for name, _ in install_hook.HOOK_EVENTS:
+        (tmp_path / f"{name}.py").write_text("def run(): pass\n", encoding="utf-8")
+    (tmp_path / "hook_install.py").write_text("", encoding="utf-8")
+    hooks = install_hook.build_hooks_config("python3", tmp_path, ["PreToolUse", "PermissionRequest"],
+                                            args.matchers, args.samples)
+    assert sorted(hooks) == ["PermissionRequest", "PreToolUse"]
+    assert hooks["PermissionRequest"][0]["matcher"] == "Bash"
+    assert hooks["PermissionRequest"][0]["hooks"][0]["timeout"] == 60
+    assert hooks["PreToolUse"][0]["hooks"][0]["command"].endswith("PreToolUse --sample 3")
+
+
+def test_sampling_is_consistent_per_tool_use(monkeypatch):
+    monkeypatch.setattr(hook_sampling, "_every", 1)
+    assert hook_sampling.keep({"tool_use_id": "x"})
+    hook_sampling.configure(4)
+    kept = [hook_sampling.keep({"tool_use_id": f"toolu_{i}"}) for i in range(400)]
+    # Pre/Post 两个事件的结果一致
+    assert kept == [hook_sampling.keep({"tool_use_id": f"toolu_{i}"}) for i in range(400)]
+    assert 60 < sum(kept) < 140
@@ -0,0 +1,42 @@
+"""跨进程共享状态文件: 读改写在锁内完成, 并发更新不丢失"""
+
+import multiprocessing
+
+from hook_state import SharedState
+
+
+def _increment(path: str, times: int):
+    store = SharedState(path)
+    for _ in range(times):
+        with store as data:
+            data["n"] = data.get("n", 0) + 1
+
+
+def test_load_missing_or_corrupt(tmp_path):
+    path = tmp_path / "state.json"
+    assert SharedState(str(path)).load() == {}
+    path.write_text("{not json", encoding="utf-8")
+    assert SharedState(str(path)).load() == {}
+
+
+def test_exception_discards_changes(tmp_path):
+    store = SharedState(str(tmp_path / "state.json"))
+    with store as data:
+        data["x"] = 1
+    try:
+        with store as data:
+            data["x"] = 2
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert store.load() == {"x": 1}
+
+
+def test_concurrent_updates(tmp_path):
+    path = str(tmp_path / "state.json")
+    procs = [multiprocessing.Process(target=_increment, args=(path, 50)) for _ in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    assert SharedState(path).load() == {"n": 200}
@@ -0,0 +1,47 @@
+"""RGB565 编解码, 批量编码写入帧槽位"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from src.core.image_processor import (
+    DISPLAY_HEIGHT, DISPLAY_WIDTH, FRAME_SLOT_SIZE,
+    decode_rgb565_be, encode_rgb565_batch, encode_rgb565_be,
+)
+
+
+def _gradient(seed: int) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    arr = rng.integers(0, 256, (DISPLAY_HEIGHT, DISPLAY_WIDTH, 3), dtype=np.uint8)
+    return Image.fromarray(arr)
+
+
+def test_rgb565_round_trip():
+    # 低位截断后的颜色再编码结果不变
+    img = decode_rgb565_be(encode_rgb565_be(_gradient(1)))
+    data = encode_rgb565_be(img)
+    assert encode_rgb565_be(decode_rgb565_be(data)) == data
+
+
+def test_rgb565_known_values():
+    img = Image.new("RGB", (2, 1))
+    img.putpixel((0, 0), (255, 0, 0))
+    img.putpixel((1, 0), (0, 0, 255))
+    assert encode_rgb565_be(img) == b"\xF8\x00\x00\x1F"
+
+
+def test_encode_batch_writes_into_slots():
+    frames = np.stack([np.asarray(_gradient(i)) for i in range(3)])
+    out = bytearray(b"\xEE" * (3 * FRAME_SLOT_SIZE))
+    encode_rgb565_batch(frames, out)
+    frame_len = DISPLAY_WIDTH * DISPLAY_HEIGHT * 2
+    for i in range(3):
+        slot = out[i * FRAME_SLOT_SIZE:(i + 1) * FRAME_SLOT_SIZE]
+        assert bytes(slot[:frame_len]) == encode_rgb565_be(Image.fromarray(frames[i]))
+        assert slot[frame_len:] == b"\xEE" * (FRAME_SLOT_SIZE - frame_len)
+
+
+def test_encode_batch_rejects_small_buffer():
+    frames = np.zeros((2, DISPLAY_HEIGHT, DISPLAY_WIDTH, 3), dtype=np.uint8)
+    with pytest.raises(ValueError):
+        encode_rgb565_batch(frames, bytearray(FRAME_SLOT_SIZE))
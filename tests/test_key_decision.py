@@ -0,0 +1,36 @@
+"""按键审批上报只接受回显了本次请求令牌的帧"""
+
+import struct
+
+from ble_command_send import PKT_BLE_NOTIFY, DeviceCmd, DeviceService, build_frame
+
+
+class _FakeClient:
+    on_packet = None
+
+
+def _decision(allow: bool, token: int) -> bytes:
+    return build_frame(DeviceCmd.KEY_DECISION, struct.pack("<BI", int(allow), token))
+
+
+def test_accepts_matching_token():
+    service = DeviceService(_FakeClient())
+    service.expect_decision(0x12345678)
+    service._on_packet(PKT_BLE_NOTIFY, _decision(True, 0x12345678))
+    assert service.wait_key_decision(0) == "allow"
+
+
+def test_ignores_other_token_and_short_payload():
+    service = DeviceService(_FakeClient())
+    service.expect_decision(7)
+    service._on_packet(PKT_BLE_NOTIFY, _decision(True, 8))
+    service._on_packet(PKT_BLE_NOTIFY, build_frame(DeviceCmd.KEY_DECISION, b"\x01"))
+    assert service.wait_key_decision(0) is None
+    service._on_packet(PKT_BLE_NOTIFY, _decision(False, 7))
+    assert service.wait_key_decision(0) == "deny"
+
+
+def test_ignores_decision_without_request():
+    service = DeviceService(_FakeClient())
+    service._on_packet(PKT_BLE_NOTIFY, _decision(True, 0))
+    assert service.wait_key_decision(0) is None
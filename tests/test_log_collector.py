@@ -0,0 +1,93 @@
+"""日志收集: 行解析、段滚动与索引、按条件查询"""
+
+import os
+import time
+
+import pytest
+
+from log_collector import (
+    BLOCK_SECONDS, LogQuery, LogStore, SegmentDir, main, parse_line, parse_time,
+)
+
+BASE = time.mktime(time.strptime("2026-03-01 10:00:00", "%Y-%m-%d %H:%M:%S"))
+
+
+def _line(offset: float, tag="pre-tool", level="INFO", msg="m", session="") -> str:
+    ts = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(BASE + offset))
+    field = f"[{session}]" if session else ""
+    return f"[{ts}][{tag}][{level}]{field} {msg}"
+
+
+def _append(store, *lines):
+    store.append([(line, parse_line(line)) for line in lines])
+
+
+def test_parse_line():
+    assert parse_line(_line(0, "t", "WARN", "hello [x]", "s1")) == (BASE, "t", "WARN", "hello [x]", "s1")
+    assert parse_line(_line(5, "t", "INFO", "no session")) == (BASE + 5, "t", "INFO", "no session", "")
+    assert parse_line("garbage") is None
+
+
+def test_index_and_rotation(tmp_path):
+    store = LogStore(str(tmp_path), segment_size=200, keep=2)
+    for i in range(12):
+        _append(store, _line(i * 30, session=f"s{i % 2}"))
+    store.close()
+
+    segments = SegmentDir(str(tmp_path))
+    segs = segments.segments()
+    assert len(segs) == 2                # 旧段已被删除
+    index = segments.load_index(segs[-1])
+    assert index["count"] >= 1
+    assert set(index["sessions"]) <= {"s0", "s1"}
+    assert all(b[0] % BLOCK_SECONDS == 0 for b in index["blocks"])
+
+
+def test_index_rebuilt_when_missing(tmp_path):
+    store = LogStore(str(tmp_path))
+    _append(store, _line(0, tag="a"), _line(100, tag="b", level="ERROR", session="s"))
+    store.close()
+    segments = SegmentDir(str(tmp_path))
+    saved = segments.load_index(1)
+    os.remove(segments.idx_path(1))
+    assert segments.load_index(1) == saved
+    assert saved["tags"] == {"a": 1, "b": 1} and saved["sessions"] == ["s"]
+
+
+@pytest.fixture
+def populated(tmp_path):
+    store = LogStore(str(tmp_path))
+    _append(store,
+            _line(0, "pre-tool", "DEBUG", "d", "s1"),
+            _line(60, "post-tool", "INFO", "i", "s2"),
+            _line(600, "pre-tool", "WARN", "w", "s1"),
+            _line(3600, "stop", "ERROR", "e", "s10"))
+    store.close()
+    return str(tmp_path)
+
+
+def _msgs(log_dir, **kwargs):
+    return [parse_line(line)[3] for line in LogQuery(log_dir, **kwargs).run()]
+
+
+def test_query_filters(populated):
+    assert _msgs(populated) == ["d", "i", "w", "e"]
+    assert _msgs(populated, tag="pre-tool") == ["d", "w"]
+    assert _msgs(populated, level="WARN") == ["w", "e"]
+    assert _msgs(populated, session="s1") == ["d", "w"]   # 精确匹配, 不含 s10
+    assert _msgs(populated, since=BASE + 60, until=BASE + 600) == ["i", "w"]
+    assert _msgs(populated, since=BASE + 7200) == []
+    assert _msgs(populated, tag="missing") == []
+
+
+def test_query_cli(populated, capsys):
+    main(["--dir", populated, "query", "--level", "ERROR"])
+    assert capsys.readouterr().out.splitlines() == [_line(3600, "stop", "ERROR", "e", "s10")]
+    main(["tail", "--dir", populated, "-n", "2"])
+    assert [parse_line(x)[3] for x in capsys.readouterr().out.splitlines()] == ["w", "e"]
+
+
+def test_parse_time():
+    assert abs(parse_time("2h") - (time.time() - 7200)) < 5
+    assert parse_time("2026-03-01 10:00:00") == BASE
+    assert parse_time(None) is None
@@ -0,0 +1,89 @@
+"""槽位分配: best-fit、整理方案 (搬移/清空) 与全量布局"""
+
+import pytest
+
+from src.core.slot_allocator import Move, Region, SlotAllocator
+
+
+def test_from_pic_states():
+    allocator = SlotAllocator.from_pic_states([
+        {"mode": 0, "start_index": 0, "pic_length": 10, "all_mode_max_pic": 60},
+        {"mode": 1, "start_index": 20, "pic_length": 0, "all_mode_max_pic": 60},
+        {"mode": 2, "start_index": 30, "pic_length": 5, "all_mode_max_pic": 60},
+    ])
+    assert allocator.capacity == 60
+    assert allocator.regions == [Region(0, 0, 10), Region(2, 30, 5)]
+    assert allocator.region(1) is None
+    assert allocator.free_spans() == [(10, 20), (35, 25)]
+    assert allocator.free_frames() == 45
+
+
+def test_best_fit_picks_smallest_gap():
+    allocator = SlotAllocator(40, [Region(0, 5, 5), Region(1, 20, 5)])
+    # 空闲区间: [0,5) [10,20) [25,40)
+    assert allocator.best_fit(4) == 0
+    assert allocator.best_fit(8) == 10
+    assert allocator.best_fit(12) == 25
+    assert allocator.best_fit(16) is None
+
+    plan = allocator.plan(2, 8)
+    assert (plan.start, plan.length, plan.moves, plan.cleared) == (10, 8, [], [])
+
+
+def test_plan_may_reuse_own_region():
+    allocator = SlotAllocator(20, [Region(0, 0, 10), Region(1, 10, 10)])
+    plan = allocator.plan(1, 10)
+    assert plan.start == 10 and not plan.moves and not plan.cleared
+
+
+def test_plan_moves_relocatable_instead_of_clearing():
+    # 模式 1 在中间把空间切成 7 帧和 12 帧两块, 都放不下 14 帧
+    allocator = SlotAllocator(30, [Region(0, 0, 5), Region(1, 12, 6)])
+    plan = allocator.plan(2, 14, relocatable={1})
+    assert plan.cleared == []
+    assert len(plan.moves) == 1 and plan.moves[0].mode_id == 1
+    assert plan.rewritten_frames == 14 + 6
+
+    allocator.apply(plan)
+    regions = allocator.regions
+    assert sum(r.length for r in regions) == 5 + 6 + 14
+    spans = sorted((r.start, r.end) for r in regions)
+    assert all(a_end <= b_start for (_, a_end), (b_start, _) in zip(spans, spans[1:]))
+
+
+def test_plan_clears_when_not_relocatable():
+    allocator = SlotAllocator(30, [Region(0, 0, 5), Region(1, 12, 6)])
+    plan = allocator.plan(2, 14)
+    assert plan.moves == []
+    assert plan.cleared == [1]
+    allocator.apply(plan)
+    assert allocator.region(1) is None
+    assert allocator.region(2).length == 14
+
+
+def test_plan_over_capacity():
+    with pytest.raises(ValueError):
+        SlotAllocator(10).plan(0, 11)
+
+
+def test_move_bytes():
+    from src.core.image_processor import FRAME_SLOT_SIZE
+    assert Move(0, 0, 10, 3).bytes == 3 * FRAME_SLOT_SIZE
+
+
+def test_layout_keeps_existing_starts():
+    allocator = SlotAllocator(30, [Region(0, 0, 10), Region(1, 10, 5), Region(2, 20, 5)])
+    assert allocator.layout({0: 8, 1: 5, 2: 6}) == {0: 0, 1: 10, 2: 20}
+
+
+def test_layout_packs_when_fragmented():
+    allocator = SlotAllocator(30, [Region(0, 10, 5), Region(1, 20, 5)])
+    starts = allocator.layout({0: 5, 1: 5, 2: 20})
+    spans = sorted((starts[m], starts[m] + n) for m, n in {0: 5, 1: 5, 2: 20}.items())
+    assert spans[-1][1] <= 30
+    assert all(a_end <= b_start for (_, a_end), (b_start, _) in zip(spans, spans[1:]))
+
+
+def test_layout_over_capacity():
+    with pytest.raises(ValueError):
+        SlotAllocator(10).layout({0: 6, 1: 5})
@@ -0,0 +1,62 @@
+"""状态调度: 去重只针对已成功发送的状态, 限速窗口内的状态立即丢弃"""
+
+import time
+
+from ble_command_send import ClaudeState
+from state_scheduler import StateScheduler
+
+
+def test_dedupe_after_commit(tmp_path):
+    path = str(tmp_path / "hook_state.json")
+    scheduler = StateScheduler(path, max_rate=0)
+    assert scheduler.acquire(ClaudeState.CL_PreToolUse)
+    scheduler.commit(ClaudeState.CL_PreToolUse)
+    assert not StateScheduler(path, max_rate=0).acquire(ClaudeState.CL_PreToolUse)
+    assert StateScheduler(path, max_rate=0).acquire(ClaudeState.CL_PostToolUse)
+
+
+def test_uncommitted_state_is_resent(tmp_path):
+    # 发送失败 (未 commit) 时, 下一次相同的状态仍应发送
+    path = str(tmp_path / "hook_state.json")
+    assert StateScheduler(path, max_rate=0).acquire(ClaudeState.CL_PreToolUse)
+    assert StateScheduler(path, max_rate=0).acquire(ClaudeState.CL_PreToolUse)
+
+
+def test_priority_state_bypasses_dedupe(tmp_path):
+    path = str(tmp_path / "hook_state.json")
+    scheduler = StateScheduler(path, max_rate=0)
+    assert scheduler.acquire(ClaudeState.CL_Stop)
+    scheduler.commit(ClaudeState.CL_Stop)
+    assert StateScheduler(path, max_rate=0).acquire(ClaudeState.CL_Stop)
+
+
+def test_late_commit_does_not_overwrite_newer(tmp_path):
+    path = str(tmp_path / "hook_state.json")
+    older, newer = StateScheduler(path, max_rate=0), StateScheduler(path, max_rate=0)
+    assert older.acquire(ClaudeState.CL_PreToolUse)
+    assert newer.acquire(ClaudeState.CL_PostToolUse)
+    newer.commit(ClaudeState.CL_PostToolUse)
+    older.commit(ClaudeState.CL_PreToolUse)
+    assert not StateScheduler(path, max_rate=0).acquire(ClaudeState.CL_PostToolUse)
+    assert StateScheduler(path, max_rate=0).acquire(ClaudeState.CL_PreToolUse)
+
+
+def test_rate_limited_state_is_dropped_without_waiting(tmp_path):
+    path = str(tmp_path / "hook_state.json")
+    first = StateScheduler(path, max_rate=1)
+    assert first.acquire(ClaudeState.CL_UserPromptSubmit)
+    first.commit(ClaudeState.CL_UserPromptSubmit)
+
+    begin = time.monotonic()
+    assert not StateScheduler(path, max_rate=1).acquire(ClaudeState.CL_PreToolUse)
+    assert time.monotonic() - begin < 0.5
+    # 优先状态不受限速影响
+    assert StateScheduler(path, max_rate=1).acquire(ClaudeState.CL_Notification)
+
+
+def test_state_sent_after_window(tmp_path):
+    path = str(tmp_path / "hook_state.json")
+    assert StateScheduler(path, max_rate=20).acquire(ClaudeState.CL_PreToolUse)
+    assert not StateScheduler(path, max_rate=20).acquire(ClaudeState.CL_PostToolUse)
+    time.sleep(0.06)
+    assert StateScheduler(path, max_rate=20).acquire(ClaudeState.CL_PostToolUse)
@@ -0,0 +1,53 @@
+"""hook stdin 流式提取"""
+
+import io
+import json
+
+from stdin_extract import extract
+
+
+def _stream(payload) -> io.BytesIO:
+    return io.BytesIO(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+
+
+def test_extract_fields_and_skip_large_values():
+    payload = {
+        "session_id": "abc",
+        "tool_input": {"content": "x" * 200000, "nested": [1, {"a": "}]\"{"}]},
+        "tool_name": "Write",
+        "flag": True,
+        "count": 3,
+    }
+    result = extract(_stream(payload), fields=("session_id", "tool_name", "flag", "count"),
+                     chunk_size=1024)
+    assert result == {"session_id": "abc", "tool_name": "Write", "flag": True, "count": 3}
+
+
+def test_extract_preview():
+    payload = {"prompt": "你好, 世界" * 100, "session_id": "s"}
+    result = extract(_stream(payload), fields=("session_id",), previews={"prompt": 5},
+                     chunk_size=7)
+    assert result["session_id"] == "s"
+    assert result["prompt"] == "你好, 世..."
+
+
+def test_extract_long_field_falls_back_to_preview():
+    result = extract(_stream({"cwd": "a" * 100}), fields=("cwd",), max_field_bytes=10)
+    assert isinstance(result["cwd"], str) and len(result["cwd"]) < 100
+
+
+def test_extract_stops_at_max_bytes():
+    payload = {"session_id": "s", "big": "y" * 10000, "tool_name": "Bash"}
+    result = extract(_stream(payload), fields=("session_id", "tool_name"), max_bytes=1000,
+                     chunk_size=256)
+    assert result == {"session_id": "s"}
+
+
+def test_extract_consumes_remaining_input():
+    stream = _stream({"session_id": "s", "rest": "z" * 5000})
+    assert extract(stream, fields=("session_id",), chunk_size=64) == {"session_id": "s"}
+    assert stream.read() == b""
+
+
+def test_extract_empty_object():
+    assert extract(io.BytesIO(b" {} "), fields=("session_id",)) == {}
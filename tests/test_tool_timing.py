@@ -0,0 +1,100 @@
+"""工具调用耗时: PreToolUse/PostToolUse 配对、统计与设备摘要"""
+
+import multiprocessing
+import struct
+
+import pytest
+
+import tool_timing
+from tool_timing import PENDING_TIMEOUT, ToolTimingStore, pack_summary, percentile
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ToolTimingStore(str(tmp_path / "tool_timing.db"))
+    yield store
+    store.close()
+
+
+def test_match_by_tool_use_id(store):
+    store.start("s", "Bash", "t1", ts=100.0)
+    store.start("s", "Bash", "t2", ts=101.0)
+    assert store.finish("s", "Bash", "t2", ts=104.0) == 3.0
+    assert store.finish("s", "Bash", "t1", ts=110.0) == 10.0
+    assert store.finish("s", "Bash", "t1", ts=111.0) is None
+
+
+def test_match_fifo_without_id(store):
+    store.start("s", "Read", ts=100.0)
+    store.start("s", "Read", ts=102.0)
+    store.start("other", "Read", ts=90.0)
+    assert store.finish("s", "Read", ts=105.0) == 5.0
+    assert store.finish("s", "Read", ts=105.0) == 3.0
+    assert store.finish("s", "Edit", ts=105.0) is None
+
+
+def test_stale_pending_expires(store):
+    store.start("s", "Bash", "t1", ts=0.0)
+    store.finish("s", "Other", ts=PENDING_TIMEOUT + 10.0)
+    assert store.finish("s", "Bash", "t1", ts=PENDING_TIMEOUT + 11.0) is None
+
+
+def test_stats(store):
+    for i, duration in enumerate([1.0, 2.0, 3.0, 4.0]):
+        store.start("s1", "Bash", f"b{i}", ts=100.0 + i)
+        store.finish("s1", "Bash", f"b{i}", ts=100.0 + i + duration)
+    store.start("s2", "Read", "r", ts=200.0)
+    store.finish("s2", "Read", "r", ts=200.5)
+
+    [bash, read] = store.tool_stats()
+    assert (bash["tool"], bash["count"], bash["total"], bash["p50"], bash["max"]) == \
+        ("Bash", 4, 10.0, 2.0, 4.0)
+    assert read["tool"] == "Read" and read["p99"] == 0.5
+    assert [s["tool"] for s in store.tool_stats(since=150.0)] == ["Read"]
+    assert [(s["session"], s["count"]) for s in store.session_stats()] == [("s1", 4), ("s2", 1)]
+
+
+def test_percentile():
+    assert percentile([], 50) == 0.0
+    values = list(range(1, 101))
+    assert (percentile(values, 50), percentile(values, 99), percentile(values, 100)) == (50, 99, 100)
+
+
+def test_pack_summary():
+    stats = [{"tool": "mcp__very_long_name", "count": 70000, "p50": 0.25, "p99": 1.5},
+             {"tool": "Bash", "count": 3, "p50": 0.1, "p99": 0.2}]
+    data = pack_summary(stats, top=1)
+    assert data[0] == 1
+    assert data[1:9] == b"mcp__ver"
+    assert struct.unpack_from("<HII", data, 9) == (0xFFFF, 250, 1500)
+    assert len(pack_summary(stats)) == 1 + 2 * 18
+
+
+def _record_calls(db_path: str, session: str, count: int):
+    store = ToolTimingStore(db_path)
+    for i in range(count):
+        store.start(session, "Bash", f"{session}-{i}", ts=1000.0 + i)
+        store.finish(session, "Bash", f"{session}-{i}", ts=1000.5 + i)
+    store.close()
+
+
+def test_concurrent_processes(tmp_path):
+    db_path = str(tmp_path / "tool_timing.db")
+    procs = [multiprocessing.Process(target=_record_calls, args=(db_path, f"s{i}", 25))
+             for i in range(4)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+    store = ToolTimingStore(db_path)
+    try:
+        assert store.tool_stats()[0]["count"] == 100
+    finally:
+        store.close()
+
+
+def test_record_hook_event(tmp_path, monkeypatch):
+    monkeypatch.setenv("KB_HOOK_DATA_DIR", str(tmp_path))
+    data = {"session_id": "s", "tool_name": "Bash", "tool_use_id": "t"}
+    assert tool_timing.record_hook_event("PreToolUse", data, ts=10.0) is None
+    assert tool_timing.record_hook_event("PostToolUse", data, ts=12.5) == 2.5
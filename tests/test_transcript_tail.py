@@ -0,0 +1,101 @@
+"""会话记录增量统计: 偏移量续读、首次扫描上限、统计推送去重"""
+
+import json
+
+import transcript_tail
+from ble_command_send import DeviceCmd, StatsKind, _push_session_stats
+from transcript_tail import TranscriptTailer, pack_stats
+
+
+def _line(entry: dict) -> str:
+    return json.dumps(entry) + "\n"
+
+
+def _user(text="hi", ts="2026-01-01T00:00:00Z"):
+    return _line({"type": "user", "timestamp": ts, "message": {"content": text}})
+
+
+def _tool_use(name="Bash", ts="2026-01-01T00:00:10Z"):
+    return _line({"type": "assistant", "timestamp": ts,
+                  "message": {"content": [{"type": "tool_use", "name": name}]}})
+
+
+def _tool_error(ts="2026-01-01T00:00:20Z"):
+    return _line({"type": "user", "timestamp": ts,
+                  "message": {"content": [{"type": "tool_result", "is_error": True}]}})
+
+
+def test_resume_from_offset(tmp_path):
+    transcript = tmp_path / "t.jsonl"
+    transcript.write_text(_user() + _tool_use(), encoding="utf-8")
+    tailer = TranscriptTailer(str(tmp_path / "stats"))
+
+    stats = tailer.update("s1", str(transcript))
+    assert (stats["turns"], stats["tool_calls"], stats["errors"]) == (1, 1, 0)
+
+    # 追加一行完整记录和半行: 只统计完整的行, 已读部分不重复统计
+    with open(transcript, "a", encoding="utf-8") as f:
+        f.write(_tool_error() + _tool_use("Edit")[:10])
+    stats = tailer.update("s1", str(transcript))
+    assert (stats["turns"], stats["tool_calls"], stats["errors"]) == (1, 1, 1)
+    assert stats["elapsed"] == 20
+
+    with open(transcript, "a", encoding="utf-8") as f:
+        f.write(_tool_use("Edit")[10:])
+    stats = TranscriptTailer(str(tmp_path / "stats")).update("s1", str(transcript))
+    assert stats["tools"] == {"Bash": 1, "Edit": 1}
+
+
+def test_truncated_transcript_restarts(tmp_path):
+    transcript = tmp_path / "t.jsonl"
+    transcript.write_text(_user() + _user() + _user(), encoding="utf-8")
+    tailer = TranscriptTailer(str(tmp_path / "stats"))
+    assert tailer.update("s1", str(transcript))["turns"] == 3
+    transcript.write_text(_user(), encoding="utf-8")
+    assert tailer.update("s1", str(transcript))["turns"] == 1
+
+
+def test_first_scan_is_capped(tmp_path, monkeypatch):
+    # 上限按读取块检查, 缩小块大小以便用小文件测试
+    monkeypatch.setattr(transcript_tail, "READ_CHUNK", 4096)
+    transcript = tmp_path / "t.jsonl"
+    line = _user("x" * 1000)
+    transcript.write_text(line * 100, encoding="utf-8")
+    tailer = TranscriptTailer(str(tmp_path / "stats"), max_scan=len(line) * 30)
+
+    counts = []
+    for _ in range(10):
+        counts.append(tailer.update("s1", str(transcript))["turns"])
+        if counts[-1] == 100:
+            break
+    assert counts[0] < 100
+    assert counts[-1] == 100 and len(counts) > 1
+
+
+def test_missing_session_or_path(tmp_path):
+    tailer = TranscriptTailer(str(tmp_path / "stats"))
+    assert tailer.update(None, "x") is None
+    assert tailer.update("s1", str(tmp_path / "missing.jsonl")) is None
+
+
+class _FakeDevice:
+    def __init__(self):
+        self.sent = []
+
+    def send_command(self, cmd, data=b"", timeout=5, have_ret=True):
+        self.sent.append((cmd, data))
+
+
+def test_push_stats_only_when_counters_change(tmp_path):
+    state_path = str(tmp_path / "hook_state.json")
+    device = _FakeDevice()
+    stats = {"turns": 2, "tool_calls": 5, "errors": 0, "elapsed": 10.0}
+
+    _push_session_stats(device, state_path, stats)
+    assert device.sent == [(DeviceCmd.UPDATE_STATS, bytes([StatsKind.SESSION]) + pack_stats(stats))]
+
+    _push_session_stats(device, state_path, dict(stats, elapsed=30.0))
+    assert len(device.sent) == 1
+
+    _push_session_stats(device, state_path, dict(stats, tool_calls=6))
+    assert len(device.sent) == 2
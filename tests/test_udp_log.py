@@ -0,0 +1,120 @@
+"""UdpLog: 多行合并为一个数据报, 级别过滤, UDP 不可用时写入本地 JSONL"""
+
+import json
+import socket
+
+import pytest
+
+import UdpLog as udp_log
+from UdpLog import UdpLog, _UdpSink
+
+
+@pytest.fixture
+def receiver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(1.0)
+    yield sock
+    sock.close()
+
+
+@pytest.fixture(autouse=True)
+def isolated_sinks(monkeypatch):
+    """每个测试使用独立的日志出口和会话 id"""
+    monkeypatch.setattr(UdpLog, "_sinks", {})
+    monkeypatch.setattr(UdpLog, "_session", "")
+    monkeypatch.delenv("KB_HOOK_LOG_FILE", raising=False)
+    monkeypatch.delenv("KB_HOOK_LOG_UDP", raising=False)
+    monkeypatch.delenv("KB_HOOK_LOG_LEVEL", raising=False)
+
+
+def _datagrams(sock) -> list[bytes]:
+    result = []
+    sock.settimeout(0.2)
+    try:
+        while True:
+            result.append(sock.recvfrom(65536)[0])
+    except socket.timeout:
+        return result
+
+
+def test_lines_batched_until_flush(receiver):
+    port = receiver.getsockname()[1]
+    log = UdpLog(port=port, tag="t")
+    log.info("one")
+    log.warn("two %d", 2)
+    assert _datagrams(receiver) == []
+
+    log.flush()
+    [data] = _datagrams(receiver)
+    lines = data.decode("utf-8").splitlines()
+    assert len(lines) == 2
+    assert lines[0].endswith("[t][INFO] one")
+    assert lines[1].endswith("[t][WARN] two 2")
+
+
+def test_error_flushes_immediately(receiver):
+    log = UdpLog(port=receiver.getsockname()[1], tag="t")
+    log.info("before")
+    log.error("boom")
+    [data] = _datagrams(receiver)
+    assert data.decode("utf-8").count("\n") == 2
+
+
+def test_large_batches_split(receiver):
+    sink = _UdpSink("127.0.0.1", receiver.getsockname()[1])
+    for i in range(40):
+        sink.write(0.0, "t", "INFO", f"{i:03d} " + "x" * 500)
+    sink.flush()
+    datagrams = _datagrams(receiver)
+    assert len(datagrams) > 1
+    assert all(len(d) <= _UdpSink.MAX_DATAGRAM for d in datagrams)
+    lines = b"".join(datagrams).decode("utf-8").splitlines()
+    assert [line.split("] ")[1][:3] for line in lines] == [f"{i:03d}" for i in range(40)]
+
+
+def test_level_filter(receiver):
+    log = UdpLog(port=receiver.getsockname()[1], tag="t", level="WARN")
+    assert not log.enabled(UdpLog.LEVEL_INFO) and log.enabled(UdpLog.LEVEL_ERROR)
+    log.debug("no")
+    log.info("no")
+    log.warn("yes")
+    log.flush()
+    [data] = _datagrams(receiver)
+    assert b"no" not in data and b"yes" in data
+
+
+def test_session_field(receiver):
+    UdpLog.set_session("ab[c] d")
+    log = UdpLog(port=receiver.getsockname()[1], tag="t")
+    log.info("hello")
+    log.flush()
+    [data] = _datagrams(receiver)
+    assert data.decode("utf-8").rstrip("\n").endswith("[t][INFO][abcd] hello")
+
+
+def test_file_fallback_when_udp_disabled(tmp_path, monkeypatch):
+    log_file = tmp_path / "hook.jsonl"
+    monkeypatch.setenv("KB_HOOK_LOG_FILE", str(log_file))
+    monkeypatch.setenv("KB_HOOK_LOG_UDP", "0")
+    UdpLog.set_session("s1")
+    log = UdpLog(tag="t")
+    log.info("hello")
+    log.close()
+    [record] = [json.loads(line) for line in log_file.read_text(encoding="utf-8").splitlines()]
+    assert (record["tag"], record["level"], record["session"], record["msg"]) == \
+        ("t", "INFO", "s1", "hello")
+
+
+def test_file_fallback_when_send_fails(tmp_path):
+    log_file = tmp_path / "hook.jsonl"
+    sink = _UdpSink("127.0.0.1", 0, log_file=str(log_file))   # 端口 0 无法发送
+    sink.write(0.0, "t", "ERROR", "lost")
+    assert json.loads(log_file.read_text(encoding="utf-8"))["msg"] == "lost"
+
+
+def test_flush_all_at_exit(receiver):
+    log = UdpLog(port=receiver.getsockname()[1], tag="t")
+    log.info("pending")
+    udp_log._flush_all()
+    assert len(_datagrams(receiver)) == 1